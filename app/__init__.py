@@ -12,6 +12,10 @@ from . import template_filters
 # from cryptography.fernet import Fernet # REMOVE FERNET
 # from models import db as root_db, initialize_fernet as initialize_root_fernet # REMOVE - Assuming models.py is at project root
 from .models import db, Subscription, _generate_email_hash, init_app as init_models_db # CORRECTED IMPORT
+from .arxiv_api import init_app as init_arxiv_client
+from .llm_client import init_app as init_llm_client
+from .local_search import create_index as create_local_search_index
+from . import http_cache, fragment_cache
 
 # Import scheduler initialization function
 from .scheduler import init_scheduler
@@ -54,10 +58,14 @@ def create_app(config_name='development'):
     mail.init_app(app)
     limiter.init_app(app)
     cache.init_app(app)
+    init_arxiv_client(app) # Shared arXiv rate limiter and pooled HTTP session (closed at exit)
+    init_llm_client(app) # Host-wide LLM governor and pooled OpenAI client (closed at exit)
+    http_cache.init_app(app) # Content-hashed static URLs and their caching headers
 
     # Add Python built-ins to Jinja environment if needed
     app.jinja_env.globals['min'] = min
     app.jinja_env.globals['max'] = max 
+    app.jinja_env.globals['render_paper_card'] = fragment_cache.render_paper_card # Cached per paper version and query terms
 
     # Register custom template filters
     app.jinja_env.filters['format_date'] = template_filters.format_date
@@ -105,6 +113,8 @@ def create_app(config_name='development'):
         try:
             db.create_all() # Use db imported from .models
             app.logger.info("db.create_all() executed successfully.")
+            if create_local_search_index(): # FTS5 index over the paper store, for offline search
+                app.logger.info("Local full-text search index is ready.")
         except Exception as e:
             app.logger.error(f"Error during db.create_all(): {e}", exc_info=True)
 
@@ -1,18 +1,35 @@
 import requests
+from requests.adapters import HTTPAdapter
+import httpx
+import asyncio
+import inspect
+import hashlib
 import time
 import logging
+import os
+import re
+import atexit
+import threading
+import weakref
 from urllib.parse import urlencode
 import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
 from typing import List, Optional, Union, Dict
 from .models import ArxivPaper
+from . import paper_store
 from .exceptions import (
     ArxivAPIException,
     NetworkException,
+    CircuitOpenException,
     ParsingException,
     ValidationException
 )
-from flask import current_app
+from flask import current_app, has_app_context
 from .extensions import cache
+from .rate_limiter import TokenBucketRateLimiter
+from .singleflight import SingleFlight
+from .circuit_breaker import CircuitBreaker
+from .swr_cache import StaleWhileRevalidateCache, FRESH, REVALIDATING, STALE
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +39,16 @@ ARXIV_API_URL = "http://export.arxiv.org/api/query"
 REQUEST_THROTTLE_SECONDS = 3.1  # Slightly more than 3 seconds to be safe
 DEFAULT_TIMEOUT_SECONDS = 10 # Default timeout for requests
 MAX_RETRIES = 3 # Maximum number of retries for a request
+HTTP_POOL_SIZE = 10 # Pooled keep-alive connections per worker process
+CONNECT_TIMEOUT_SECONDS = 5 # TCP/TLS connect timeout for the pooled session
+READ_TIMEOUT_SECONDS = 30 # Read timeout; large max_results responses can take a while to stream
+SEARCH_CHUNK_SIZE = 100 # Results fetched per arXiv call by search_page; pages are sliced out of these chunks
+ID_LIST_CHUNK_SIZE = 100 # Most IDs per id_list query in fetch_papers_by_ids
+PAPER_CACHE_TTL_SECONDS = 86400 # How long fetch_papers_by_ids caches each paper
+ITER_INITIAL_PAGE_SIZE = 100 # First page requested by iter_search_results; doubles after every full page
+ITER_MIN_PAGE_SIZE = 25 # Smallest page iter_search_results shrinks to after timeouts and server errors
+ITER_MAX_PAGE_SIZE = 2000 # arXiv's largest max_results per call
+ITER_EMPTY_PAGE_RETRIES = 2 # Spurious empty pages tolerated before iter_search_results gives up
 
 NAMESPACES = {
     'atom': 'http://www.w3.org/2005/Atom',
@@ -29,6 +56,111 @@ NAMESPACES = {
     'opensearch': 'http://a9.com/-/spec/opensearch/1.1/'
 }
 
+# One request per REQUEST_THROTTLE_SECONDS across every worker process on the host.
+# Reconfigured from the app config in init_app().
+arxiv_rate_limiter = TokenBucketRateLimiter('arxiv_api', rate=1.0 / REQUEST_THROTTLE_SECONDS, capacity=1)
+
+# Identical concurrent search_papers cache misses share one fetch, across threads and
+# (with a shared cache backend) across workers. Reconfigured from the app config in init_app().
+search_flight = SingleFlight('arxiv_search')
+
+# Soft/hard TTL cache for search_papers. Between the TTLs cached results are served while a
+# background refresh runs; past the hard TTL, arXiv outages (network errors, 5xx, 429) fall
+# back to the last known result. Reconfigured from the app config in init_app().
+search_cache = StaleWhileRevalidateCache('arxiv_search', stale_exceptions=(NetworkException,))
+
+# Tracks the latency and network failures of uncached search fetches. Fetches made for
+# /search (use_circuit_breaker=True) raise CircuitOpenException instead of calling arXiv while
+# it is open, and the route answers from the local full-text index. Reconfigured from the app
+# config in init_app().
+search_breaker = CircuitBreaker('arxiv_search')
+
+# Per-process pooled HTTP session (see get_session)
+_http_settings = {
+    'pool_size': HTTP_POOL_SIZE,
+    'connect_timeout': CONNECT_TIMEOUT_SECONDS,
+    'read_timeout': READ_TIMEOUT_SECONDS
+}
+_HTTP_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'User-Agent': 'arXiv-Paper-Search/1.0 (+https://github.com/jackwu-ai/arXiv-Paper-Search)'
+}
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_shutdown_hook_registered = False
+
+def init_app(app):
+    """Configures the arXiv client (shared rate limiter, search cache, coalescing and circuit breaker, HTTP session) from the Flask app config."""
+    global _shutdown_hook_registered
+    arxiv_rate_limiter.configure(
+        rate=1.0 / app.config.get('ARXIV_RATE_LIMIT_INTERVAL', REQUEST_THROTTLE_SECONDS),
+        capacity=app.config.get('ARXIV_RATE_LIMIT_BURST', 1),
+        state_path=app.config.get('RATE_LIMIT_STATE_PATH')
+    )
+    search_flight.configure(
+        wait_timeout=app.config.get('SEARCH_SINGLE_FLIGHT_TIMEOUT'),
+        shared=app.config.get('SEARCH_SINGLE_FLIGHT_SHARED')
+    )
+    search_breaker.configure(
+        window=app.config.get('SEARCH_FALLBACK_WINDOW'),
+        error_threshold=app.config.get('SEARCH_FALLBACK_ERROR_RATE'),
+        latency_threshold=app.config.get('SEARCH_FALLBACK_LATENCY'),
+        cooldown=app.config.get('SEARCH_FALLBACK_COOLDOWN')
+    )
+    search_cache.configure(
+        soft_ttl=app.config.get('SEARCH_CACHE_SOFT_TTL'),
+        hard_ttl=app.config.get('SEARCH_CACHE_HARD_TTL'),
+        stale_ttl=app.config.get('SEARCH_CACHE_STALE_TTL')
+    )
+    new_settings = {
+        'pool_size': app.config.get('ARXIV_HTTP_POOL_SIZE', HTTP_POOL_SIZE),
+        'connect_timeout': app.config.get('ARXIV_CONNECT_TIMEOUT', CONNECT_TIMEOUT_SECONDS),
+        'read_timeout': app.config.get('ARXIV_READ_TIMEOUT', READ_TIMEOUT_SECONDS)
+    }
+    if new_settings != _http_settings:
+        _http_settings.update(new_settings)
+        close_session() # Rebuilt with the new pool size on next use
+    if not _shutdown_hook_registered:
+        atexit.register(close_session)
+        _shutdown_hook_registered = True
+
+def get_session() -> requests.Session:
+    """
+    Returns this process's long-lived arXiv session, creating it on first use.
+
+    The session keeps connections alive in a pool sized by ARXIV_HTTP_POOL_SIZE and asks for
+    gzip-compressed responses. A session inherited across fork() is discarded, so every
+    gunicorn worker gets its own pool.
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            # Retries are handled in make_api_request so they go through the rate limiter
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_http_settings['pool_size'], max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(_HTTP_HEADERS)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+def close_session():
+    """Closes the pooled session's connections. Registered as an exit hook by init_app()."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+            logger.info("Closed pooled arXiv HTTP session.")
+        _session = None
+        _session_pid = None
+
+def get_request_timeout() -> tuple:
+    """Returns the (connect, read) timeout pair used for arXiv requests."""
+    return (_http_settings['connect_timeout'], _http_settings['read_timeout'])
+
 def construct_query_url(search_query: str = None, id_list: list = None, start: int = 0, max_results: int = 10, sortBy: str = "relevance", sortOrder: str = "descending") -> str:
     """
     Constructs the query URL for the arXiv API.
@@ -70,15 +202,17 @@ def construct_query_url(search_query: str = None, id_list: list = None, start: i
     encoded_params = urlencode(query_params)
     return f"{ARXIV_API_URL}?{encoded_params}"
 
-def make_api_request(query_url: str) -> str:
+def make_api_request(query_url: str, stream: bool = False) -> Union[str, requests.Response]:
     """
     Makes a request to the arXiv API, handling retries and rate limiting.
 
     Args:
         query_url: The URL to request.
+        stream: If True, return the response with its body unread so it can be fed to
+            ArxivFeedStream; the caller must close it.
 
     Returns:
-        The API response text (XML).
+        The API response text (XML), or the open requests.Response when stream is True.
     Raises:
         NetworkException: If the request times out after all retries, or for rate limit errors / server errors.
         ArxivAPIException: If a client error (4xx, not 429) occurs or for other request-related errors.
@@ -87,11 +221,15 @@ def make_api_request(query_url: str) -> str:
     for attempt in range(MAX_RETRIES):
         try:
             logger.info(f"Attempting to fetch URL (attempt {attempt + 1}/{MAX_RETRIES}): {query_url}")
-            time.sleep(REQUEST_THROTTLE_SECONDS) 
-            response = requests.get(query_url, timeout=DEFAULT_TIMEOUT_SECONDS)
+            waited = arxiv_rate_limiter.acquire() # Only blocks when the host-wide budget is exhausted
+            if waited:
+                logger.info(f"Rate limiter delayed request by {waited:.2f} seconds.")
+            response = get_session().get(query_url, timeout=get_request_timeout(), stream=stream)
+            if stream and not response.ok:
+                response.close() # Release the pooled connection before raising
             response.raise_for_status()  
             logger.info(f"Successfully fetched URL: {query_url}")
-            return response.text
+            return response if stream else response.text
         except requests.exceptions.HTTPError as e:
             last_exception = e
             logger.error(f"HTTP error occurred: {e} - Status code: {e.response.status_code}")
@@ -99,8 +237,8 @@ def make_api_request(query_url: str) -> str:
                 if attempt == MAX_RETRIES - 1:
                     raise NetworkException(message="arXiv API rate limit exceeded. Please try again later.", original_exception=e, status_code=429)
                 sleep_time = REQUEST_THROTTLE_SECONDS * (attempt + 2) 
-                logger.warning(f"Rate limit likely hit. Sleeping for {sleep_time:.2f} seconds.")
-                time.sleep(sleep_time)
+                logger.warning(f"Rate limit likely hit. Backing off all workers for {sleep_time:.2f} seconds.")
+                arxiv_rate_limiter.penalize(sleep_time) # The next acquire() on any worker waits this out
             elif e.response.status_code >= 500:
                 if attempt == MAX_RETRIES - 1:
                     raise NetworkException(message=f"arXiv API server error.", original_exception=e, status_code=e.response.status_code)
@@ -144,12 +282,15 @@ def make_api_request(query_url: str) -> str:
     # Absolute fallback, should ideally never be reached.
     raise ArxivAPIException(f"All {MAX_RETRIES} retries failed for URL: {query_url} without a specific final exception being categorized.")
 
-@cache.memoize()
-def search_papers(query: str = None, ids: list = None, start_index: int = 0, count: int = 10, sort_by: str = "relevance", sort_order: str = "descending") -> Dict[str, Union[List[ArxivPaper], int]]:
+def _fetch_search_papers(query: str = None, ids: list = None, start_index: int = 0, count: int = 10, sort_by: str = "relevance", sort_order: str = "descending",
+                         *, use_circuit_breaker: bool = False) -> Dict[str, Union[List[ArxivPaper], int]]:
     """
-    High-level function to search for papers on arXiv.
-    Returns a dictionary with 'papers' list and 'total_results' count.
-    Raises ArxivAPIException, NetworkException, ParsingException or ValidationException on failure.
+    Performs the uncached, uncoalesced search behind search_papers.
+
+    With use_circuit_breaker, search_breaker decides right before the arXiv request whether it
+    is made (so its half-open probe goes to a call that actually reports back), and
+    CircuitOpenException is raised if not. use_circuit_breaker is keyword-only, so it stays
+    out of the normalized search arguments and cache keys.
     """
     # construct_query_url will raise ValidationException if params are bad
     query_url = construct_query_url(
@@ -161,7 +302,18 @@ def search_papers(query: str = None, ids: list = None, start_index: int = 0, cou
         sortOrder=sort_order
     )
     # make_api_request will raise appropriate ArxivAPIError subclass on failure
-    response_xml = make_api_request(query_url)
+    if use_circuit_breaker and not search_breaker.allow_request():
+        raise CircuitOpenException()
+    started = time.monotonic()
+    try:
+        response_xml = make_api_request(query_url)
+    except NetworkException:
+        search_breaker.record(time.monotonic() - started, failed=True)
+        raise
+    except ArxivAPIException:
+        search_breaker.record(time.monotonic() - started) # arXiv answered; the request itself was rejected
+        raise
+    search_breaker.record(time.monotonic() - started) # Includes rate limiter waits and retries, as users see them
     
     # parse_arxiv_xml will raise ArxivParsingError or ArxivAPIError on failure
     parsed_data = parse_arxiv_xml(response_xml) 
@@ -169,92 +321,700 @@ def search_papers(query: str = None, ids: list = None, start_index: int = 0, cou
     logger.info(f"Successfully processed search. Query='{query}', ids='{ids}', Found {len(parsed_data['papers'])} papers. Total results available: {parsed_data['total_results']}")
     return parsed_data
 
+_SEARCH_SIGNATURE = inspect.signature(_fetch_search_papers)
+
+def _normalize_search_args(*args, **kwargs) -> tuple:
+    """Binds search arguments to the full search signature, so every call style yields the same tuple."""
+    bound = _SEARCH_SIGNATURE.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return bound.args
+
+def _search_flight_key(search_args: tuple) -> tuple:
+    """Returns a hashable single-flight key for normalized search arguments (id lists become tuples)."""
+    return tuple(tuple(arg) if isinstance(arg, list) else arg for arg in search_args)
+
+def search_cache_key(*args, **kwargs) -> str:
+    """
+    Returns the cache key for a search_papers call with these arguments.
+    Arguments are bound to the full signature first, so every call style (and
+    async_search_papers) maps to the same entry.
+    """
+    digest = hashlib.sha1(repr(_normalize_search_args(*args, **kwargs)).encode('utf-8')).hexdigest()
+    return f"search_papers:{digest}"
+
+def search_papers(query: str = None, ids: list = None, start_index: int = 0, count: int = 10, sort_by: str = "relevance", sort_order: str = "descending",
+                  use_circuit_breaker: bool = False) -> Dict[str, Union[List[ArxivPaper], int]]:
+    """
+    High-level function to search for papers on arXiv.
+    Returns a dictionary with 'papers' list and 'total_results' count.
+
+    Results are cached in search_cache: past the soft TTL the cached result is returned while
+    a background refresh runs; past the hard TTL, a refresh failing with NetworkException
+    (including 429) returns the last known result with 'stale': True added.
+    Concurrent cache misses for the same arguments share a single arXiv fetch (see search_flight).
+    With use_circuit_breaker, a fetch that is needed while search_breaker is open raises
+    CircuitOpenException (a NetworkException, so a cached result is served stale if there is one);
+    cached results are returned without consulting the breaker.
+    Raises ArxivAPIException, NetworkException, ParsingException or ValidationException on failure.
+    """
+    search_args = _normalize_search_args(query, ids, start_index, count, sort_by, sort_order)
+    flight_key = _search_flight_key(search_args)
+    if not has_app_context(): # No cache backend to use
+        return search_flight.do(flight_key, _fetch_search_papers, *search_args, use_circuit_breaker=use_circuit_breaker)
+
+    result, state = search_cache.get_or_fetch(
+        search_cache_key(*search_args), search_flight.do, flight_key, _fetch_search_papers, *search_args,
+        use_circuit_breaker=use_circuit_breaker
+    )
+    if state == STALE:
+        return {**result, 'stale': True}
+    return result
+
+def _search_total_key(query: str, sort_by: str, sort_order: str) -> str:
+    digest = hashlib.sha1(repr((query, sort_by, sort_order)).encode('utf-8')).hexdigest()
+    return f"search_total:{digest}"
+
+def search_page(query: str, start_index: int = 0, count: int = 10, sort_by: str = "relevance", sort_order: str = "descending",
+                use_circuit_breaker: bool = False) -> Dict[str, Union[List[ArxivPaper], int]]:
+    """
+    Returns one page of search results, sliced out of larger chunk-aligned fetches.
+
+    Pages are served from chunks of SEARCH_CHUNK_SIZE results (app config key of the same
+    name) starting at multiples of the chunk size. Each chunk is fetched and cached through
+    search_papers, so paging through a query costs one arXiv call per chunk instead of one
+    per page. The query's total result count is cached separately, so pages past the end
+    are answered without an upstream call.
+
+    Args:
+        query: The arXiv search query.
+        start_index: Index of the first result of the page.
+        count: Page size.
+        sort_by: The sorting criteria.
+        sort_order: The sorting order.
+        use_circuit_breaker: Raise CircuitOpenException instead of fetching uncached chunks while search_breaker is open.
+
+    Returns:
+        A dictionary with the page's 'papers' list and the query's 'total_results' count, plus
+        'stale': True if any chunk was served stale by search_papers.
+    Raises:
+        ArxivAPIException, NetworkException, ParsingException or ValidationException on failure.
+    """
+    chunk_size = current_app.config.get('SEARCH_CHUNK_SIZE', SEARCH_CHUNK_SIZE)
+    if count <= 0 or start_index < 0:
+        raise ValidationException("Page start must be non-negative and page size positive.")
+
+    total_key = _search_total_key(query, sort_by, sort_order)
+    total_results = cache.get(total_key)
+    if total_results is not None and start_index >= total_results:
+        logger.info(f"Page starting at {start_index} is past the {total_results} results for '{query}'; no fetch needed.")
+        return {'papers': [], 'total_results': total_results}
+
+    end_index = start_index + count
+    papers = []
+    stale = False
+    for chunk_start in range(start_index - start_index % chunk_size, end_index, chunk_size):
+        if total_results is not None and chunk_start >= total_results:
+            break
+        chunk = search_papers(query=query, start_index=chunk_start, count=chunk_size, sort_by=sort_by, sort_order=sort_order,
+                              use_circuit_breaker=use_circuit_breaker)
+        if total_results != chunk['total_results']:
+            total_results = chunk['total_results']
+            cache.set(total_key, total_results, timeout=search_cache.stale_ttl)
+        stale = stale or chunk.get('stale', False)
+        papers.extend(chunk['papers'][max(start_index - chunk_start, 0):end_index - chunk_start])
+        if len(chunk['papers']) < chunk_size:
+            break # Last chunk of the result set
+
+    page = {'papers': papers, 'total_results': total_results or 0}
+    if stale:
+        page['stale'] = True
+    return page
+
+# arXiv identifiers: new style (2301.01234, optionally versioned) and old style (hep-th/9901001, math.AG/0101001)
+_ARXIV_ID_RE = re.compile(r'^(?:\d{4}\.\d{4,5}|[a-z][a-z\-]*(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?$')
+_ARXIV_ID_VERSION_RE = re.compile(r'v\d+$')
+
+def normalize_arxiv_id(raw_id: str) -> Optional[str]:
+    """Returns the canonical form of an arXiv ID ('arXiv:' prefix and abs/pdf URLs stripped), or None if it is malformed."""
+    arxiv_id = (raw_id or '').strip()
+    for prefix in ('arXiv:', 'arxiv:'):
+        if arxiv_id.startswith(prefix):
+            arxiv_id = arxiv_id[len(prefix):]
+    for marker in ('/abs/', '/pdf/'):
+        if marker in arxiv_id:
+            arxiv_id = arxiv_id.split(marker, 1)[1]
+    if arxiv_id.endswith('.pdf'):
+        arxiv_id = arxiv_id[:-len('.pdf')]
+    return arxiv_id if _ARXIV_ID_RE.match(arxiv_id) else None
+
+def _paper_cache_key(arxiv_id: str) -> str:
+    return f"arxiv_paper:{arxiv_id}"
+
+def _id_chunks(ids: list, max_chunk_size: int) -> List[list]:
+    """Splits ids into the fewest chunks of at most max_chunk_size, with sizes differing by at most one."""
+    if not ids:
+        return []
+    chunk_count = -(-len(ids) // max_chunk_size)
+    base, extra = divmod(len(ids), chunk_count)
+    chunks, start = [], 0
+    for i in range(chunk_count):
+        size = base + (1 if i < extra else 0)
+        chunks.append(ids[start:start + size])
+        start += size
+    return chunks
+
+def _fetch_id_chunk(chunk: list) -> Dict[str, ArxivPaper]:
+    """Fetches one id_list chunk and maps each requested ID to the paper arXiv returned for it."""
+    # max_results must cover the chunk; the API otherwise stops at its default page size
+    query_url = construct_query_url(id_list=chunk, max_results=len(chunk))
+    parsed = parse_arxiv_xml(make_api_request(query_url))
+    by_id = {}
+    latest_versions = {}
+    for paper in parsed['papers']:
+        by_id[paper.id_str] = paper
+        # An unversioned ID resolves to the latest version, which arXiv reports with its 'vN' suffix
+        version = _ARXIV_ID_VERSION_RE.search(paper.id_str)
+        base_id = paper.id_str[:version.start()] if version else paper.id_str
+        version_number = int(version.group()[1:]) if version else 0
+        if version_number >= latest_versions.get(base_id, -1):
+            latest_versions[base_id] = version_number
+            by_id[base_id] = paper
+    return {arxiv_id: by_id[arxiv_id] for arxiv_id in chunk if arxiv_id in by_id}
+
+def fetch_papers_by_ids(ids: List[str]) -> Dict[str, list]:
+    """
+    Resolves a batch of arXiv IDs to papers with as few upstream calls as possible.
+
+    IDs are normalized and deduplicated, then answered from the per-paper cache
+    (ARXIV_PAPER_CACHE_TTL) where possible. The remaining IDs are fetched with id_list
+    queries, split into evenly sized chunks of at most ARXIV_ID_CHUNK_SIZE IDs; every
+    chunk goes through make_api_request and therefore the shared arXiv rate limiter.
+    Fetched papers are cached under the ID they were requested by.
+
+    Args:
+        ids: arXiv IDs, optionally versioned ('2301.01234v2'), prefixed ('arXiv:2301.01234')
+            or given as abs/pdf URLs.
+
+    Returns:
+        A dictionary with 'papers', the found papers in the order their IDs first appear in
+        `ids`, and 'missing', the normalized IDs (or the raw value, for malformed ones)
+        arXiv has no paper for.
+    Raises:
+        ArxivAPIException, NetworkException or ParsingException if a chunk can't be fetched.
+    """
+    requested = [] # Unique normalized IDs, in input order
+    missing = []
+    seen = set()
+    for raw_id in ids:
+        arxiv_id = normalize_arxiv_id(raw_id)
+        key = arxiv_id or raw_id
+        if key in seen:
+            continue
+        seen.add(key)
+        if arxiv_id is None:
+            logger.warning(f"Skipping malformed arXiv ID: {raw_id!r}")
+            missing.append(raw_id)
+        else:
+            requested.append(arxiv_id)
+
+    use_cache = has_app_context()
+    found = {}
+    if use_cache and requested:
+        try:
+            cached = cache.get_many(*[_paper_cache_key(arxiv_id) for arxiv_id in requested])
+        except Exception:
+            logger.exception("Exception possibly due to cache backend.")
+            cached = [None] * len(requested)
+        found.update((arxiv_id, paper) for arxiv_id, paper in zip(requested, cached) if paper is not None)
+
+    to_fetch = [arxiv_id for arxiv_id in requested if arxiv_id not in found]
+    chunk_size = current_app.config.get('ARXIV_ID_CHUNK_SIZE', ID_LIST_CHUNK_SIZE) if use_cache else ID_LIST_CHUNK_SIZE
+    chunks = _id_chunks(to_fetch, chunk_size)
+    for chunk in chunks:
+        fetched = _fetch_id_chunk(chunk)
+        found.update(fetched)
+        if use_cache and fetched:
+            try:
+                cache.set_many({_paper_cache_key(arxiv_id): paper for arxiv_id, paper in fetched.items()},
+                               timeout=current_app.config.get('ARXIV_PAPER_CACHE_TTL', PAPER_CACHE_TTL_SECONDS))
+            except Exception:
+                logger.exception("Exception possibly due to cache backend.")
+
+    papers = []
+    for arxiv_id in requested:
+        if arxiv_id in found:
+            papers.append(found[arxiv_id])
+        else:
+            missing.append(arxiv_id)
+    logger.info(f"Resolved {len(papers)} of {len(requested)} arXiv IDs ({len(requested) - len(to_fetch)} from cache, "
+                f"{len(chunks)} upstream calls); {len(missing)} missing.")
+    return {'papers': papers, 'missing': missing}
+
+# Clark-notation tags, so entries can be walked without namespace-map path lookups
+_ATOM = '{%s}' % NAMESPACES['atom']
+_ARXIV = '{%s}' % NAMESPACES['arxiv']
+_ENTRY_TAG = _ATOM + 'entry'
+_TOTAL_RESULTS_TAG = '{%s}totalResults' % NAMESPACES['opensearch']
+_TEXT_FIELDS = {
+    _ATOM + 'id': 'id_url',
+    _ATOM + 'title': 'title',
+    _ATOM + 'summary': 'summary',
+    _ATOM + 'published': 'published_date',
+    _ATOM + 'updated': 'updated_date',
+    _ARXIV + 'doi': 'doi'
+}
+_AUTHOR_TAG = _ATOM + 'author'
+_AUTHOR_NAME_TAG = _ATOM + 'name'
+_CATEGORY_TAG = _ATOM + 'category'
+_PRIMARY_CATEGORY_TAG = _ARXIV + 'primary_category'
+STREAM_CHUNK_SIZE = 64 * 1024 # Bytes fed to the incremental parser at a time
+
+def _entry_to_paper_data(entry) -> dict:
+    """Extracts ArxivPaper constructor arguments from an <entry> element in a single pass."""
+    fields = {}
+    authors = []
+    categories = []
+    primary_category = None
+    primary_category_seen = False
+    for child in entry:
+        tag = child.tag
+        field_name = _TEXT_FIELDS.get(tag)
+        if field_name is not None:
+            # Like Element.find(), the first occurrence wins
+            if field_name not in fields:
+                fields[field_name] = child.text.strip() if child.text else None
+        elif tag == _AUTHOR_TAG:
+            name = child.find(_AUTHOR_NAME_TAG)
+            if name is not None and name.text:
+                authors.append(name.text.strip())
+        elif tag == _CATEGORY_TAG:
+            term = child.get('term')
+            if term:
+                categories.append(term)
+        elif tag == _PRIMARY_CATEGORY_TAG and not primary_category_seen:
+            primary_category = child.get('term')
+            primary_category_seen = True
+
+    id_full_url = fields.get('id_url')
+    id_str = id_full_url.split('/abs/')[-1] if id_full_url else None
+    return {
+        'id_str': id_str,
+        'title': fields.get('title'),
+        'summary': fields.get('summary'),
+        'published_date': fields.get('published_date'),
+        'updated_date': fields.get('updated_date'),
+        'authors': authors,
+        'categories': categories,
+        'pdf_link': f"http://arxiv.org/pdf/{id_str}.pdf" if id_str else None,
+        'doi': fields.get('doi'),
+        'primary_category': primary_category
+    }
+
+def _paper_from_entry(entry) -> Optional[ArxivPaper]:
+    """Builds an ArxivPaper from an <entry> element, or returns None if the entry is invalid."""
+    paper_data = _entry_to_paper_data(entry)
+    try:
+        return ArxivPaper(**paper_data)
+    except ValueError as ve:
+        logger.warning(f"Skipping entry due to validation error: {ve}. Data: {paper_data}")
+    except TypeError as te:
+        logger.warning(f"Skipping entry due to TypeError (likely missing field for dataclass): {te}. Data: {paper_data}")
+    return None
+
+class ArxivFeedStream:
+    """
+    Incrementally parses an arXiv Atom feed, yielding ArxivPaper objects entry by entry.
+
+    Each <entry> is converted as soon as its end tag is parsed and is then detached from the
+    tree, so peak memory stays proportional to one entry rather than the whole document.
+
+    Args:
+        source: The feed as bytes or str, a file-like object with read() (e.g. response.raw or
+            a gzip.GzipFile), a requests.Response opened with stream=True, or any iterable of
+            bytes chunks.
+
+    After iteration, total_results holds the opensearch:totalResults value (0 if missing or invalid).
+    Raises ParsingException on malformed XML.
+    """
+
+    def __init__(self, source, chunk_size: int = STREAM_CHUNK_SIZE):
+        self._source = source
+        self._chunk_size = chunk_size
+        self.total_results = 0
+        self.total_results_found = False
+        self.entries_seen = 0
+
+    def _chunks(self):
+        source = self._source
+        if isinstance(source, (bytes, bytearray, str)):
+            for offset in range(0, len(source), self._chunk_size):
+                yield source[offset:offset + self._chunk_size]
+        elif hasattr(source, 'iter_content'):
+            # requests.Response: iter_content() transparently undoes gzip/deflate
+            yield from source.iter_content(chunk_size=self._chunk_size)
+        elif hasattr(source, 'read'):
+            while True:
+                chunk = source.read(self._chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        else:
+            yield from source
+
+    def _read_total_results(self, element):
+        self.total_results_found = True
+        if element.text is None:
+            self.total_results_found = False
+            return
+        try:
+            self.total_results = int(element.text)
+        except ValueError:
+            logger.warning(f"Could not parse totalResults value: '{element.text}'. Defaulting to 0.")
+            self.total_results = 0
+
+    def _handle_events(self, parser, state):
+        """Processes pending parser events; yields papers for completed top-level entries."""
+        for event, element in parser.read_events():
+            if event == 'start':
+                if state['root'] is None:
+                    state['root'] = element
+                state['depth'] += 1
+                continue
+            state['depth'] -= 1
+            if state['depth'] != 1: # Only direct children of <feed> are of interest
+                continue
+            if element.tag == _ENTRY_TAG:
+                self.entries_seen += 1
+                paper = _paper_from_entry(element)
+                if paper is not None:
+                    yield paper
+            elif element.tag == _TOTAL_RESULTS_TAG:
+                self._read_total_results(element)
+            state['root'].remove(element) # Frees the finished subtree
+
+    def __iter__(self):
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        state = {'root': None, 'depth': 0}
+        try:
+            for chunk in self._chunks():
+                parser.feed(chunk)
+                yield from self._handle_events(parser, state)
+            parser.close()
+            yield from self._handle_events(parser, state)
+        except ET.ParseError as e:
+            logger.error(f"Failed to parse XML string: {e}")
+            raise ParsingException("Failed to parse XML response from arXiv.", original_exception=e)
+        except (ParsingException, GeneratorExit):
+            raise
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during XML parsing: {e}")
+            raise ParsingException("An unexpected error occurred during XML parsing of arXiv data.", original_exception=e)
+        if not self.total_results_found:
+            logger.warning("opensearch:totalResults tag not found or empty. Defaulting to 0.")
+
 def parse_arxiv_xml(xml_string: str) -> Dict[str, Union[List[ArxivPaper], int]]:
     """
     Parses the XML response from arXiv API into a list of ArxivPaper objects and total results count.
+    Thin wrapper around ArxivFeedStream for callers that want the whole page at once.
+    Inside an app context the parsed papers are also kept in the persistent paper store.
     Raises ParsingException on failure to parse XML or other unexpected errors during parsing.
     """
+    stream = ArxivFeedStream(xml_string)
     try:
-        root = ET.fromstring(xml_string)
-        papers = []
-        total_results = 0
+        papers = list(stream)
+    except ParsingException:
+        logger.error(f"Problematic XML snippet (first 500 chars): {xml_string[:500]}...")
+        raise
+    paper_store.record_papers(papers)
+    return {'papers': papers, 'total_results': stream.total_results}
 
-        # Extract total results
-        total_results_tag = root.find('opensearch:totalResults', NAMESPACES)
-        if total_results_tag is not None and total_results_tag.text is not None:
-            try:
-                total_results = int(total_results_tag.text)
-            except ValueError:
-                logger.warning(f"Could not parse totalResults value: '{total_results_tag.text}'. Defaulting to 0.")
-                total_results = 0 # Default or handle as critical error
-        else:
-            logger.warning("opensearch:totalResults tag not found or empty. Defaulting to 0.")
+# --- Deep pagination ---
+_DATE_SORT_FIELDS = {'submittedDate': 'published_date', 'lastUpdatedDate': 'updated_date'}
 
-        for entry in root.findall('atom:entry', NAMESPACES):
-            paper_data = {}
-            # Helper to find text, returning None if element is not found
-            def find_text(element, path, namespace_map=NAMESPACES):
-                found = element.find(path, namespace_map)
-                return found.text.strip() if found is not None and found.text else None
-
-            # Helper to find all texts for a given path (e.g., multiple authors)
-            def find_all_texts(element, path, sub_path, namespace_map=NAMESPACES):
-                elements = element.findall(path, namespace_map)
-                texts = []
-                for el in elements:
-                    sub_el = el.find(sub_path, namespace_map)
-                    if sub_el is not None and sub_el.text:
-                        texts.append(sub_el.text.strip())
-                return texts
-            
-            # Helper to find an attribute
-            def find_attribute(element, path, attribute_name, namespace_map=NAMESPACES):
-                found = element.find(path, namespace_map)
-                return found.get(attribute_name) if found is not None else None
-
-            # Extracting common fields into paper_data dictionary
-            id_full_url = find_text(entry, 'atom:id')
-            paper_data['id_str'] = id_full_url.split('/abs/')[-1] if id_full_url else None
-            paper_data['title'] = find_text(entry, 'atom:title')
-            paper_data['summary'] = find_text(entry, 'atom:summary')
-            paper_data['published_date'] = find_text(entry, 'atom:published')
-            paper_data['updated_date'] = find_text(entry, 'atom:updated')
-            
-            paper_data['authors'] = find_all_texts(entry, 'atom:author', 'atom:name')
-            
-            categories_elements = entry.findall('atom:category', NAMESPACES)
-            paper_data['categories'] = [cat.get('term') for cat in categories_elements if cat.get('term')]
-
-            if paper_data['id_str']:
-                paper_data['pdf_link'] = f"http://arxiv.org/pdf/{paper_data['id_str']}.pdf"
-            else:
-                paper_data['pdf_link'] = None
+class SearchResultIterator:
+    """
+    Streams every result of a query, page by page, yielding ArxivPaper objects lazily.
 
-            # arXiv specific fields
-            paper_data['doi'] = find_text(entry, 'arxiv:doi', NAMESPACES)
-            paper_data['primary_category'] = find_attribute(entry, 'arxiv:primary_category', 'term', NAMESPACES)
-            
-            # Instantiate ArxivPaper object
+    Each page is a single streamed arXiv request parsed with ArxivFeedStream, so memory stays
+    bounded by one entry however many results are walked. Pages bypass the search cache and
+    single-flight (bulk walks would only evict interactive results) but each one goes
+    through make_api_request and therefore the shared rate limiter.
+
+    The page size adapts: it doubles after every full page up to max_page_size, so long walks
+    need few requests, and halves when a page fails with a timeout or server error, since
+    those are typically large pages arXiv could not produce in time.
+
+    Iteration stops at the end of the result set, after `limit` papers, or, for descending
+    date sorts, at the first paper older than `since`. `cursor` is the offset of the next
+    unread result and advances as papers are yielded; pass it back as `cursor` to resume.
+    Results that shift between pages because new papers were submitted meanwhile are
+    skipped rather than yielded twice.
+
+    Args:
+        query: The arXiv search query.
+        sort_by: The sorting criteria.
+        sort_order: The sorting order.
+        limit: Most papers to yield, or None for all.
+        since: For 'submittedDate'/'lastUpdatedDate' descending sorts, stop at papers
+            submitted/updated before this datetime (naive datetimes are taken as UTC).
+        cursor: Offset to start from, e.g. the cursor of an interrupted iterator.
+        page_size: Results requested by the first page.
+        max_page_size: Largest page requested.
+
+    Raises:
+        ValidationException: For invalid arguments.
+        ArxivAPIException, NetworkException or ParsingException if a page can't be fetched.
+    """
+
+    def __init__(self, query: str, sort_by: str = "submittedDate", sort_order: str = "descending",
+                 limit: Optional[int] = None, since: Optional[datetime] = None, cursor: int = 0,
+                 page_size: int = ITER_INITIAL_PAGE_SIZE, max_page_size: int = ITER_MAX_PAGE_SIZE):
+        if not query:
+            raise ValidationException("A search query is required.")
+        if cursor < 0 or (limit is not None and limit < 0) or not 0 < page_size <= max_page_size:
+            raise ValidationException("Cursor and limit must be non-negative and page sizes positive.")
+        if since is not None:
+            if sort_by not in _DATE_SORT_FIELDS or sort_order != "descending":
+                raise ValidationException("A date cutoff needs a descending 'submittedDate' or 'lastUpdatedDate' sort.")
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+        self.query = query
+        self.sort_by = sort_by
+        self.sort_order = sort_order
+        self.limit = limit
+        self.since = since
+        self.cursor = cursor
+        self.page_size = page_size
+        self.min_page_size = min(page_size, ITER_MIN_PAGE_SIZE)
+        self.max_page_size = max_page_size
+        self.total_results = None # Known after the first page
+        self.yielded = 0
+        self.pages_fetched = 0
+
+    def _next_page_size(self) -> int:
+        size = self.page_size
+        if self.limit is not None:
+            size = min(size, self.limit - self.yielded)
+        if self.total_results is not None:
+            size = min(size, self.total_results - self.cursor)
+        return size
+
+    def _open_page(self, size: int):
+        """Opens the streamed response for the page at the cursor, shrinking the page size on timeouts and server errors."""
+        while True:
+            query_url = construct_query_url(search_query=self.query, start=self.cursor, max_results=size,
+                                            sortBy=self.sort_by, sortOrder=self.sort_order)
             try:
-                # Ensure all required fields for ArxivPaper are present or have defaults
-                # The ArxivPaper dataclass might raise ValueError if required fields are missing
-                paper_obj = ArxivPaper(**paper_data)
-                papers.append(paper_obj)
-            except ValueError as ve:
-                logger.warning(f"Skipping entry due to validation error: {ve}. Data: {paper_data}")
-            except TypeError as te:
-                 logger.warning(f"Skipping entry due to TypeError (likely missing field for dataclass): {te}. Data: {paper_data}")
-
-        return {'papers': papers, 'total_results': total_results}
-
-    except ET.ParseError as e:
-        logger.error(f"Failed to parse XML string: {e}")
-        logger.error(f"Problematic XML snippet (first 500 chars): {xml_string[:500]}...")
-        raise ParsingException(f"Failed to parse XML response from arXiv.", original_exception=e)
-    except Exception as e: 
-        logger.error(f"An unexpected error occurred during XML parsing: {e}")
-        logger.error(f"Problematic XML snippet (first 500 chars): {xml_string[:500]}...")
-        raise ParsingException(f"An unexpected error occurred during XML parsing of arXiv data.", original_exception=e)
+                return make_api_request(query_url, stream=True)
+            except NetworkException as e:
+                if e.status_code == 429 or size <= self.min_page_size:
+                    raise
+                size = max(self.min_page_size, size // 2)
+                self.page_size = size
+                logger.warning(f"Page at {self.cursor} for '{self.query}' failed ({e}); retrying with page size {size}.")
+
+    def __iter__(self):
+        previous_page_ids = set()
+        empty_pages = 0
+        while self.limit is None or self.yielded < self.limit:
+            if self.total_results is not None and self.cursor >= self.total_results:
+                return
+            size = self._next_page_size()
+            page_start = self.cursor
+            response = self._open_page(size)
+            stream = ArxivFeedStream(response)
+            page_ids = set()
+            try:
+                for paper in stream:
+                    self.cursor = page_start + stream.entries_seen
+                    if self.since is not None and getattr(paper, _DATE_SORT_FIELDS[self.sort_by]) < self.since:
+                        logger.info(f"Reached the date cutoff for '{self.query}' at offset {self.cursor}.")
+                        return
+                    page_ids.add(paper.id_str)
+                    if paper.id_str in previous_page_ids:
+                        continue # Shifted onto this page by newly submitted papers
+                    self.yielded += 1
+                    yield paper
+                    if self.limit is not None and self.yielded >= self.limit:
+                        return
+            finally:
+                response.close()
+            self.pages_fetched += 1
+            self.cursor = page_start + stream.entries_seen
+            self.total_results = stream.total_results
+            previous_page_ids = page_ids
+
+            if stream.entries_seen == 0:
+                # arXiv occasionally returns an empty page in the middle of a result set
+                empty_pages += 1
+                if self.cursor >= self.total_results or empty_pages > ITER_EMPTY_PAGE_RETRIES:
+                    return
+                logger.warning(f"Empty page at {self.cursor} of {self.total_results} for '{self.query}'; retrying.")
+                continue
+            empty_pages = 0
+            if stream.entries_seen >= size:
+                self.page_size = min(self.page_size * 2, self.max_page_size)
+
+def iter_search_results(query: str, **kwargs) -> SearchResultIterator:
+    """
+    Returns an iterator over all results of `query`, fetched lazily page by page.
+    See SearchResultIterator for the keyword arguments (sorting, limit, since, cursor, page sizes).
+    """
+    return SearchResultIterator(query, **kwargs)
+
+# --- Async client ---
+# httpx.AsyncClient is bound to the event loop it was first used on, so keep one per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the pooled httpx.AsyncClient for the running event loop, creating it on first use.
+    Uses the same pool size, timeouts and headers as the synchronous session.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        pool_size = _http_settings['pool_size']
+        client = httpx.AsyncClient(
+            headers=_HTTP_HEADERS,
+            timeout=httpx.Timeout(_http_settings['read_timeout'], connect=_http_settings['connect_timeout']),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        _async_clients[loop] = client
+    return client
+
+async def close_async_client():
+    """Closes the running event loop's AsyncClient, if one was created."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+async def async_make_api_request(query_url: str) -> str:
+    """
+    Coroutine counterpart of make_api_request.
+
+    Waits on the same host-wide rate limiter and applies the same retry policy, but awaits
+    throttling and back-off instead of blocking the calling thread.
+
+    Args:
+        query_url: The URL to request.
+
+    Returns:
+        The API response text (XML).
+    Raises:
+        NetworkException: If the request times out after all retries, or for rate limit errors / server errors.
+        ArxivAPIException: If a client error (4xx, not 429) occurs.
+    """
+    client = get_async_client()
+    last_exception = None
+    for attempt in range(MAX_RETRIES):
+        try:
+            logger.info(f"Attempting to fetch URL asynchronously (attempt {attempt + 1}/{MAX_RETRIES}): {query_url}")
+            waited = await arxiv_rate_limiter.acquire_async()
+            if waited:
+                logger.info(f"Rate limiter delayed request by {waited:.2f} seconds.")
+            response = await client.get(query_url)
+            response.raise_for_status()
+            logger.info(f"Successfully fetched URL: {query_url}")
+            return response.text
+        except httpx.HTTPStatusError as e:
+            last_exception = e
+            status_code = e.response.status_code
+            logger.error(f"HTTP error occurred: {e} - Status code: {status_code}")
+            if status_code == 429:
+                if attempt == MAX_RETRIES - 1:
+                    raise NetworkException(message="arXiv API rate limit exceeded. Please try again later.", original_exception=e, status_code=429)
+                sleep_time = REQUEST_THROTTLE_SECONDS * (attempt + 2)
+                logger.warning(f"Rate limit likely hit. Backing off all workers for {sleep_time:.2f} seconds.")
+                arxiv_rate_limiter.penalize(sleep_time)
+            elif status_code >= 500:
+                if attempt == MAX_RETRIES - 1:
+                    raise NetworkException(message="arXiv API server error.", original_exception=e, status_code=status_code)
+                logger.warning(f"Server error ({status_code}). Retrying after a short delay...")
+            else: # Client-side errors (4xx other than 429)
+                logger.error(f"Client error ({status_code}). Not retrying.")
+                raise ArxivAPIException(message="Client error with arXiv API request.", original_exception=e, status_code=status_code)
+        except httpx.TimeoutException as e:
+            last_exception = e
+            logger.warning(f"Request timed out for {query_url}. Attempt {attempt + 1} of {MAX_RETRIES}.")
+            if attempt == MAX_RETRIES - 1:
+                raise NetworkException(message="Request to arXiv API timed out.", original_exception=e)
+        except httpx.HTTPError as e: # Connection errors and other transport failures
+            last_exception = e
+            logger.error(f"An unexpected request error occurred: {e}. Attempt {attempt + 1} of {MAX_RETRIES}.")
+            if attempt == MAX_RETRIES - 1:
+                raise NetworkException(f"A general network or request error occurred: {e}", original_exception=e)
+
+        if attempt < MAX_RETRIES - 1:
+            logger.info("Waiting before next retry...")
+            await asyncio.sleep(REQUEST_THROTTLE_SECONDS * (attempt + 1))
+
+    # Defensive fallback; the final attempt always raises above
+    raise NetworkException(f"All retries failed. Last error: {last_exception}", original_exception=last_exception)
+
+async def async_search_papers(query: str = None, ids: list = None, start_index: int = 0, count: int = 10, sort_by: str = "relevance", sort_order: str = "descending") -> Dict[str, Union[List[ArxivPaper], int]]:
+    """
+    Coroutine counterpart of search_papers.
+    Reads and fills the same search_cache entries as search_papers (see search_cache_key), so
+    results fetched here are served to synchronous callers and vice versa, with the same
+    soft/hard TTL and serve-stale rules. Outside an app context the cache is skipped.
+    Raises ArxivAPIException, NetworkException, ParsingException or ValidationException on failure.
+    """
+    cache_key = None
+    entry = None
+    if has_app_context():
+        cache_key = search_cache_key(query, ids, start_index, count, sort_by, sort_order)
+        entry = search_cache.lookup(cache_key)
+        if entry.state == REVALIDATING:
+            search_args = _normalize_search_args(query, ids, start_index, count, sort_by, sort_order)
+            flight_key = _search_flight_key(search_args)
+            search_cache.refresh_in_background(cache_key, search_flight.do, flight_key, _fetch_search_papers, *search_args)
+        if entry.state in (FRESH, REVALIDATING):
+            return entry.value
+
+    query_url = construct_query_url(
+        search_query=query,
+        id_list=ids,
+        start=start_index,
+        max_results=count,
+        sortBy=sort_by,
+        sortOrder=sort_order
+    )
+    try:
+        response_xml = await async_make_api_request(query_url)
+    except NetworkException as e:
+        if entry is not None and entry.state == STALE:
+            logger.warning(f"Async search refresh failed ({e}); serving result fetched {entry.age:.0f}s ago.")
+            return {**entry.value, 'stale': True}
+        raise
+    parsed_data = parse_arxiv_xml(response_xml)
+
+    logger.info(f"Successfully processed async search. Query='{query}', ids='{ids}', Found {len(parsed_data['papers'])} papers. Total results available: {parsed_data['total_results']}")
+    if cache_key is not None:
+        search_cache.store(cache_key, parsed_data)
+    return parsed_data
+
+def search_papers_concurrently(searches: List[dict]) -> list:
+    """
+    Runs several searches concurrently from synchronous code (e.g. the scheduler).
+
+    Args:
+        searches: One dict of async_search_papers keyword arguments per search.
+
+    Returns:
+        Results in the same order as `searches`; a failed search yields its exception instead.
+    Note:
+        Starts its own event loop, so it must not be called from a running loop; await
+        async_search_papers directly there.
+    """
+    async def gather_searches():
+        try:
+            return await asyncio.gather(*(async_search_papers(**search) for search in searches), return_exceptions=True)
+        finally:
+            await close_async_client()
+    if not searches:
+        return []
+    return asyncio.run(gather_searches())
 
 # Example usage (for testing during development)
 if __name__ == "__main__":
@@ -0,0 +1,579 @@
+# app/cache_backends.py
+
+"""
+Flask-Caching backends for running several gunicorn workers on one host.
+
+TieredCache (CACHE_TYPE = 'app.cache_backends.TieredCache') combines:
+  * L1, a per-process tier holding live objects, so hot entries are served without
+    unpickling: either MemoryLRUCache (bounded by entry count) or TinyLFUCache (bounded by
+    bytes, with frequency-aware admission; CACHE_L1_POLICY = 'tinylfu');
+  * L2, SQLiteCache: a SQLite database in WAL mode shared by every worker on the host,
+    so a result fetched by one worker is a cache hit for all the others.
+
+Reads go L1 -> L2, and an L2 hit is promoted into L1. Writes go to both tiers. L1 entries
+live at most CACHE_L1_MAX_TIMEOUT seconds, which bounds how long a worker can keep serving
+its own copy after another worker has replaced the shared entry. add() is decided by L2, so
+it stays an atomic "set if absent" across workers (the single-flight lock relies on this).
+
+TinyLFUCache can also be used on its own (CACHE_TYPE = 'app.cache_backends.TinyLFUCache',
+sized by CACHE_MAX_BYTES) as a single-process replacement for SimpleCache.
+"""
+
+import logging
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask_caching.backends.base import BaseCache
+
+from .state_db import StateDB
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_L2_PATH = os.path.join(tempfile.gettempdir(), 'arxiv_paper_search_cache.sqlite')
+PRUNE_EVERY_WRITES = 64 # L2 expiry/size pruning runs once per this many writes per process
+
+_L2_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache_entries ("
+    "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, stored_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS cache_entries_stored_at ON cache_entries (stored_at)",
+)
+
+
+def _expires_at(timeout):
+    """Converts a cachelib timeout (0 means never) into an absolute expiry time, or None."""
+    return time.time() + timeout if timeout else None
+
+
+class MemoryLRUCache(BaseCache):
+    """Per-process LRU cache bounded by entry count.
+
+    Values are stored as live objects and returned without copying, so callers must not
+    mutate what they get back.
+
+    Args:
+        max_entries: Entries kept before the least recently used one is evicted.
+        default_timeout: Timeout used when set() is called without one; 0 means never expire.
+    """
+
+    def __init__(self, max_entries=256, default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_entry(self, key):
+        """Returns (value, expires_at) for a live entry, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value, timeout=None, expires_at=None):
+        if expires_at is None:
+            expires_at = _expires_at(self._normalize_timeout(timeout))
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.time()):
+                return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def has(self, key):
+        return self.get_entry(key) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+class CountMinSketch:
+    """Approximate access counts for an unbounded key space in fixed memory.
+
+    Four rows of saturating 4-bit-range counters (0-15), as in TinyLFU. Once `sample_size`
+    increments have been recorded every counter is halved, so popularity fades over time
+    and yesterday's hot queries do not stay protected forever.
+    """
+    MAX_COUNT = 15
+    _SEEDS = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+    _MIX = 0x9E3779B97F4A7C15
+    _U64 = (1 << 64) - 1
+
+    def __init__(self, width=4096, sample_size=None):
+        self.width = 1 << max(4, (width - 1).bit_length()) # Power of two, so indexes are a mask
+        self._mask = self.width - 1
+        self._rows = [bytearray(self.width) for _ in self._SEEDS]
+        self.sample_size = sample_size or 10 * self.width
+        self._additions = 0
+
+    def _indexes(self, key):
+        h = hash(key)
+        return [((((h ^ seed) * self._MIX) & self._U64) >> 32) & self._mask for seed in self._SEEDS]
+
+    def increment(self, key):
+        for row, i in zip(self._rows, self._indexes(key)):
+            if row[i] < self.MAX_COUNT:
+                row[i] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key) -> int:
+        return min(row[i] for row, i in zip(self._rows, self._indexes(key)))
+
+    def _age(self):
+        for row in self._rows:
+            row[:] = bytes(count >> 1 for count in row)
+        self._additions //= 2
+
+    def clear(self):
+        for row in self._rows:
+            row[:] = bytes(self.width)
+        self._additions = 0
+
+
+def _estimate_size(key, value) -> int:
+    """Approximates an entry's footprint by the size of its pickled value."""
+    try:
+        value_size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        value_size = sys.getsizeof(value)
+    return value_size + len(key)
+
+
+class _SizedEntry:
+    __slots__ = ('value', 'expires_at', 'size', 'segment')
+
+    def __init__(self, value, expires_at, size):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.segment = None
+
+    def expired(self, now):
+        return self.expires_at is not None and self.expires_at <= now
+
+
+_WINDOW = 'window'
+_PROBATION = 'probation'
+_PROTECTED = 'protected'
+
+
+class TinyLFUCache(BaseCache):
+    """Per-process cache bounded by total bytes, with W-TinyLFU admission.
+
+    New entries go into a small LRU window (window_ratio of the budget). Entries leaving the
+    window are only admitted to the main segmented LRU if the count-min sketch says they are
+    accessed more often than the entries they would evict. A scan of one-off queries
+    therefore churns through the window without flushing popular entries from the main area.
+    The main area is split into probation and protected (protected_ratio) segments; an entry
+    is promoted to protected on its second hit.
+
+    Entry sizes are the pickled size of the value, measured once on set(). Values are stored
+    as live objects and returned without copying, so callers must not mutate them.
+
+    Args:
+        max_bytes: Total size budget.
+        window_ratio: Share of the budget used by the admission window.
+        protected_ratio: Share of the main area reserved for entries hit more than once.
+        default_timeout: Timeout used when set() is called without one; 0 means never expire.
+        sketch_width: Counters per sketch row; should be around the expected number of entries.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, window_ratio=0.01, protected_ratio=0.8, default_timeout=300,
+                 sketch_width=4096):
+        super().__init__(default_timeout=default_timeout)
+        if max_bytes <= 0:
+            raise ValueError("Cache max_bytes must be positive.")
+        self.max_bytes = max_bytes
+        self.window_max = max(1, int(max_bytes * window_ratio))
+        self.main_max = max_bytes - self.window_max
+        self.protected_max = int(self.main_max * protected_ratio)
+        self._segments = {_WINDOW: OrderedDict(), _PROBATION: OrderedDict(), _PROTECTED: OrderedDict()}
+        self._bytes = {_WINDOW: 0, _PROBATION: 0, _PROTECTED: 0}
+        self._index = {}
+        self._sketch = CountMinSketch(sketch_width)
+        self._lock = threading.Lock()
+        # Counters reported by stats()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._rejections = 0
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.setdefault('max_bytes', config.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+        return cls(*args, **kwargs)
+
+    def _insert(self, key, entry, segment):
+        entry.segment = segment
+        self._segments[segment][key] = entry
+        self._bytes[segment] += entry.size
+        self._index[key] = entry
+
+    def _remove(self, key, entry):
+        del self._segments[entry.segment][key]
+        self._bytes[entry.segment] -= entry.size
+        del self._index[key]
+
+    def get_entry(self, key):
+        """Returns (value, expires_at) for a live entry, or None. Every lookup counts as an access."""
+        with self._lock:
+            self._sketch.increment(key)
+            entry = self._index.get(key)
+            if entry is not None and entry.expired(time.time()):
+                self._remove(key, entry)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            if entry.segment == _PROBATION:
+                self._remove(key, entry)
+                self._insert(key, entry, _PROTECTED)
+                protected = self._segments[_PROTECTED]
+                while self._bytes[_PROTECTED] > self.protected_max:
+                    demoted_key, demoted = next(iter(protected.items()))
+                    self._remove(demoted_key, demoted)
+                    self._insert(demoted_key, demoted, _PROBATION)
+            else:
+                self._segments[entry.segment].move_to_end(key)
+            return entry.value, entry.expires_at
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value, timeout=None, expires_at=None):
+        """Stores `value`; returns False if it was not admitted (too large or too rarely used)."""
+        if expires_at is None:
+            expires_at = _expires_at(self._normalize_timeout(timeout))
+        entry = _SizedEntry(value, expires_at, _estimate_size(key, value))
+        with self._lock:
+            existing = self._index.get(key)
+            if existing is not None:
+                self._remove(key, existing)
+            if entry.size > self.max_bytes:
+                self._rejections += 1
+                return False
+            if entry.size > self.window_max:
+                return self._admit(key, entry)
+            self._insert(key, entry, _WINDOW)
+            window = self._segments[_WINDOW]
+            while self._bytes[_WINDOW] > self.window_max:
+                # The new entry is the most recent one, so only older entries leave the window
+                candidate_key, candidate = next(iter(window.items()))
+                self._remove(candidate_key, candidate)
+                self._admit(candidate_key, candidate)
+            return True
+
+    def _admit(self, key, candidate):
+        """Moves a candidate into the main area if it is used more often than what it would evict. Caller holds the lock."""
+        needed = self._bytes[_PROBATION] + self._bytes[_PROTECTED] + candidate.size - self.main_max
+        if needed <= 0:
+            self._insert(key, candidate, _PROBATION)
+            return True
+
+        now = time.time()
+        candidate_frequency = self._sketch.estimate(key)
+        victims = []
+        freed = 0
+        for segment in (_PROBATION, _PROTECTED):
+            for victim_key, victim in self._segments[segment].items():
+                if freed >= needed:
+                    break
+                victims.append((victim_key, victim))
+                freed += victim.size
+        if any(not victim.expired(now) and self._sketch.estimate(victim_key) >= candidate_frequency
+               for victim_key, victim in victims):
+            self._rejections += 1
+            return False
+        for victim_key, victim in victims:
+            self._remove(victim_key, victim)
+            self._evictions += 1
+        self._insert(key, candidate, _PROBATION)
+        return True
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and not entry.expired(time.time()):
+                return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return False
+            self._remove(key, entry)
+            return True
+
+    def has(self, key):
+        with self._lock:
+            entry = self._index.get(key)
+            return entry is not None and not entry.expired(time.time())
+
+    def clear(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.clear()
+            self._bytes = {_WINDOW: 0, _PROBATION: 0, _PROTECTED: 0}
+            self._index.clear()
+            self._sketch.clear()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'policy': 'w-tinylfu',
+                'bytes': sum(self._bytes.values()),
+                'max_bytes': self.max_bytes,
+                'entries': len(self._index),
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else None,
+                'evictions': self._evictions,
+                'admission_rejections': self._rejections,
+                'window_bytes': self._bytes[_WINDOW],
+                'probation_bytes': self._bytes[_PROBATION],
+                'protected_bytes': self._bytes[_PROTECTED],
+            }
+
+
+class SQLiteCache(BaseCache):
+    """Host-wide cache stored in a SQLite database shared by all worker processes.
+
+    Values are pickled. Backend errors are logged and treated as misses, so a broken cache
+    file degrades to uncached behaviour instead of failing requests.
+
+    Args:
+        path: Path of the SQLite file.
+        max_entries: Entries kept; when exceeded, the oldest-written entries are evicted.
+        default_timeout: Timeout used when set() is called without one; 0 means never expire.
+    """
+
+    def __init__(self, path=None, max_entries=10000, default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path or DEFAULT_L2_PATH
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # The cache can be rebuilt, so no fsync on every write; an unusable file means misses, not a private cache
+        self._db = StateDB(_L2_SCHEMA, 'L2 cache', timeout=5, synchronous='NORMAL', fallback=False)
+        self._writes = 0
+
+    def _connection(self):
+        """Returns this process's connection to the cache file. Caller holds self._lock."""
+        return self._db.connection(self.path)
+
+    def get_entry(self, key):
+        """Returns (value, expires_at) for a live entry, or None."""
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"L2 cache read failed for '{key}': {e}")
+            return None
+        if row is None:
+            return None
+        blob, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None # Removed by the next prune
+        try:
+            return pickle.loads(blob), expires_at
+        except Exception as e:
+            logger.warning(f"L2 cache entry '{key}' could not be unpickled: {e}")
+            return None
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def _write(self, sql, params):
+        """Runs a write statement and returns the number of changed rows (-1 on error)."""
+        try:
+            with self._lock:
+                conn = self._connection()
+                changed = conn.execute(sql, params).rowcount
+                self._writes += 1
+                if self._writes % PRUNE_EVERY_WRITES == 0:
+                    self._prune(conn)
+            return changed
+        except sqlite3.Error as e:
+            logger.warning(f"L2 cache write failed: {e}")
+            return -1
+
+    def _prune(self, conn):
+        """Drops expired entries, then the oldest ones beyond max_entries. Caller holds self._lock."""
+        conn.execute("DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        excess = conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN "
+                "(SELECT key FROM cache_entries ORDER BY stored_at LIMIT ?)", (excess,)
+            )
+
+    def set(self, key, value, timeout=None):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return self._write(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+            (key, blob, _expires_at(self._normalize_timeout(timeout)), time.time())
+        ) > 0
+
+    def add(self, key, value, timeout=None):
+        """Stores `value` only if `key` is absent or expired; atomic across processes."""
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        return self._write(
+            "INSERT INTO cache_entries (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+            "stored_at = excluded.stored_at WHERE cache_entries.expires_at IS NOT NULL AND cache_entries.expires_at <= ?",
+            (key, blob, _expires_at(self._normalize_timeout(timeout)), now, now)
+        ) > 0
+
+    def delete(self, key):
+        return self._write("DELETE FROM cache_entries WHERE key = ?", (key,)) > 0
+
+    def has(self, key):
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT 1 FROM cache_entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                    (key, time.time())
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"L2 cache read failed for '{key}': {e}")
+            return False
+        return row is not None
+
+    def clear(self):
+        return self._write("DELETE FROM cache_entries", ()) >= 0
+
+    def stats(self) -> dict:
+        try:
+            with self._lock:
+                entries = self._connection().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"L2 cache stats failed: {e}")
+            entries = None
+        return {'entries': entries, 'max_entries': self.max_entries, 'path': self.path}
+
+
+class TieredCache(BaseCache):
+    """Two-tier cache: a per-process L1 in front of a host-wide L2.
+
+    Args:
+        l1: The in-process tier.
+        l2: The shared tier.
+        l1_max_timeout: Upper bound in seconds for how long an entry lives in L1.
+        default_timeout: Timeout used when set() is called without one; 0 means never expire.
+    """
+
+    def __init__(self, l1, l2, l1_max_timeout=60, default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_max_timeout = l1_max_timeout
+        self._lock = threading.Lock()
+        # Per-process counters, reported by stats()
+        self._counters = {'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0, 'promotions': 0}
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        default_timeout = kwargs.get('default_timeout', config['CACHE_DEFAULT_TIMEOUT'])
+        if config.get('CACHE_L1_POLICY', 'lru') == 'tinylfu':
+            l1 = TinyLFUCache(max_bytes=config.get('CACHE_L1_MAX_BYTES', 32 * 1024 * 1024), default_timeout=default_timeout)
+        else:
+            l1 = MemoryLRUCache(max_entries=config.get('CACHE_L1_MAX_ENTRIES', 256), default_timeout=default_timeout)
+        l2 = SQLiteCache(path=config.get('CACHE_L2_PATH'), max_entries=config.get('CACHE_L2_MAX_ENTRIES', 10000),
+                         default_timeout=default_timeout)
+        return cls(l1, l2, l1_max_timeout=config.get('CACHE_L1_MAX_TIMEOUT', 60), default_timeout=default_timeout)
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _l1_expiry(self, expires_at):
+        """Caps an L2 expiry time at the L1 lifetime."""
+        l1_expires_at = time.time() + self.l1_max_timeout
+        return l1_expires_at if expires_at is None else min(expires_at, l1_expires_at)
+
+    def get(self, key):
+        entry = self.l1.get_entry(key)
+        if entry is not None:
+            self._count('l1_hits')
+            return entry[0]
+        self._count('l1_misses')
+        entry = self.l2.get_entry(key)
+        if entry is None:
+            self._count('l2_misses')
+            return None
+        self._count('l2_hits')
+        value, expires_at = entry
+        self.l1.set(key, value, expires_at=self._l1_expiry(expires_at))
+        self._count('promotions')
+        return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        stored = self.l2.set(key, value, timeout)
+        self.l1.set(key, value, expires_at=self._l1_expiry(_expires_at(timeout)))
+        return stored
+
+    def add(self, key, value, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        if not self.l2.add(key, value, timeout):
+            return False
+        self.l1.set(key, value, expires_at=self._l1_expiry(_expires_at(timeout)))
+        return True
+
+    def delete(self, key):
+        deleted_l1 = self.l1.delete(key)
+        return self.l2.delete(key) or deleted_l1
+
+    def has(self, key):
+        return self.l1.has(key) or self.l2.has(key)
+
+    def clear(self):
+        self.l1.clear()
+        return self.l2.clear()
+
+    def stats(self) -> dict:
+        """Returns per-tier hit/miss counters for this process and each tier's size."""
+        with self._lock:
+            counters = dict(self._counters)
+        return {**counters, 'l1': self.l1.stats(), 'l2': self.l2.stats()}
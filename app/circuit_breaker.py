@@ -0,0 +1,140 @@
+# app/circuit_breaker.py
+
+"""
+Per-process circuit breaker for an upstream service.
+
+Calls report their latency and whether they failed. Once enough recent calls are slow or
+failing the breaker opens and callers should use their fallback instead of the upstream.
+After a cooldown, a single probe call is let through: if it succeeds quickly the breaker
+closes again, otherwise it stays open for another cooldown.
+"""
+
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open' # Cooldown over; one probe call is in flight
+
+
+class CircuitBreaker:
+    """Opens when the recent error rate or median latency of an upstream exceeds a threshold.
+
+    Args:
+        name: Breaker name, used in log messages and metrics.
+        window: Number of recent calls considered.
+        min_calls: Calls needed in the window before the breaker can open.
+        error_threshold: Fraction of failed calls in the window that opens the breaker.
+        latency_threshold: Median call latency in seconds that opens the breaker.
+        cooldown: Seconds the breaker stays open before a probe call is allowed.
+        clock: Monotonic clock function, injectable for tests.
+    """
+
+    def __init__(self, name, window=20, min_calls=5, error_threshold=0.5, latency_threshold=10.0, cooldown=60.0,
+                 clock=time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.latency_threshold = latency_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls = deque(maxlen=window) # (latency, failed) per call
+        self._state = CLOSED
+        self._opened_at = None
+        self._probe_started_at = None
+        self._times_opened = 0
+        self._rejected = 0
+
+    def configure(self, window=None, min_calls=None, error_threshold=None, latency_threshold=None, cooldown=None):
+        """Updates the thresholds, e.g. from the Flask config in create_app."""
+        with self._lock:
+            if window is not None and window != self._calls.maxlen:
+                self._calls = deque(self._calls, maxlen=window)
+            if min_calls is not None:
+                self.min_calls = min_calls
+            if error_threshold is not None:
+                self.error_threshold = error_threshold
+            if latency_threshold is not None:
+                self.latency_threshold = latency_threshold
+            if cooldown is not None:
+                self.cooldown = cooldown
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Returns True if the upstream should be called, False if the caller should fall back."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            now = self._clock()
+            if self._state == OPEN and now - self._opened_at >= self.cooldown:
+                self._state = HALF_OPEN
+                self._probe_started_at = now
+                logger.info(f"Circuit '{self.name}': cooldown over, letting a probe call through.")
+                return True
+            if self._state == HALF_OPEN and now - self._probe_started_at >= self.cooldown:
+                self._probe_started_at = now # The probe never reported back; allow another
+                return True
+            self._rejected += 1
+            return False
+
+    def record(self, latency: float, failed: bool = False):
+        """Reports the outcome of one upstream call."""
+        with self._lock:
+            if self._state != CLOSED:
+                if failed or latency >= self.latency_threshold:
+                    self._open(f"probe call {'failed' if failed else f'took {latency:.1f}s'}")
+                else:
+                    self._state = CLOSED
+                    self._calls.clear()
+                    logger.info(f"Circuit '{self.name}': probe call succeeded; closed.")
+                return
+            self._calls.append((latency, failed))
+            if len(self._calls) < self.min_calls:
+                return
+            error_rate = sum(1 for _, call_failed in self._calls if call_failed) / len(self._calls)
+            median_latency = statistics.median(call_latency for call_latency, _ in self._calls)
+            if error_rate >= self.error_threshold:
+                self._open(f"{error_rate:.0%} of the last {len(self._calls)} calls failed")
+            elif median_latency >= self.latency_threshold:
+                self._open(f"median latency of the last {len(self._calls)} calls is {median_latency:.1f}s")
+
+    def _open(self, reason):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self._times_opened += 1
+        logger.warning(f"Circuit '{self.name}' opened: {reason}. Retrying upstream in {self.cooldown:.0f}s.")
+
+    def stats(self) -> dict:
+        """Returns this process's breaker state and counters."""
+        with self._lock:
+            latencies = [latency for latency, _ in self._calls]
+            return {
+                'name': self.name,
+                'state': self._state,
+                'window_calls': len(self._calls),
+                'window_errors': sum(1 for _, failed in self._calls if failed),
+                'window_median_latency': statistics.median(latencies) if latencies else None,
+                'times_opened': self._times_opened,
+                'rejected_calls': self._rejected,
+            }
+
+    def reset(self):
+        """Closes the breaker and clears its history (used by tests)."""
+        with self._lock:
+            self._calls.clear()
+            self._state = CLOSED
+            self._opened_at = None
+            self._probe_started_at = None
+            self._times_opened = 0
+            self._rejected = 0
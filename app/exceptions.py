@@ -27,6 +27,11 @@ class NetworkException(ArxivAPIException):
     def __init__(self, message="A network error occurred while contacting the arXiv API", original_exception=None, status_code=None):
         super().__init__(message, original_exception, status_code)
 
+class CircuitOpenException(NetworkException):
+    """Raised instead of contacting the arXiv API while its circuit breaker is open."""
+    def __init__(self, message="arXiv API circuit is open; not contacting arXiv", original_exception=None, status_code=None):
+        super().__init__(message, original_exception, status_code)
+
 class ParsingException(ArxivAPIException):
     """Raised for errors during parsing of arXiv API responses (e.g., malformed XML)."""
     def __init__(self, message="Error parsing data from the arXiv API", original_exception=None):
@@ -0,0 +1,106 @@
+# app/fragment_cache.py
+
+"""
+Cache of rendered HTML fragments for search results.
+
+Rendering a result page runs bleach and the highlighter over every title, abstract and author
+name. The output only depends on the paper version and the query, so it is kept in the app
+cache (the same backend as the data cache) at two levels:
+
+- paper cards (partials/paper_card.html), keyed by (id_str, updated_date, highlight terms);
+  their TTL is ARXIV_PAPER_CACHE_TTL, like resolved papers, since a paper version never changes.
+- the whole #search-results-block (partials/search_results.html), keyed by the page's search
+  ETag (query, page and result identity; see http_cache.search_etag), kept for
+  SEARCH_CACHE_HARD_TTL like the search results themselves.
+
+Both keys include the deploy fingerprint, so changed templates are never served from cache.
+FRAGMENT_CACHE_ENABLED = False renders everything directly.
+"""
+
+import hashlib
+import logging
+import threading
+
+from flask import current_app, render_template
+from markupsafe import Markup
+
+from .extensions import cache
+
+logger = logging.getLogger(__name__)
+
+CARD_KEY_PREFIX = 'fragment:card:'
+RESULTS_KEY_PREFIX = 'fragment:results:'
+_CARD_INDEX_PLACEHOLDER = '\x00card-index\x00' # Cards are cached position-independent; the index is filled in per page
+
+_lock = threading.Lock()
+_counters = {'card_hits': 0, 'card_misses': 0, 'results_hits': 0, 'results_misses': 0}
+
+
+def _count(name):
+    with _lock:
+        _counters[name] += 1
+
+
+def _enabled() -> bool:
+    return current_app.config.get('FRAGMENT_CACHE_ENABLED', True)
+
+
+def _fingerprint() -> str:
+    return current_app.extensions.get('http_cache', {}).get('fingerprint', '')
+
+
+def highlight_terms_key(query) -> str:
+    """The part of the query the highlight filter uses: its lowercased terms, in order."""
+    return ' '.join((query or '').lower().split())
+
+
+def card_key(paper, query) -> str:
+    updated = paper.updated_date.isoformat() if paper.updated_date else ''
+    identity = f"{_fingerprint()}\0{paper.id_str}\0{updated}\0{highlight_terms_key(query)}"
+    return CARD_KEY_PREFIX + hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]
+
+
+def render_paper_card(paper, query, card_index) -> Markup:
+    """Renders one paper card, from the cache when this paper version was rendered for the same terms. Template global."""
+    if not _enabled():
+        return Markup(render_template('partials/paper_card.html', paper=paper, query=query, card_index=card_index))
+    key = card_key(paper, query)
+    html = cache.get(key)
+    if html is None:
+        _count('card_misses')
+        html = render_template('partials/paper_card.html', paper=paper, query=query, card_index=_CARD_INDEX_PLACEHOLDER)
+        cache.set(key, html, timeout=current_app.config.get('ARXIV_PAPER_CACHE_TTL'))
+    else:
+        _count('card_hits')
+    return Markup(html.replace(_CARD_INDEX_PLACEHOLDER, str(card_index)))
+
+
+def render_results_block(etag: str, **context) -> Markup:
+    """
+    Renders partials/search_results.html for a successful search, or returns the copy cached
+    under the page's search ETag.
+    """
+    if not _enabled():
+        return Markup(render_template('partials/search_results.html', **context))
+    key = RESULTS_KEY_PREFIX + etag
+    html = cache.get(key)
+    if html is None:
+        _count('results_misses')
+        html = render_template('partials/search_results.html', **context)
+        cache.set(key, html, timeout=current_app.config.get('SEARCH_CACHE_HARD_TTL'))
+    else:
+        _count('results_hits')
+    return Markup(html)
+
+
+def stats() -> dict:
+    """Hit and miss counts of this process, for /admin/metrics."""
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    """Clears the counters (used by tests)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
@@ -0,0 +1,152 @@
+# app/http_cache.py
+
+"""
+HTTP caching for search pages and static assets.
+
+Search responses (/search and /api/search) get a strong ETag computed from what the page
+shows: the query, page, the result set's identity (total count, paper IDs and versions,
+stale/local flags) and a fingerprint of the templates and static files, so a deploy changes
+every ETag. The ETag is computed from the (cached) results before anything is rendered,
+and a matching If-None-Match is answered with an empty 304. Cache-Control lets browsers and
+proxies reuse a page for SEARCH_CACHE_SOFT_TTL seconds, the time the server itself treats
+the results as fresh; degraded (stale or local-index) pages must be revalidated every time.
+
+Static files are linked with a content hash (`url_for('static', ...)` adds ?v=<hash>), and
+responses requested with the current hash are cacheable for a year and marked immutable.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import Optional
+
+from flask import Response, current_app, request
+
+logger = logging.getLogger(__name__)
+
+STATIC_MAX_AGE = 365 * 24 * 3600 # Seconds content-hashed static URLs may be cached
+STATIC_HASH_LENGTH = 12 # Hex digits of the SHA-256 content hash in static URLs
+
+_lock = threading.Lock()
+_static_digests = {} # path -> (mtime_ns, size, digest)
+
+
+def _file_digest(path: str) -> Optional[str]:
+    """SHA-256 of a file's content, recomputed only when its mtime or size changes."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    with _lock:
+        cached = _static_digests.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:STATIC_HASH_LENGTH]
+    with _lock:
+        _static_digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def static_digest(filename: str) -> Optional[str]:
+    """Content hash of a file in the app's static folder, or None if it doesn't exist."""
+    static_folder = current_app.static_folder
+    path = os.path.abspath(os.path.join(static_folder, filename))
+    if not path.startswith(os.path.abspath(static_folder) + os.sep):
+        return None
+    return _file_digest(path)
+
+
+def _deploy_fingerprint(app) -> str:
+    """Hash of every template and static file, so search ETags change when the page markup does."""
+    digest = hashlib.sha256()
+    for folder in (os.path.join(app.root_path, app.template_folder or 'templates'), app.static_folder):
+        if not folder or not os.path.isdir(folder):
+            continue
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, folder).encode('utf-8'))
+                digest.update((_file_digest(path) or '').encode('ascii'))
+    return digest.hexdigest()[:16]
+
+
+def search_etag(query: str, page: int, results_per_page: int, results: dict, variant: str = 'html') -> str:
+    """
+    Strong ETag for one search page: changes whenever the page's content could.
+
+    Args:
+        results: The page as returned by the search helpers ('papers', 'total_results', 'stale', 'local').
+        variant: Representation the ETag is for ('html' or 'json').
+    """
+    digest = hashlib.sha256()
+    fingerprint = current_app.extensions.get('http_cache', {}).get('fingerprint', '')
+    header = (variant, fingerprint, query, page, results_per_page, results['total_results'],
+              bool(results.get('stale')), bool(results.get('local')))
+    digest.update(repr(header).encode('utf-8'))
+    for paper in results['papers']:
+        updated = paper.updated_date.isoformat() if paper.updated_date else ''
+        digest.update(f"\0{paper.id_str}\0{updated}".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def search_max_age(results: dict) -> int:
+    """Seconds a search page may be reused: the search cache's soft TTL, or 0 for degraded results."""
+    if results.get('stale') or results.get('local'):
+        return 0
+    return int(current_app.config.get('SEARCH_CACHE_SOFT_TTL', 300))
+
+
+def apply_cache_headers(response: Response, etag: str, max_age: int) -> Response:
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if max_age == 0:
+        response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag: str, max_age: int) -> Optional[Response]:
+    """An empty 304 if the request's If-None-Match holds `etag`, else None."""
+    if not request.if_none_match.contains(etag):
+        return None
+    return apply_cache_headers(Response(status=304), etag, max_age)
+
+
+def _static_cache_headers(response: Response) -> Response:
+    """Long-lived immutable caching for static files requested with their current content hash."""
+    filename = (request.view_args or {}).get('filename')
+    version = request.args.get('v')
+    if version and filename and response.status_code in (200, 304) and version == static_digest(filename):
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.no_cache = None
+        response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    """Adds content hashes to static URLs and caching headers to static responses."""
+    app.extensions['http_cache'] = {'fingerprint': _deploy_fingerprint(app)}
+
+    @app.url_defaults
+    def _hash_static_urls(endpoint: str, values: dict):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            digest = static_digest(values['filename'])
+            if digest:
+                values['v'] = digest
+
+    @app.after_request
+    def _static_caching(response):
+        if request.endpoint == 'static':
+            return _static_cache_headers(response)
+        return response
+
+
+def reset():
+    """Forgets the cached file hashes (used by tests)."""
+    with _lock:
+        _static_digests.clear()
+
@@ -0,0 +1,204 @@
+# app/ingest.py
+
+"""
+Bulk loader for arXiv metadata snapshots (the JSON-lines dump published on Kaggle).
+
+Streams the snapshot into the paper store, and through its triggers into the local
+full-text index, so most searches can be answered without calling arXiv:
+
+    python -m app.ingest arxiv-metadata-oai-snapshot.json.gz --workers 4
+
+Lines are read lazily (plain or gzip-compressed) and handed to worker processes in batches;
+at most a few batches are in flight at a time, so memory stays bounded whatever the size
+of the input. Each parsed batch is written in its own transaction. Re-ingesting a newer
+snapshot is incremental: a paper is only written when its `update_date` is newer than the
+newest version already stored for it.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from . import paper_index, paper_store
+from .models import ArxivPaper
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 2000 # Snapshot lines per parse job and per write transaction
+MAX_PENDING_PER_WORKER = 2 # Batches queued per worker process; bounds memory use
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _clean(text: Optional[str]) -> Optional[str]:
+    """Collapses the hard line breaks the snapshot keeps in titles and abstracts."""
+    return _WHITESPACE_RE.sub(' ', text).strip() if text else text
+
+
+def _authors(record: dict) -> List[str]:
+    parsed = record.get('authors_parsed')
+    if parsed:
+        # [last, first, suffix] -> 'First Last Suffix', as the Atom feed spells names
+        return [' '.join(part for part in (name[1], name[0], *name[2:]) if part) for name in parsed if name]
+    return [name.strip() for name in re.split(r',| and ', record.get('authors') or '') if name.strip()]
+
+
+def _version_date(version: dict) -> Optional[datetime]:
+    try:
+        return parsedate_to_datetime(version['created']).astimezone(timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def paper_from_snapshot_record(record: dict) -> ArxivPaper:
+    """
+    Builds an ArxivPaper from one snapshot record.
+
+    The ID carries the latest version suffix, like IDs parsed from the feed; the updated date
+    is the record's `update_date` (midnight UTC) and the published date that of version 1.
+
+    Raises:
+        ValueError, KeyError or TypeError for records missing required fields.
+    """
+    versions = record.get('versions') or []
+    arxiv_id = record['id']
+    if versions and versions[-1].get('version'):
+        arxiv_id += versions[-1]['version']
+    updated = datetime.strptime(record['update_date'], '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    published = (_version_date(versions[0]) if versions else None) or updated
+    categories = (record.get('categories') or '').split()
+    return ArxivPaper(
+        id_str=arxiv_id,
+        title=_clean(record.get('title')),
+        summary=_clean(record.get('abstract')),
+        published_date=published,
+        updated_date=updated,
+        authors=_authors(record),
+        categories=categories,
+        primary_category=categories[0] if categories else None,
+        pdf_link=f"http://arxiv.org/pdf/{arxiv_id}.pdf",
+        doi=record.get('doi') or None
+    )
+
+
+def parse_snapshot_lines(lines: List[bytes]) -> Tuple[List[ArxivPaper], int]:
+    """Parses a batch of snapshot lines (run in the worker processes). Returns (papers, invalid line count)."""
+    papers = []
+    invalid = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            papers.append(paper_from_snapshot_record(json.loads(line)))
+        except (ValueError, KeyError, TypeError):
+            invalid += 1
+    return papers, invalid
+
+
+def _read_batches(raw_file, batch_size: int, progress) -> Iterator[List[bytes]]:
+    """Yields batches of raw lines, advancing `progress` by the (compressed) bytes consumed."""
+    source = gzip.GzipFile(fileobj=raw_file) if raw_file.read(2) == b'\x1f\x8b' else raw_file
+    raw_file.seek(0)
+    batch = []
+    position = 0
+    for line in source:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+            progress.update(raw_file.tell() - position)
+            position = raw_file.tell()
+    if batch:
+        yield batch
+    progress.update(raw_file.tell() - position)
+
+
+def _parsed_batches(batches: Iterable[List[bytes]], workers: int) -> Iterator[Tuple[List[ArxivPaper], int]]:
+    """Parses batches in order, across `workers` processes with a bounded number of batches in flight."""
+    if workers <= 1:
+        for batch in batches:
+            yield parse_snapshot_lines(batch)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(parse_snapshot_lines, batch))
+            if len(pending) >= workers * MAX_PENDING_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _write_changed(papers: List[ArxivPaper]) -> int:
+    """Writes the papers whose update_date is newer than any stored version. Returns the number written."""
+    stored_dates = paper_store.latest_updated_dates(paper_store.base_id(paper.id_str) for paper in papers)
+    changed = []
+    for paper in papers:
+        stored = stored_dates.get(paper_store.base_id(paper.id_str))
+        if stored is None or paper.updated_date.replace(tzinfo=None) > stored:
+            changed.append(paper)
+    return paper_store.store_papers(changed)
+
+
+def ingest_snapshot(path: str, batch_size: int = DEFAULT_BATCH_SIZE, workers: Optional[int] = None,
+                    show_progress: bool = True) -> dict:
+    """
+    Streams a JSON-lines arXiv metadata snapshot (optionally gzip-compressed) into the paper store.
+    Requires an app context.
+
+    Args:
+        path: Snapshot file.
+        batch_size: Lines per parse job and per write transaction.
+        workers: Parser processes (defaults to the CPU count; 1 parses in this process).
+        show_progress: Show a progress bar on stderr.
+
+    Returns:
+        Counters: 'lines' read, 'papers' parsed, 'invalid' records, 'written' and 'unchanged' papers.
+    """
+    workers = workers or os.cpu_count() or 1
+    counts = {'lines': 0, 'papers': 0, 'invalid': 0, 'written': 0, 'unchanged': 0}
+    with open(path, 'rb') as raw_file, tqdm(total=os.path.getsize(path), unit='B', unit_scale=True,
+                                             desc='Ingesting', disable=not show_progress) as progress:
+        for papers, invalid in _parsed_batches(_read_batches(raw_file, batch_size, progress), workers):
+            written = _write_changed(papers)
+            counts['lines'] += len(papers) + invalid
+            counts['papers'] += len(papers)
+            counts['invalid'] += invalid
+            counts['written'] += written
+            counts['unchanged'] += len(papers) - written
+            progress.set_postfix(papers=counts['papers'], written=counts['written'], refresh=False)
+    logger.info(f"Ingested {path}: {counts}")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load an arXiv metadata snapshot (JSON lines, optionally .gz) into the local paper store.")
+    parser.add_argument('path', help='Snapshot file, e.g. arxiv-metadata-oai-snapshot.json or .json.gz')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Lines per parse job and write transaction')
+    parser.add_argument('--workers', type=int, default=None, help='Parser processes (default: CPU count)')
+    parser.add_argument('--no-progress', action='store_true', help='Disable the progress bar')
+    parser.add_argument('--build-index', action='store_true', help='Rebuild the memory-mapped paper index afterwards')
+    args = parser.parse_args(argv)
+
+    from . import create_app # Imported here so worker processes don't build an app
+    app = create_app(os.getenv('FLASK_CONFIG', 'default'))
+    with app.app_context():
+        counts = ingest_snapshot(args.path, batch_size=args.batch_size, workers=args.workers,
+                                 show_progress=not args.no_progress)
+        if args.build_index:
+            paper_index.build_index(app.config['PAPER_INDEX_PATH'])
+    print(f"{counts['papers']} papers parsed ({counts['invalid']} invalid lines); "
+          f"{counts['written']} written, {counts['unchanged']} unchanged.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# app/llm_client.py
+
+"""
+The OpenAI client shared by every summarization call site in a worker process, and the
+host-wide governor in front of it.
+
+get_client() builds one client per process on first use, with an httpx connection pool sized
+by OPENAI_HTTP_POOL_SIZE, so completions reuse keep-alive TLS connections instead of opening
+a new pool per request. A client inherited across fork() is discarded, and a changed
+OPENAI_API_KEY or OPENAI_BASE_URL builds a new one. The client doesn't retry by itself
+(max_retries=0): callers retry, and every attempt goes through llm_governor, which caps
+in-flight requests and tokens per minute across the host (see app/llm_governor.py).
+
+    with llm_governor.request(estimate_tokens(messages, max_tokens), timeout=...) as lease:
+        response = get_client().chat.completions.create(...)
+        lease.used_tokens = response_tokens(response)
+"""
+
+import atexit
+import logging
+import os
+import threading
+from typing import List, Optional
+
+import httpx
+from openai import OpenAI, RateLimitError
+
+from .llm_governor import LLMGovernor
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_SIZE = 20 # Connections pooled per worker process (also the most concurrent requests it can make)
+CONNECT_TIMEOUT_SECONDS = 5
+READ_TIMEOUT_SECONDS = 60 # A long completion is one slow read
+QUEUE_TIMEOUT_SECONDS = 30 # Default wait for the governor when the caller has no deadline of its own
+BATCH_QUEUE_TIMEOUT_SECONDS = 600 # Default wait of batch (newsletter) requests, which only get spare capacity
+CHARS_PER_TOKEN = 4 # Rough prompt size estimate; corrected with the reported usage
+
+llm_governor = LLMGovernor('openai', rate_limit_errors=(RateLimitError,))
+
+_http_settings = {
+    'pool_size': HTTP_POOL_SIZE,
+    'connect_timeout': CONNECT_TIMEOUT_SECONDS,
+    'read_timeout': READ_TIMEOUT_SECONDS
+}
+_client = None
+_client_identity = None
+_client_lock = threading.Lock()
+_shutdown_hook_registered = False
+
+
+def init_app(app):
+    """Configures the governor and the client's pool and timeouts from the Flask app config."""
+    global _shutdown_hook_registered
+    llm_governor.configure(
+        max_in_flight=app.config.get('LLM_MAX_IN_FLIGHT'),
+        min_in_flight=app.config.get('LLM_MIN_IN_FLIGHT'),
+        tokens_per_minute=app.config.get('LLM_TOKENS_PER_MINUTE'),
+        state_path=app.config.get('RATE_LIMIT_STATE_PATH'),
+        batch_reserved_slots=app.config.get('LLM_BATCH_RESERVED_SLOTS')
+    )
+    new_settings = {
+        'pool_size': app.config.get('OPENAI_HTTP_POOL_SIZE', HTTP_POOL_SIZE),
+        'connect_timeout': app.config.get('OPENAI_CONNECT_TIMEOUT', CONNECT_TIMEOUT_SECONDS),
+        'read_timeout': app.config.get('OPENAI_READ_TIMEOUT', READ_TIMEOUT_SECONDS)
+    }
+    if new_settings != _http_settings:
+        _http_settings.update(new_settings)
+        close_client() # Rebuilt with the new pool on next use
+    if not _shutdown_hook_registered:
+        atexit.register(close_client)
+        _shutdown_hook_registered = True
+
+
+def get_client() -> Optional[OpenAI]:
+    """Returns this process's OpenAI client, creating it on first use, or None if OPENAI_API_KEY is not set."""
+    global _client, _client_identity
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    identity = (os.getpid(), api_key, os.getenv("OPENAI_BASE_URL"))
+    with _client_lock:
+        if _client is None or _client_identity != identity:
+            # A replaced client is left to the garbage collector: other threads may still be using it
+            timeout = httpx.Timeout(_http_settings['read_timeout'], connect=_http_settings['connect_timeout'])
+            http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=_http_settings['pool_size'],
+                                    max_keepalive_connections=_http_settings['pool_size']),
+                timeout=timeout
+            )
+            _client = OpenAI(api_key=api_key, max_retries=0, timeout=timeout, http_client=http_client)
+            _client_identity = identity
+        return _client
+
+
+def close_client():
+    """Closes the pooled client's connections. Registered as an exit hook by init_app()."""
+    global _client, _client_identity
+    with _client_lock:
+        if _client is not None and _client_identity[0] == os.getpid():
+            _client.close()
+            logger.info("Closed pooled OpenAI client.")
+        _client = None
+        _client_identity = None
+
+
+def estimate_tokens(messages: List[dict], max_tokens: int) -> int:
+    """
+    Tokens a chat completion may count against the per-minute budget: a rough prompt size plus
+    max_tokens, which is also what the API reserves before the completion is generated.
+    """
+    prompt_chars = sum(len(message.get('content') or '') for message in messages)
+    return prompt_chars // CHARS_PER_TOKEN + 4 * len(messages) + max_tokens
+
+
+def response_tokens(response) -> Optional[int]:
+    """The total tokens a completion reported using, or None if it didn't say."""
+    usage = getattr(response, 'usage', None)
+    return getattr(usage, 'total_tokens', None)
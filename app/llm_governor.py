@@ -0,0 +1,402 @@
+# app/llm_governor.py
+
+"""
+Host-wide admission control for LLM requests, shared by every worker process.
+
+Every request needs two things before it is sent:
+
+- a concurrency slot. At most `limit` requests are in flight on the host; each one holds a
+  lease row in the shared SQLite state file while it runs, and leases left behind by a
+  crashed worker expire after lease_ttl seconds. The limit adapts AIMD-style: it is halved
+  (at most once per decrease_interval, so one burst of 429s counts once) when the upstream
+  answers with a rate-limit error, and grows by 1/limit per successful request, back up to
+  max_in_flight.
+- tokens from a tokens-per-minute budget: a TokenBucketRateLimiter charged with the
+  request's estimated tokens up front, then corrected with the reported usage. Rate-limited
+  responses also empty the bucket for their Retry-After, so every worker backs off.
+
+Requests come in two priority classes. INTERACTIVE requests (a user waiting on a summary)
+are admitted as described above, and register as waiting in the state file while they queue.
+BATCH requests (the newsletter) only fill spare capacity: they are admitted only while no
+interactive request on the host is waiting, leave batch_reserved_slots of the concurrency
+limit free, and only take tokens the bucket holds right now instead of borrowing ahead of
+interactive callers. Batch work admits one request (one paper) at a time, so it is preempted
+between papers whenever interactive work shows up.
+
+Callers wait in acquire() until they are admitted, or get GovernorTimeout once their timeout
+has passed. Wait times are recorded per class in histograms (see stats()).
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from .rate_limiter import DEFAULT_STATE_PATH, TokenBucketRateLimiter
+from .state_db import StateDB
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKOFF_SECONDS = 1.0 # Host-wide pause after a rate-limit error without Retry-After
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PRIORITIES = (INTERACTIVE, BATCH)
+WAIT_HISTOGRAM_BOUNDS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0) # Seconds; plus +Inf
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS llm_governor_state ("
+    "name TEXT PRIMARY KEY, concurrency_limit REAL NOT NULL, decreased_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS llm_governor_leases ("
+    "id TEXT PRIMARY KEY, name TEXT NOT NULL, pid INTEGER NOT NULL, expires_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS llm_governor_waiters ("
+    "id TEXT PRIMARY KEY, name TEXT NOT NULL, priority TEXT NOT NULL, expires_at REAL NOT NULL)",
+)
+
+
+class GovernorTimeout(Exception):
+    """Raised when a request could not be admitted before its timeout."""
+
+
+def retry_after_seconds(error, default=DEFAULT_BACKOFF_SECONDS) -> float:
+    """The Retry-After of an HTTP error's response, or `default` if it has none."""
+    response = getattr(error, 'response', None)
+    try:
+        return max(0.0, float(response.headers.get('retry-after')))
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+class Lease:
+    """An admitted request. Set used_tokens once the response reports its usage."""
+    __slots__ = ('id', 'estimated_tokens', 'used_tokens', 'acquired_at')
+
+    def __init__(self, lease_id, estimated_tokens, acquired_at):
+        self.id = lease_id
+        self.estimated_tokens = estimated_tokens
+        self.used_tokens = None
+        self.acquired_at = acquired_at
+
+
+class LLMGovernor:
+    """Caps in-flight requests and tokens per minute across the host's workers.
+
+    Args:
+        name: Governor name; several governors can share one state file.
+        max_in_flight: Most requests in flight on the host (the AIMD ceiling).
+        min_in_flight: The AIMD floor.
+        tokens_per_minute: Token budget per minute (also the burst size).
+        state_path: Path of the SQLite state file. ':memory:' keeps the governor process-local.
+        lease_ttl: Seconds after which a lease is considered abandoned.
+        decrease_interval: Least seconds between two multiplicative decreases.
+        poll_interval: Seconds between attempts to get a concurrency slot.
+        batch_reserved_slots: Concurrency slots batch requests leave to interactive ones (batch always gets at least one).
+        rate_limit_errors: Exception types that count as rate-limit responses.
+        clock: Wall-clock function, injectable for tests.
+        sleep: Sleep function, injectable for tests. Defaults to time.sleep.
+    """
+
+    def __init__(self, name, max_in_flight=8, min_in_flight=1, tokens_per_minute=90000, state_path=None,
+                 lease_ttl=120.0, decrease_interval=1.0, poll_interval=0.05, batch_reserved_slots=1,
+                 rate_limit_errors=(), clock=time.time, sleep=None):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.min_in_flight = min_in_flight
+        self.lease_ttl = lease_ttl
+        self.decrease_interval = decrease_interval
+        self.poll_interval = poll_interval
+        self.batch_reserved_slots = batch_reserved_slots
+        self.rate_limit_errors = tuple(rate_limit_errors)
+        self.state_path = state_path or DEFAULT_STATE_PATH
+        self._clock = clock
+        self._sleep = sleep
+        self.tokens = TokenBucketRateLimiter(f"{name}_tokens", rate=tokens_per_minute / 60.0, capacity=tokens_per_minute,
+                                             state_path=self.state_path, clock=clock, sleep=sleep)
+        self._lock = threading.Lock()
+        self._db = StateDB(_SCHEMA, 'LLM governor')
+        # Per-process counters, reported by stats()
+        self._counters = {'succeeded': 0, 'rate_limited': 0, 'failed': 0}
+        self._classes = {priority: self._new_class_counters() for priority in PRIORITIES}
+        self._total_latency = self._max_latency = 0.0
+
+    @staticmethod
+    def _new_class_counters():
+        return {'waiting': 0, 'admitted': 0, 'timeouts': 0, 'total_wait': 0.0, 'max_wait': 0.0,
+                'wait_histogram': [0] * (len(WAIT_HISTOGRAM_BOUNDS) + 1)}
+
+    def configure(self, max_in_flight=None, min_in_flight=None, tokens_per_minute=None, state_path=None, lease_ttl=None,
+                  batch_reserved_slots=None):
+        """Updates the governor parameters, e.g. from the Flask config in create_app."""
+        with self._lock:
+            if batch_reserved_slots is not None:
+                self.batch_reserved_slots = max(0, int(batch_reserved_slots))
+            if max_in_flight is not None:
+                self.max_in_flight = max(1, int(max_in_flight))
+            if min_in_flight is not None:
+                self.min_in_flight = max(1, int(min_in_flight))
+            if lease_ttl is not None:
+                self.lease_ttl = float(lease_ttl)
+            if state_path:
+                self.state_path = state_path
+        if tokens_per_minute is not None:
+            self.tokens.configure(rate=tokens_per_minute / 60.0, capacity=tokens_per_minute)
+        if state_path:
+            self.tokens.configure(state_path=state_path)
+
+    def _connection(self):
+        """Returns this process's connection to the state file. Caller holds self._lock."""
+        return self._db.connection(self.state_path)
+
+    def _transaction(self, body):
+        """Runs body(conn, now) in an IMMEDIATE transaction and returns its result."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = body(conn, self._clock())
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return result
+
+    def _limit(self, conn):
+        """Returns the stored (concurrency limit, time of the last decrease), clamped to the current bounds."""
+        row = conn.execute(
+            "SELECT concurrency_limit, decreased_at FROM llm_governor_state WHERE name = ?", (self.name,)
+        ).fetchone()
+        limit, decreased_at = row if row is not None else (float(self.max_in_flight), 0.0)
+        return min(float(self.max_in_flight), max(float(self.min_in_flight), limit)), decreased_at
+
+    def _in_flight(self, conn, now):
+        conn.execute("DELETE FROM llm_governor_leases WHERE name = ? AND expires_at < ?", (self.name, now))
+        return conn.execute("SELECT COUNT(*) FROM llm_governor_leases WHERE name = ?", (self.name,)).fetchone()[0]
+
+    def _interactive_waiting(self, conn, now):
+        conn.execute("DELETE FROM llm_governor_waiters WHERE name = ? AND expires_at < ?", (self.name, now))
+        return conn.execute("SELECT COUNT(*) FROM llm_governor_waiters WHERE name = ? AND priority = ?",
+                            (self.name, INTERACTIVE)).fetchone()[0]
+
+    def _try_lease(self, lease_id, priority=INTERACTIVE) -> bool:
+        def body(conn, now):
+            limit, _ = self._limit(conn)
+            slots = math.floor(limit)
+            if priority == BATCH:
+                if self._interactive_waiting(conn, now):
+                    return False
+                slots = max(1, slots - self.batch_reserved_slots)
+            if self._in_flight(conn, now) >= slots:
+                return False
+            conn.execute("INSERT INTO llm_governor_leases (id, name, pid, expires_at) VALUES (?, ?, ?, ?)",
+                         (lease_id, self.name, os.getpid(), now + self.lease_ttl))
+            return True
+        return self._transaction(body)
+
+    def _drop_lease(self, lease_id):
+        self._transaction(lambda conn, now: conn.execute("DELETE FROM llm_governor_leases WHERE id = ?", (lease_id,)))
+
+    def _register_waiter(self, priority, give_up_at) -> str:
+        """Announces a queued request to every worker until it is admitted (or its wait would have ended)."""
+        waiter_id = uuid.uuid4().hex
+        def body(conn, now):
+            expires_at = give_up_at if give_up_at is not None else now + self.lease_ttl
+            conn.execute("INSERT INTO llm_governor_waiters (id, name, priority, expires_at) VALUES (?, ?, ?, ?)",
+                         (waiter_id, self.name, priority, expires_at))
+        self._transaction(body)
+        return waiter_id
+
+    def _unregister_waiter(self, waiter_id):
+        self._transaction(lambda conn, now: conn.execute("DELETE FROM llm_governor_waiters WHERE id = ?", (waiter_id,)))
+
+    def acquire(self, estimated_tokens, timeout=None, priority=INTERACTIVE) -> Lease:
+        """Waits for a concurrency slot and `estimated_tokens` of the token budget.
+
+        Args:
+            estimated_tokens: Tokens to charge to the per-minute budget.
+            timeout: Seconds to wait at most (None waits indefinitely).
+            priority: INTERACTIVE, or BATCH to only use spare capacity.
+        Raises:
+            GovernorTimeout if the request could not be admitted within `timeout` seconds.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown LLM request priority '{priority}'.")
+        started = self._clock()
+        give_up_at = started + timeout if timeout is not None else None
+        counters = self._classes[priority]
+        with self._lock:
+            counters['waiting'] += 1
+        try:
+            if priority == BATCH:
+                lease_id = self._acquire_batch(estimated_tokens, give_up_at)
+            else:
+                waiter_id = self._register_waiter(priority, give_up_at)
+                try:
+                    lease_id = self._acquire_interactive(estimated_tokens, started, give_up_at)
+                finally:
+                    self._unregister_waiter(waiter_id)
+        finally:
+            with self._lock:
+                counters['waiting'] -= 1
+        now = self._clock()
+        wait = now - started
+        bucket = next((i for i, bound in enumerate(WAIT_HISTOGRAM_BOUNDS) if wait <= bound), len(WAIT_HISTOGRAM_BOUNDS))
+        with self._lock:
+            counters['admitted'] += 1
+            counters['total_wait'] += wait
+            counters['max_wait'] = max(counters['max_wait'], wait)
+            counters['wait_histogram'][bucket] += 1
+        return Lease(lease_id, estimated_tokens, now)
+
+    def _acquire_interactive(self, estimated_tokens, started, give_up_at) -> str:
+        sleep = self._sleep or time.sleep
+        # Tokens first: the bucket queues callers in reservation order
+        token_wait = self.tokens.reserve(estimated_tokens)
+        if give_up_at is not None and started + token_wait > give_up_at:
+            self.tokens.credit(estimated_tokens)
+            self._timed_out(INTERACTIVE)
+        if token_wait > 0:
+            sleep(token_wait)
+        lease_id = uuid.uuid4().hex
+        while not self._try_lease(lease_id):
+            if give_up_at is not None and self._clock() + self.poll_interval > give_up_at:
+                self.tokens.credit(estimated_tokens)
+                self._timed_out(INTERACTIVE)
+            sleep(self.poll_interval)
+        return lease_id
+
+    def _acquire_batch(self, estimated_tokens, give_up_at) -> str:
+        sleep = self._sleep or time.sleep
+        lease_id = uuid.uuid4().hex
+        while True:
+            if self._try_lease(lease_id, BATCH):
+                if self.tokens.try_reserve(estimated_tokens):
+                    return lease_id
+                self._drop_lease(lease_id)
+            if give_up_at is not None and self._clock() + self.poll_interval > give_up_at:
+                self._timed_out(BATCH)
+            sleep(self.poll_interval)
+
+    def _timed_out(self, priority):
+        with self._lock:
+            self._classes[priority]['timeouts'] += 1
+        raise GovernorTimeout(f"{priority.capitalize()} LLM request not admitted by governor '{self.name}' within its timeout.")
+
+    def release(self, lease: Lease, outcome='failed', retry_after=None):
+        """Ends a lease, adapting the concurrency limit to its outcome ('succeeded', 'rate_limited' or 'failed')."""
+        def body(conn, now):
+            conn.execute("DELETE FROM llm_governor_leases WHERE id = ?", (lease.id,))
+            limit, decreased_at = self._limit(conn)
+            if outcome == 'rate_limited':
+                if now - decreased_at < self.decrease_interval:
+                    return limit
+                limit, decreased_at = max(float(self.min_in_flight), limit / 2), now
+            elif outcome == 'succeeded':
+                limit = min(float(self.max_in_flight), limit + 1 / limit)
+            else:
+                return limit
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_governor_state (name, concurrency_limit, decreased_at) VALUES (?, ?, ?)",
+                (self.name, limit, decreased_at)
+            )
+            return limit
+        limit = self._transaction(body)
+        if lease.used_tokens is not None:
+            self.tokens.credit(lease.estimated_tokens - lease.used_tokens)
+        if outcome == 'rate_limited':
+            logger.warning(f"LLM governor '{self.name}': rate limited; concurrency limit now {limit:.2f}.")
+            self.tokens.pause(retry_after if retry_after is not None else DEFAULT_BACKOFF_SECONDS)
+        latency = self._clock() - lease.acquired_at
+        with self._lock:
+            self._counters[outcome] += 1
+            self._total_latency += latency
+            self._max_latency = max(self._max_latency, latency)
+
+    @contextmanager
+    def request(self, estimated_tokens, timeout=None, priority=INTERACTIVE):
+        """acquire() and release() around one request; rate_limit_errors raised inside count as rate limited."""
+        lease = self.acquire(estimated_tokens, timeout=timeout, priority=priority)
+        try:
+            yield lease
+        except self.rate_limit_errors as e:
+            self.release(lease, 'rate_limited', retry_after=retry_after_seconds(e))
+            raise
+        except BaseException:
+            self.release(lease, 'failed')
+            raise
+        else:
+            self.release(lease, 'succeeded')
+
+    def stats(self) -> dict:
+        """
+        Returns host-wide in-flight requests, waiting interactive requests, concurrency limit and
+        token budget, and this process's queue and latency counters.
+
+        'classes' has the counters of each priority class; its wait_histogram counts admitted
+        requests by wait time, cumulatively per upper bound in seconds (Prometheus style).
+        """
+        try:
+            in_flight, interactive_waiting, limit = self._transaction(
+                lambda conn, now: (self._in_flight(conn, now), self._interactive_waiting(conn, now), self._limit(conn)[0]))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read LLM governor state: {e}")
+            in_flight = interactive_waiting = limit = None
+        tokens = self.tokens.stats()
+        with self._lock:
+            classes = {}
+            for priority, counters in self._classes.items():
+                cumulative, histogram = 0, {}
+                for bound, count in zip([str(bound) for bound in WAIT_HISTOGRAM_BOUNDS] + ['+Inf'], counters['wait_histogram']):
+                    cumulative += count
+                    histogram[bound] = cumulative
+                classes[priority] = {
+                    'waiting': counters['waiting'],
+                    'admitted': counters['admitted'],
+                    'timeouts': counters['timeouts'],
+                    'avg_wait_seconds': round(counters['total_wait'] / counters['admitted'], 3) if counters['admitted'] else 0.0,
+                    'max_wait_seconds': round(counters['max_wait'], 3),
+                    'wait_histogram': histogram,
+                }
+            admitted = sum(counters['admitted'] for counters in self._classes.values())
+            released = self._counters['succeeded'] + self._counters['rate_limited'] + self._counters['failed']
+            return {
+                'name': self.name,
+                'in_flight': in_flight,
+                'interactive_waiting': interactive_waiting,
+                'concurrency_limit': round(limit, 2) if limit is not None else None,
+                'max_in_flight': self.max_in_flight,
+                'batch_reserved_slots': self.batch_reserved_slots,
+                'tokens_per_minute': self.tokens.capacity,
+                'tokens_available': tokens['tokens_available'],
+                'token_wait_seconds': tokens['estimated_wait_seconds'],
+                'process_waiting': sum(counters['waiting'] for counters in self._classes.values()),
+                'process_admitted': admitted,
+                'process_timeouts': sum(counters['timeouts'] for counters in self._classes.values()),
+                'process_succeeded': self._counters['succeeded'],
+                'process_rate_limited': self._counters['rate_limited'],
+                'process_failed': self._counters['failed'],
+                'process_avg_wait_seconds': round(sum(counters['total_wait'] for counters in self._classes.values()) / admitted, 3) if admitted else 0.0,
+                'process_max_wait_seconds': round(max(counters['max_wait'] for counters in self._classes.values()), 3),
+                'process_avg_latency_seconds': round(self._total_latency / released, 3) if released else 0.0,
+                'process_max_latency_seconds': round(self._max_latency, 3),
+                'classes': classes,
+            }
+
+    def reset(self):
+        """Clears the shared leases, waiters, limit and token budget and this process's counters (mainly for tests)."""
+        def body(conn, now):
+            conn.execute("DELETE FROM llm_governor_leases WHERE name = ?", (self.name,))
+            conn.execute("DELETE FROM llm_governor_waiters WHERE name = ?", (self.name,))
+            conn.execute("DELETE FROM llm_governor_state WHERE name = ?", (self.name,))
+        self._transaction(body)
+        self.tokens.reset()
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+            for priority, counters in self._classes.items():
+                waiting = counters['waiting']
+                self._classes[priority] = self._new_class_counters()
+                self._classes[priority]['waiting'] = waiting
+            self._total_latency = self._max_latency = 0.0
@@ -0,0 +1,197 @@
+# app/local_search.py
+
+"""
+Offline full-text search over the papers kept in the paper store.
+
+A SQLite FTS5 index, `papers_fts`, covers the title, abstract, authors and categories of
+every row of the `papers` table. It is an external-content index: the text lives only in
+`papers`, and triggers keep the index in sync with inserts, updates and deletes. Results
+are ranked with BM25, weighting title matches above author, category and abstract matches,
+and only the newest stored version of each paper is returned.
+
+The index needs SQLite with FTS5. On other databases is_available() is False and /search
+never falls back to it. After a VACUUM of the database (which may renumber rowids) run
+rebuild_index().
+"""
+
+import logging
+import re
+import weakref
+from typing import Dict, List, Union
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from .exceptions import ValidationException
+from .models import db, ArxivPaper, StoredPaper
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'papers_fts'
+# BM25 weights for title, summary, authors and categories, in index column order
+COLUMN_WEIGHTS = (10.0, 1.0, 4.0, 2.0)
+
+_CREATE_STATEMENTS = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, summary, authors, categories,
+        content='papers', content_rowid='rowid', tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, authors, categories)
+        VALUES (new.rowid, new.title, new.summary, new.authors, new.categories);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, authors, categories)
+        VALUES ('delete', old.rowid, old.title, old.summary, old.authors, old.categories);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS papers_fts_update AFTER UPDATE ON papers BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, authors, categories)
+        VALUES ('delete', old.rowid, old.title, old.summary, old.authors, old.categories);
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, authors, categories)
+        VALUES (new.rowid, new.title, new.summary, new.authors, new.categories);
+    END""",
+)
+
+# Matches of the newest stored version of each paper
+_MATCHES = f"""
+    FROM {FTS_TABLE} JOIN papers ON papers.rowid = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH :match
+      AND papers.updated_date = (SELECT MAX(v.updated_date) FROM papers AS v WHERE v.base_id = papers.base_id)
+"""
+_PAGE_QUERY = text(f"""
+    SELECT papers.* {_MATCHES}
+    ORDER BY bm25({FTS_TABLE}, {', '.join(str(weight) for weight in COLUMN_WEIGHTS)})
+    LIMIT :count OFFSET :start
+""")
+_COUNT_QUERY = text(f"SELECT COUNT(*) {_MATCHES}")
+
+# arXiv query syntax -> FTS5 columns and operators
+_FIELD_COLUMNS = {'ti': 'title', 'abs': 'summary', 'au': 'authors', 'cat': 'categories', 'all': None}
+_OPERATORS = {'AND': 'AND', 'OR': 'OR', 'ANDNOT': 'NOT', 'NOT': 'NOT'}
+_TERM_RE = re.compile(r'(?:([A-Za-z]+):)?(?:"([^"]*)"|([^\s()"]+))')
+_WORD_RE = re.compile(r'\w+')
+
+# Database engine -> whether it has the index; set by create_index() or the first is_available()
+_availability = weakref.WeakKeyDictionary()
+
+
+def _index_exists(connection) -> bool:
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+    ).first() is not None
+
+
+def create_index() -> bool:
+    """
+    Creates the FTS index and its sync triggers if missing, indexing any papers already stored.
+    Called by create_app after db.create_all(). Returns False if the database can't host it.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        logger.info("Local full-text search needs SQLite; offline search is disabled.")
+        _availability[db.engine] = False
+        return False
+    try:
+        with db.engine.begin() as connection:
+            existed = _index_exists(connection)
+            for statement in _CREATE_STATEMENTS:
+                connection.execute(text(statement))
+            if not existed:
+                connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError as e:
+        logger.warning(f"Could not create the local full-text index (is FTS5 available?): {e}")
+        _availability[db.engine] = False
+        return False
+    _availability[db.engine] = True
+    return True
+
+
+def rebuild_index():
+    """Re-indexes every stored paper from scratch."""
+    with db.engine.begin() as connection:
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def is_available() -> bool:
+    """
+    Returns True if the local index exists and can answer searches. Requires an app context.
+    The database is only checked once per engine (or when create_index() runs), since the
+    index only appears at startup or after a migration.
+    """
+    engine = db.engine
+    available = _availability.get(engine)
+    if available is None:
+        available = _index_available(engine)
+        _availability[engine] = available
+    return available
+
+
+def _index_available(engine) -> bool:
+    if engine.dialect.name != 'sqlite':
+        return False
+    try:
+        with engine.connect() as connection:
+            return _index_exists(connection)
+    except OperationalError:
+        return False
+
+
+def to_fts_query(query: str) -> str:
+    """
+    Translates an arXiv-style query ('ti:transformer AND au:"Yann LeCun"') into an FTS5 query.
+
+    Field prefixes map to index columns (ti, abs, au, cat; all and unknown fields search every
+    column), AND/OR/ANDNOT become FTS5 operators and adjacent terms are ANDed. Every term is
+    quoted, so punctuation in user input can't produce FTS5 syntax errors.
+
+    Raises:
+        ValidationException: If the query has no searchable words.
+    """
+    parts = []
+    for match in _TERM_RE.finditer(query):
+        field, phrase, word = match.groups()
+        if field is None and word in _OPERATORS:
+            if parts and parts[-1] not in _OPERATORS.values():
+                parts.append(_OPERATORS[word])
+            continue
+        column = _FIELD_COLUMNS.get(field.lower()) if field else None
+        words = _WORD_RE.findall(phrase if phrase is not None else word)
+        if field and field.lower() not in _FIELD_COLUMNS:
+            words.insert(0, field) # Not a field prefix after all, e.g. 'covid:19'
+        if not words:
+            continue
+        term = '"' + ' '.join(words) + '"'
+        if parts and parts[-1] not in _OPERATORS.values():
+            parts.append('AND')
+        parts.append(f"{column} : {term}" if column else term)
+    while parts and parts[-1] in _OPERATORS.values():
+        parts.pop()
+    if not parts:
+        raise ValidationException("The query has no searchable words.")
+    return ' '.join(parts)
+
+
+def local_search(query: str, start_index: int = 0, count: int = 10) -> Dict[str, Union[List[ArxivPaper], int]]:
+    """
+    Searches the locally stored papers, ranked by BM25. Requires an app context.
+
+    Args:
+        query: The search query, in arXiv query syntax (see to_fts_query).
+        start_index: Index of the first result to return.
+        count: The maximum number of results to return.
+
+    Returns:
+        A dictionary with the 'papers' list and 'total_results' count, like search_papers.
+    Raises:
+        ValidationException: For an empty or invalid query or page.
+    """
+    if count <= 0 or start_index < 0:
+        raise ValidationException("Page start must be non-negative and page size positive.")
+    params = {'match': to_fts_query(query), 'start': start_index, 'count': count}
+    try:
+        total_results = db.session.execute(_COUNT_QUERY, params).scalar()
+        rows = db.session.scalars(select(StoredPaper).from_statement(_PAGE_QUERY), params).all()
+    except OperationalError as e:
+        logger.warning(f"Local search failed for '{query}' (FTS query {params['match']!r}): {e}")
+        raise ValidationException("The query could not be run against the local index.", original_exception=e)
+    logger.info(f"Local search for '{query}' matched {total_results} stored papers.")
+    return {'papers': [row.to_paper() for row in rows], 'total_results': total_results}
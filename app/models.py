@@ -1,10 +1,11 @@
-from dataclasses import dataclass, field, asdict
-from typing import List, Optional
+from dataclasses import dataclass, fields
+from typing import Optional, Tuple
 from datetime import datetime, timezone # Added timezone
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash # For hashing, though not directly passwords here
 import os
+import sys
 import hashlib
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from flask import current_app # For accessing app config
@@ -51,9 +52,82 @@ def decrypt_data(encrypted_payload_with_nonce: bytes) -> str:
         # For GDPR data access, failing to decrypt might mean data is corrupted.
         raise ValueError(f"Failed to decrypt data. It might be corrupted or the key is incorrect. {e}")
 
+ARXIV_TIMESTAMP_LENGTH = len('2023-01-01T00:00:00Z')
+
+# Bound once: ArxivPaper.__post_init__ runs for every entry of every feed
+_setattr = object.__setattr__
+_intern = sys.intern
+
+
+def parse_arxiv_timestamp(value) -> Optional[datetime]:
+    """
+    Parses an arXiv Atom timestamp into an aware datetime, or returns None if it can't be parsed.
+
+    The feed always uses 'YYYY-MM-DDTHH:MM:SSZ', which takes a single fromisoformat() call;
+    other ISO 8601 strings and bare 'YYYY-MM-DD' dates go through the slower fallbacks.
+    """
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str):
+        return None
+    if len(value) == ARXIV_TIMESTAMP_LENGTH and value[-1] == 'Z':
+        try:
+            return datetime.fromisoformat(value[:-1] + '+00:00') # tzinfo is the timezone.utc singleton
+        except ValueError:
+            pass
+    try:
+        # Handle 'Z' for UTC, making it compatible with fromisoformat on Python < 3.11
+        return datetime.fromisoformat(value[:-1] + '+00:00' if value.endswith('Z') else value)
+    except ValueError:
+        pass
+    try:
+        # Fallback for YYYY-MM-DD if full ISO parse fails
+        return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+def format_arxiv_timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Formats a datetime the way the arXiv feed does, using 'Z' rather than '+00:00' for UTC."""
+    if value is None:
+        return None
+    text = value.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+def _with_slots(cls):
+    """
+    Recreates a dataclass with __slots__, which is what dataclass(slots=True) does on
+    Python 3.10+. Slotted instances have no per-instance __dict__.
+    """
+    field_names = tuple(f.name for f in fields(cls))
+    cls_dict = dict(cls.__dict__)
+    cls_dict['__slots__'] = field_names
+    for name in field_names:
+        cls_dict.pop(name, None) # Class attributes holding defaults would clash with the slots
+    cls_dict.pop('__dict__', None)
+    cls_dict.pop('__weakref__', None)
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
+def _restore_arxiv_paper(*values) -> "ArxivPaper":
+    """Unpickles an ArxivPaper from already validated field values, skipping __post_init__."""
+    paper = object.__new__(ArxivPaper)
+    for name, value in zip(ArxivPaper.__slots__, values):
+        _setattr(paper, name, value)
+    return paper
+
+
+@_with_slots
 @dataclass(frozen=True) # Makes instances immutable and auto-generates __eq__, etc.
 class ArxivPaper:
-    """Represents a parsed paper from the arXiv API."""
+    """
+    Represents a parsed paper from the arXiv API.
+
+    Instances are slotted and hold authors and categories as tuples, with category strings
+    interned, so large result sets and cached pages stay compact. Lists passed to the
+    constructor are converted; to_dict() returns lists again.
+    """
     id_str: str
     title: str
     summary: str
@@ -61,15 +135,15 @@ class ArxivPaper:
     published_date: Optional[datetime] = None 
     updated_date: Optional[datetime] = None   
     # Fields with defaults
-    authors: List[str] = field(default_factory=list)
-    categories: List[str] = field(default_factory=list)
+    authors: Tuple[str, ...] = ()
+    categories: Tuple[str, ...] = ()
     primary_category: Optional[str] = None
     pdf_link: Optional[str] = None
     doi: Optional[str] = None
 
     def __post_init__(self):
         # Basic validation: Ensure essential fields are not empty or None.
-        # frozen=True means we can't modify fields here, but we can raise errors.
+        # frozen=True means fields can only be normalized through object.__setattr__.
         if not self.id_str:
             raise ValueError("Paper ID (id_str) cannot be empty or None.")
         if not self.title:
@@ -77,73 +151,53 @@ class ArxivPaper:
         if self.summary is None: # Explicitly checking for None, empty summary might be valid
              raise ValueError("Paper summary cannot be None.")
 
-        # Date parsing logic
-        for date_field_name in ['published_date', 'updated_date']:
-            # The value from the constructor (still a string or None at this point)
-            # needs to be accessed before it's potentially overwritten by a previous iteration
-            # if we were to use a single variable for `date_val_from_constructor`.
-            # However, __setattr__ in dataclasses' __post_init__ for frozen=True
-            # is tricky. The initial values passed to __init__ are what need parsing.
-            # We need to access the initial string value that was passed.
-            # A common pattern is to accept string, parse, and store as datetime.
-            # For frozen dataclasses, this usually means a custom __init__ or a factory method,
-            # or doing the conversion before calling the dataclass constructor.
-            # Given the current structure, the easiest is to change the input type annotation
-            # in arxiv_api.py when preparing paper_data, or here, by assuming the __init__
-            # received strings and we're converting them.
-            # Let's assume the strings are passed to __init__ and we convert them.
-
-            date_val_str = getattr(self, date_field_name) # This will be the string from init
-            parsed_dt = None
-
-            if isinstance(date_val_str, str):
-                try:
-                    # Handle 'Z' for UTC, making it compatible with fromisoformat
-                    processed_date_str = date_val_str.replace('Z', '+00:00') if date_val_str.endswith('Z') else date_val_str
-                    parsed_dt = datetime.fromisoformat(processed_date_str)
-                except ValueError:
-                    # Fallback for YYYY-MM-DD if full ISO parse fails
-                    try:
-                        parsed_dt = datetime.strptime(date_val_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                    except ValueError:
-                        # If all parsing attempts fail, parsed_dt remains None
-                        # Optionally log this failure: print(f"Warning: Could not parse date string '{date_val_str}' for {date_field_name}")
-                        pass 
-            elif isinstance(date_val_str, datetime): # If it's already a datetime
-                parsed_dt = date_val_str
-            
-            # Use object.__setattr__ to assign to the field in a frozen dataclass
-            object.__setattr__(self, date_field_name, parsed_dt)
-
-        # Validations after attempting to parse/set the dates
-        if self.published_date is None: # Now checks the (potentially None) datetime object
-            raise ValueError("Published date could not be parsed or was None.")
-        if self.updated_date is None: # Now checks the (potentially None) datetime object
-            raise ValueError("Updated date could not be parsed or was None.")
-        # Note: pdf_link can be None if ID is missing, handled during construction.
+        published_raw, updated_raw = self.published_date, self.updated_date
+        if published_raw is None:
+            raise ValueError("Published date cannot be None.")
+        if updated_raw is None:
+            raise ValueError("Updated date cannot be None.")
+        published = parse_arxiv_timestamp(published_raw)
+        if published is None:
+            raise ValueError(f"Published date could not be parsed: {published_raw!r}")
+        # Most entries were never revised, so both timestamps are the same string
+        updated = published if updated_raw == published_raw else parse_arxiv_timestamp(updated_raw)
+        if updated is None:
+            raise ValueError(f"Updated date could not be parsed: {updated_raw!r}")
+
+        _setattr(self, 'published_date', published)
+        _setattr(self, 'updated_date', updated)
+        if type(self.authors) is not tuple:
+            _setattr(self, 'authors', tuple(self.authors))
+        # A few hundred distinct categories are shared by every paper
+        _setattr(self, 'categories', tuple(map(_intern, self.categories)))
+        if self.primary_category is not None:
+            _setattr(self, 'primary_category', _intern(self.primary_category))
+
+    def __reduce__(self):
+        # Slotted frozen instances can't be restored through setattr, so pickle the field values
+        return _restore_arxiv_paper, tuple(getattr(self, name) for name in self.__slots__)
 
     def to_dict(self) -> dict:
-        """Converts the ArxivPaper instance to a dictionary."""
-        # Custom handling for datetime might be needed if asdict doesn't convert to ISO string
-        data = asdict(self)
-        for date_field in ['published_date', 'updated_date']:
-            if isinstance(data[date_field], datetime):
-                data[date_field] = data[date_field].isoformat()
-        return data
+        """Converts the ArxivPaper instance to a dictionary of JSON-friendly values."""
+        return {
+            'id_str': self.id_str,
+            'title': self.title,
+            'summary': self.summary,
+            'published_date': format_arxiv_timestamp(self.published_date),
+            'updated_date': format_arxiv_timestamp(self.updated_date),
+            'authors': list(self.authors),
+            'categories': list(self.categories),
+            'primary_category': self.primary_category,
+            'pdf_link': self.pdf_link,
+            'doi': self.doi,
+        }
 
     @classmethod
     def from_dict(cls, data: dict) -> "ArxivPaper":
         """Creates an ArxivPaper instance from a dictionary.
         Assumes keys in the dictionary match the dataclass field names,
-        and date strings are ISO format.
+        and date strings are ISO format (they are parsed by __post_init__).
         """
-        # Convert date strings back to datetime objects before instantiation if necessary
-        # For simplicity here, this factory assumes ArxivPaper's __init__ (via __post_init__) handles parsing
-        # if strings are passed for dates. But if we were strictly constructing from a dict
-        # that already had datetime objects, this would be simpler.
-        # The current setup is: arxiv_api creates dict with date strings, ArxivPaper parses them.
-        
-        # If date fields in `data` are strings, they will be parsed by __post_init__
         try:
             return cls(**data)
         except TypeError as e:
@@ -235,6 +289,69 @@ class Subscription(db.Model):
     def __repr__(self):
         return f'<Subscription {self.email_hash} (Confirmed: {self.is_confirmed})>'
 
+class StoredPaper(db.Model):
+    """
+    Persistent copy of an ArxivPaper, one row per paper version.
+
+    Rows are keyed by the arXiv ID (as reported, usually with its 'vN' suffix) and the
+    updated date, so a revised paper is added next to its earlier versions instead of
+    overwriting them. See app/paper_store.py for the batched reads and writes.
+    """
+    __tablename__ = 'papers'
+
+    id_str = db.Column(db.String(64), primary_key=True)
+    updated_date = db.Column(db.DateTime, primary_key=True) # UTC, stored naive
+    base_id = db.Column(db.String(64), nullable=False, index=True) # id_str without the version suffix
+    title = db.Column(db.Text, nullable=False)
+    summary = db.Column(db.Text, nullable=False)
+    published_date = db.Column(db.DateTime, nullable=False)
+    authors = db.Column(db.JSON, nullable=False)
+    categories = db.Column(db.JSON, nullable=False)
+    primary_category = db.Column(db.String(32), nullable=True)
+    pdf_link = db.Column(db.String(255), nullable=True)
+    doi = db.Column(db.String(255), nullable=True)
+    stored_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def to_paper(self) -> ArxivPaper:
+        """Rebuilds the ArxivPaper this row was stored from."""
+        return ArxivPaper(
+            id_str=self.id_str,
+            title=self.title,
+            summary=self.summary,
+            published_date=self.published_date.replace(tzinfo=timezone.utc),
+            updated_date=self.updated_date.replace(tzinfo=timezone.utc),
+            authors=self.authors,
+            categories=self.categories,
+            primary_category=self.primary_category,
+            pdf_link=self.pdf_link,
+            doi=self.doi
+        )
+
+    def __repr__(self):
+        return f'<StoredPaper {self.id_str} (updated {self.updated_date})>'
+
+class StoredSummary(db.Model):
+    """
+    An LLM-generated summary, one row per paper version, input text, prompt template and model settings.
+
+    Rows are keyed by a hash of all of those (see SummarySpec in app/summary_store.py), so an
+    edited abstract, a new prompt template or a different model gets a new summary instead
+    of a stale one.
+    """
+    __tablename__ = 'summaries'
+
+    key = db.Column(db.String(64), primary_key=True) # SummarySpec.key
+    paper_id = db.Column(db.String(64), nullable=False, index=True) # arXiv ID with version, as sent by the caller
+    content_hash = db.Column(db.String(64), nullable=False) # SHA-256 of the title and abstract the prompt was built from
+    prompt_id = db.Column(db.String(64), nullable=False)
+    model = db.Column(db.String(64), nullable=False)
+    temperature = db.Column(db.Float, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<StoredSummary {self.paper_id} ({self.prompt_id}, {self.model})>'
+
 def init_app(app):
     """Initializes the database with the Flask app."""
     db.init_app(app)
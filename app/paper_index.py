@@ -0,0 +1,358 @@
+# app/paper_index.py
+
+"""
+Column-oriented, memory-mapped index of the papers in the paper store, for filtering by
+category and date without building ArxivPaper objects.
+
+The index is a directory of flat files, one per column, holding the newest stored version
+of every paper in ascending published-date order. Each build is written to its own directory
+under the index path, and a CURRENT file names the build readers should map:
+
+    CURRENT                      name of the current build directory
+    build-<build id>/            one complete index:
+
+      published.npy, updated.npy   int64 seconds since the epoch (UTC)
+      categories.npy               uint64 bitsets, one row of ceil(categories / 64) words per paper
+      primary.npy                  int16 code of the primary category (-1 if unknown)
+      ids / titles / summaries     UTF-8 string heaps (.bin) with int64 offsets (.off.npy)
+      meta.json                    build id, row count, the category vocabulary (bit i = categories[i]) and per-category counts
+
+Every file is opened with mmap, so loading is instant, only the pages a filter touches are
+read, and all gunicorn workers on a host share one copy of the index in the page cache.
+A filter such as "category in {cs.AI, cs.LG} and published >= t" is a binary search over
+the sorted published column plus vectorized masks over the remaining rows.
+
+Build or refresh the index after ingesting papers:
+
+    python -m app.paper_index
+
+A rebuild writes a complete new build directory, then points CURRENT at it with a single
+os.replace(), so a reader maps either the old build or the new one, never a mix of the two.
+Processes holding the old index keep a valid mapping and pick up the new one on their next
+get_index() call. The previous build is kept for readers that are still opening it; older
+ones are removed.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from . import paper_store
+from .models import db, ArxivPaper, StoredPaper
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+BUILD_BATCH_SIZE = 5000 # Rows fetched per round trip while building
+CURRENT_FILE = 'CURRENT'
+_BUILD_PREFIX = 'build-'
+_COUNT_CHUNK_ROWS = 1 << 16 # Rows unpacked at a time when counting categories
+_STRING_COLUMNS = ('ids', 'titles', 'summaries')
+_WORD_MASK = (1 << 64) - 1
+
+_lock = threading.Lock()
+_loaded = {} # path -> (build directory name, PaperIndex)
+
+
+def _timestamp(value: datetime) -> int:
+    """Seconds since the epoch; naive datetimes are taken as UTC, like the paper store's columns."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def current_build(path: str) -> Optional[str]:
+    """Name of the build directory CURRENT points to in the index at `path`, or None if none was built."""
+    try:
+        with open(os.path.join(path, CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _publish(path: str, build: str):
+    """Points CURRENT at `build` in one os.replace(), then removes builds older than the previous one."""
+    previous = current_build(path)
+    tmp_path = os.path.join(path, f".{CURRENT_FILE}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(build)
+    os.replace(tmp_path, os.path.join(path, CURRENT_FILE))
+    for name in os.listdir(path):
+        if name.startswith(_BUILD_PREFIX) and name not in (build, previous):
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def _latest_versions():
+    newer = aliased(StoredPaper)
+    latest = select(func.max(newer.updated_date)).where(newer.base_id == StoredPaper.base_id).scalar_subquery()
+    return (select(StoredPaper.id_str, StoredPaper.title, StoredPaper.summary, StoredPaper.published_date,
+                   StoredPaper.updated_date, StoredPaper.categories, StoredPaper.primary_category)
+            .where(StoredPaper.updated_date == latest)
+            .order_by(StoredPaper.published_date, StoredPaper.id_str)
+            .execution_options(yield_per=BUILD_BATCH_SIZE))
+
+
+def build_index(path: str) -> int:
+    """
+    Writes the index of the newest stored version of every paper to a new build directory
+    under `path` and makes it the current one. Requires an app context. Memory use is a few
+    dozen bytes per paper plus one batch of rows; titles and abstracts are streamed straight
+    to their heap files.
+
+    Returns:
+        The number of papers indexed.
+    """
+    build_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    build_path = os.path.join(path, _BUILD_PREFIX + build_id)
+    os.makedirs(build_path)
+    vocabulary = {}
+    published, updated, primary = array('q'), array('q'), array('h')
+    category_masks = []
+    totals = {} # category code -> papers listing it
+    heaps = {name: open(os.path.join(build_path, f"{name}.bin"), 'wb') for name in _STRING_COLUMNS}
+    offsets = {name: array('q', [0]) for name in _STRING_COLUMNS}
+    try:
+        for row in db.session.execute(_latest_versions()):
+            for name, value in zip(_STRING_COLUMNS, (row.id_str, row.title, row.summary)):
+                encoded = (value or '').encode('utf-8')
+                heaps[name].write(encoded)
+                offsets[name].append(offsets[name][-1] + len(encoded))
+            published.append(_timestamp(row.published_date))
+            updated.append(_timestamp(row.updated_date))
+            mask = 0
+            for category in row.categories or ():
+                code = vocabulary.setdefault(category, len(vocabulary))
+                if not mask >> code & 1:
+                    totals[code] = totals.get(code, 0) + 1
+                mask |= 1 << code
+            category_masks.append(mask)
+            primary.append(vocabulary.setdefault(row.primary_category, len(vocabulary)) if row.primary_category else -1)
+    finally:
+        for heap in heaps.values():
+            heap.close()
+
+    rows = len(published)
+    words = max(1, (len(vocabulary) + 63) // 64)
+    bitsets = np.zeros((rows, words), dtype=np.uint64)
+    for word in range(words):
+        shift = 64 * word
+        bitsets[:, word] = np.fromiter(((mask >> shift) & _WORD_MASK for mask in category_masks),
+                                       dtype=np.uint64, count=rows)
+    columns = {
+        'published.npy': np.frombuffer(published, dtype=np.int64),
+        'updated.npy': np.frombuffer(updated, dtype=np.int64),
+        'primary.npy': np.frombuffer(primary, dtype=np.int16),
+        'categories.npy': bitsets,
+    }
+    for name in _STRING_COLUMNS:
+        columns[f"{name}.off.npy"] = np.frombuffer(offsets[name], dtype=np.int64)
+    for name, values in columns.items():
+        np.save(os.path.join(build_path, name), values)
+    meta = {
+        'version': FORMAT_VERSION,
+        'build_id': build_id,
+        'rows': rows,
+        'categories': sorted(vocabulary, key=vocabulary.get),
+        'category_counts': [totals.get(code, 0) for code in range(len(vocabulary))],
+        'built_at': datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(build_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    _publish(path, _BUILD_PREFIX + build_id)
+    logger.info(f"Built paper index {build_id} at {path}: {rows} papers, {len(vocabulary)} categories.")
+    return rows
+
+
+class _StringHeap:
+    """UTF-8 strings stored back to back, addressed by an offsets column."""
+
+    def __init__(self, path: str, name: str):
+        self.offsets = np.load(os.path.join(path, f"{name}.off.npy"), mmap_mode='r')
+        heap_path = os.path.join(path, f"{name}.bin")
+        # mmap can't map an empty file
+        self.data = np.memmap(heap_path, dtype=np.uint8, mode='r') if os.path.getsize(heap_path) else np.empty(0, np.uint8)
+
+    def __getitem__(self, row: int) -> str:
+        return self.data[self.offsets[row]:self.offsets[row + 1]].tobytes().decode('utf-8')
+
+
+class PaperIndex:
+    """A read-only, memory-mapped index: one build directory written by build_index()."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported paper index format {meta.get('version')!r} in {path}.")
+        self.path = path
+        self.build_id = meta.get('build_id')
+        self.rows = meta['rows']
+        self.categories: List[str] = meta['categories']
+        self.built_at = meta.get('built_at')
+        self._category_totals = meta.get('category_counts')
+        self._category_codes = {category: code for code, category in enumerate(self.categories)}
+        self.published = np.load(os.path.join(path, 'published.npy'), mmap_mode='r')
+        self.updated = np.load(os.path.join(path, 'updated.npy'), mmap_mode='r')
+        self.primary = np.load(os.path.join(path, 'primary.npy'), mmap_mode='r')
+        self.category_bits = np.load(os.path.join(path, 'categories.npy'), mmap_mode='r')
+        self._ids = _StringHeap(path, 'ids')
+        self._titles = _StringHeap(path, 'titles')
+        self._summaries = _StringHeap(path, 'summaries')
+
+    def __len__(self):
+        return self.rows
+
+    def category_mask(self, categories: Iterable[str]) -> np.ndarray:
+        """The bitset (one uint64 per word) selecting `categories`; unknown categories select nothing."""
+        mask = np.zeros(self.category_bits.shape[1], dtype=np.uint64)
+        for category in categories:
+            code = self._category_codes.get(category)
+            if code is not None:
+                mask[code // 64] |= np.uint64(1 << (code % 64))
+        return mask
+
+    def filter(self, categories: Optional[Iterable[str]] = None, published_since: Optional[datetime] = None,
+               published_until: Optional[datetime] = None, updated_since: Optional[datetime] = None,
+               primary_only: bool = False) -> np.ndarray:
+        """
+        Returns the rows matching every given condition, newest published first.
+
+        Args:
+            categories: Rows listing any of these categories (or with one as primary category, if primary_only).
+            published_since / published_until: Inclusive bounds on the published date (naive datetimes are UTC).
+            updated_since: Inclusive lower bound on the last update.
+            primary_only: Match categories against the primary category only.
+        """
+        start = int(np.searchsorted(self.published, _timestamp(published_since), 'left')) if published_since else 0
+        stop = int(np.searchsorted(self.published, _timestamp(published_until), 'right')) if published_until else self.rows
+        if start >= stop:
+            return np.empty(0, dtype=np.int64)
+        keep = None
+        if categories is not None:
+            categories = list(categories)
+            if primary_only:
+                codes = [self._category_codes[c] for c in categories if c in self._category_codes]
+                keep = np.isin(self.primary[start:stop], np.array(codes, dtype=np.int16))
+            else:
+                wanted = self.category_mask(categories)
+                keep = np.zeros(stop - start, dtype=bool)
+                for word in np.flatnonzero(wanted):
+                    keep |= (self.category_bits[start:stop, word] & wanted[word]) != 0
+        if updated_since is not None:
+            recent = self.updated[start:stop] >= _timestamp(updated_since)
+            keep = recent if keep is None else keep & recent
+        rows = np.arange(start, stop, dtype=np.int64) if keep is None else np.flatnonzero(keep) + start
+        return rows[::-1]
+
+    def category_counts(self, rows: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Number of rows (all, or the given ones) listing each category, for facets. Omits zero counts."""
+        if rows is None and self._category_totals is not None:
+            return {category: count for category, count in zip(self.categories, self._category_totals) if count}
+        totals = np.zeros(self.category_bits.shape[1] * 64, dtype=np.int64)
+        count = self.rows if rows is None else len(rows)
+        for offset in range(0, count, _COUNT_CHUNK_ROWS):
+            if rows is None:
+                chunk = np.ascontiguousarray(self.category_bits[offset:offset + _COUNT_CHUNK_ROWS])
+            else:
+                chunk = self.category_bits[np.sort(rows[offset:offset + _COUNT_CHUNK_ROWS])]
+            # Little-endian words unpacked little-endian put category i at bit i
+            bits = np.unpackbits(chunk.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+            totals += bits.sum(axis=0, dtype=np.int64)
+        return {category: int(totals[code]) for code, category in enumerate(self.categories) if totals[code]}
+
+    def id(self, row: int) -> str:
+        return self._ids[int(row)]
+
+    def title(self, row: int) -> str:
+        return self._titles[int(row)]
+
+    def summary(self, row: int) -> str:
+        return self._summaries[int(row)]
+
+    def ids(self, rows: Iterable[int]) -> List[str]:
+        return [self._ids[int(row)] for row in rows]
+
+    def papers(self, rows: Iterable[int]) -> List[ArxivPaper]:
+        """Loads the full papers for `rows` from the paper store, in the given order. Requires an app context."""
+        ids = self.ids(rows)
+        found = paper_store.get_papers(ids)
+        return [found[arxiv_id] for arxiv_id in ids if arxiv_id in found]
+
+
+def load_index(path: str) -> PaperIndex:
+    """Maps the current build of the index at `path`. Raises FileNotFoundError if it hasn't been built."""
+    build = current_build(path)
+    if build is None:
+        raise FileNotFoundError(f"No paper index has been built in {path}.")
+    return PaperIndex(os.path.join(path, build))
+
+
+def get_index(path: Optional[str] = None) -> Optional[PaperIndex]:
+    """
+    Returns this process's mapping of the index at `path` (default: PAPER_INDEX_PATH), reopening
+    it when it has been rebuilt, or None if no index has been built there.
+    """
+    if path is None:
+        if not has_app_context():
+            return None
+        path = current_app.config.get('PAPER_INDEX_PATH')
+        if not path:
+            return None
+    with _lock:
+        for _ in range(2):
+            build = current_build(path)
+            if build is None:
+                return None
+            loaded = _loaded.get(path)
+            if loaded is not None and loaded[0] == build:
+                return loaded[1]
+            try:
+                _loaded[path] = (build, PaperIndex(os.path.join(path, build)))
+                return _loaded[path][1]
+            except FileNotFoundError:
+                # Removed by two rebuilds since CURRENT was read; read it again
+                logger.info(f"Paper index build {build} disappeared while loading; retrying.")
+        return loaded[1] if loaded is not None else None
+
+
+def stats() -> dict:
+    """Size and build time of the indexes mapped by this process."""
+    with _lock:
+        return {path: {'build_id': index.build_id, 'rows': index.rows, 'categories': len(index.categories),
+                       'built_at': index.built_at}
+                for path, (_, index) in _loaded.items()}
+
+
+def reset():
+    """Drops this process's mappings (used by tests)."""
+    with _lock:
+        _loaded.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the memory-mapped paper index from the paper store.")
+    parser.add_argument('--path', default=None, help='Index directory (default: PAPER_INDEX_PATH)')
+    args = parser.parse_args(argv)
+
+    from . import create_app
+    app = create_app(os.getenv('FLASK_CONFIG', 'default'))
+    with app.app_context():
+        path = args.path or app.config['PAPER_INDEX_PATH']
+        rows = build_index(path)
+    print(f"Indexed {rows} papers in {path}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+# app/paper_store.py
+
+"""
+Persistent store of paper metadata, kept in the `papers` table of the application database.
+
+arXiv metadata for a given paper version practically never changes, so every paper parsed
+from an arXiv response is kept (see parse_arxiv_xml) instead of disappearing when its cache
+entry expires. Rows are keyed by id_str + updated_date: re-storing a known version is a
+no-op and a revised paper is added next to its earlier versions.
+
+Writes are one multi-row INSERT ... ON CONFLICT DO NOTHING per batch (executed as an
+executemany), in their own transaction so they never commit unrelated pending changes of
+the request's session. Reads are batched into IN (...) queries.
+"""
+
+import logging
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import db, StoredPaper, ArxivPaper
+
+logger = logging.getLogger(__name__)
+
+READ_BATCH_SIZE = 400 # IDs per SELECT; each ID is bound twice and older SQLite builds allow 999 parameters
+_VERSION_RE = re.compile(r'v\d+$')
+
+_lock = threading.Lock()
+_counters = {'batches_written': 0, 'papers_written': 0, 'write_errors': 0, 'lookups': 0, 'lookup_hits': 0}
+
+
+def _count(**increments):
+    with _lock:
+        for name, value in increments.items():
+            _counters[name] += value
+
+
+def base_id(arxiv_id: str) -> str:
+    """Returns the arXiv ID without its version suffix ('2301.01234v2' -> '2301.01234')."""
+    return _VERSION_RE.sub('', arxiv_id)
+
+
+def _utc_naive(value):
+    """DateTime columns are naive; store aware datetimes as naive UTC."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _row(paper: ArxivPaper) -> dict:
+    return {
+        'id_str': paper.id_str,
+        'updated_date': _utc_naive(paper.updated_date),
+        'base_id': base_id(paper.id_str),
+        'title': paper.title,
+        'summary': paper.summary,
+        'published_date': _utc_naive(paper.published_date),
+        'authors': list(paper.authors),
+        'categories': list(paper.categories),
+        'primary_category': paper.primary_category,
+        'pdf_link': paper.pdf_link,
+        'doi': paper.doi,
+    }
+
+
+def _insert_new_rows(connection, rows: List[dict]):
+    """Inserts rows whose (id_str, updated_date) is not stored yet."""
+    table = StoredPaper.__table__
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+        statement = insert(table).on_conflict_do_nothing(index_elements=['id_str', 'updated_date'])
+    else:
+        # No portable upsert: drop the keys that already exist, then insert the rest
+        keys = [(row['id_str'], row['updated_date']) for row in rows]
+        existing = set(connection.execute(
+            select(table.c.id_str, table.c.updated_date).where(table.c.id_str.in_({key[0] for key in keys}))
+        ).all())
+        rows = [row for row, key in zip(rows, keys) if key not in existing]
+        if not rows:
+            return
+        statement = table.insert()
+    connection.execute(statement, rows) # A list of parameter sets runs as executemany
+
+
+def store_papers(papers: Iterable[ArxivPaper]) -> int:
+    """
+    Stores papers whose version isn't stored yet. Requires an app context.
+
+    Returns:
+        The number of distinct paper versions written or already present.
+    Raises:
+        SQLAlchemyError if the write fails.
+    """
+    # Duplicates within a batch would only cost conflict checks
+    rows = list({(paper.id_str, paper.updated_date): _row(paper) for paper in papers}.values())
+    if not rows:
+        return 0
+    with db.engine.begin() as connection:
+        _insert_new_rows(connection, rows)
+    _count(batches_written=1, papers_written=len(rows))
+    return len(rows)
+
+
+def record_papers(papers: List[ArxivPaper]):
+    """
+    Best-effort store_papers for the arXiv client: a no-op outside an app context or when
+    PAPER_STORE_ENABLED is off, and failures are logged rather than raised so they never
+    fail a search.
+    """
+    if not papers or not has_app_context() or not current_app.config.get('PAPER_STORE_ENABLED', True):
+        return
+    try:
+        store_papers(papers)
+    except SQLAlchemyError as e:
+        _count(write_errors=1)
+        logger.warning(f"Could not store {len(papers)} papers in the paper store: {e}")
+
+
+def get_papers(ids: Iterable[str]) -> Dict[str, ArxivPaper]:
+    """
+    Looks up stored papers in batches. Requires an app context.
+
+    A versioned ID ('2301.01234v2') matches exactly that version; an unversioned ID matches
+    the most recently updated stored version.
+
+    Returns:
+        A dictionary mapping each requested ID that has a stored paper to that paper.
+    """
+    requested = list(dict.fromkeys(ids))
+    found = {}
+    for offset in range(0, len(requested), READ_BATCH_SIZE):
+        batch = requested[offset:offset + READ_BATCH_SIZE]
+        statement = select(StoredPaper).where(or_(StoredPaper.id_str.in_(batch), StoredPaper.base_id.in_(batch)))
+        latest = {}
+        for stored in db.session.scalars(statement):
+            found[stored.id_str] = stored
+            current = latest.get(stored.base_id)
+            if current is None or stored.updated_date > current.updated_date:
+                latest[stored.base_id] = stored
+        found.update(latest)
+    result = {arxiv_id: found[arxiv_id].to_paper() for arxiv_id in requested if arxiv_id in found}
+    _count(lookups=len(requested), lookup_hits=len(result))
+    return result
+
+
+def latest_updated_dates(base_ids: Iterable[str]) -> Dict[str, datetime]:
+    """
+    Returns the newest stored updated_date (naive UTC) per base ID, for the IDs that have any
+    stored version. Used to skip unchanged papers when ingesting snapshots.
+    """
+    requested = list(dict.fromkeys(base_ids))
+    latest = {}
+    for offset in range(0, len(requested), READ_BATCH_SIZE):
+        batch = requested[offset:offset + READ_BATCH_SIZE]
+        statement = (select(StoredPaper.base_id, func.max(StoredPaper.updated_date))
+                     .where(StoredPaper.base_id.in_(batch)).group_by(StoredPaper.base_id))
+        latest.update(db.session.execute(statement).all())
+    return latest
+
+
+def get_paper(arxiv_id: str):
+    """Returns the stored paper for one ID (see get_papers), or None."""
+    return get_papers([arxiv_id]).get(arxiv_id)
+
+
+def stats() -> dict:
+    """Returns this process's write/lookup counters and, inside an app context, the number of stored paper versions."""
+    with _lock:
+        result = dict(_counters)
+    if has_app_context():
+        try:
+            result['stored_papers'] = db.session.scalar(select(func.count()).select_from(StoredPaper))
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not count stored papers: {e}")
+            result['stored_papers'] = None
+    return result
+
+
+def reset():
+    """Clears the per-process counters (used by tests)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
@@ -0,0 +1,241 @@
+# app/rate_limiter.py
+
+"""
+Host-wide token-bucket rate limiter shared by every worker process.
+
+The bucket state (available tokens and the time it was last refilled) lives in a
+small SQLite database, so all gunicorn workers on a host draw from the same
+budget. Callers reserve a token inside an IMMEDIATE transaction; when the bucket
+is empty the token is borrowed (the balance goes negative) and the caller sleeps
+until its slot comes up. This keeps callers in FIFO order and only delays a
+request when the global budget is actually exhausted.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .state_db import StateDB
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = os.path.join(tempfile.gettempdir(), 'arxiv_paper_search_rate_limit.sqlite')
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+    "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)",
+)
+
+
+class TokenBucketRateLimiter:
+    """A token bucket whose state is shared through a SQLite file.
+
+    Args:
+        name: Bucket name; several buckets can share one state file.
+        rate: Tokens added per second.
+        capacity: Maximum number of tokens the bucket can hold (burst size).
+        state_path: Path of the SQLite state file. ':memory:' keeps the bucket process-local.
+        clock: Wall-clock function, injectable for tests.
+        sleep: Sleep function, injectable for tests. Defaults to time.sleep.
+    """
+
+    def __init__(self, name, rate, capacity=1, state_path=None, clock=time.time, sleep=None):
+        if rate <= 0:
+            raise ValueError("Rate limiter rate must be positive.")
+        if capacity < 1:
+            raise ValueError("Rate limiter capacity must be at least 1.")
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.state_path = state_path or DEFAULT_STATE_PATH
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._db = StateDB(_SCHEMA, 'rate limiter')
+        # Per-process counters, reported by stats()
+        self._waiting = 0
+        self._acquired = 0
+        self._delayed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._last_wait = 0.0
+
+    def configure(self, rate=None, capacity=None, state_path=None):
+        """Updates the bucket parameters, e.g. from the Flask config in create_app."""
+        with self._lock:
+            if rate is not None:
+                if rate <= 0:
+                    raise ValueError("Rate limiter rate must be positive.")
+                self.rate = float(rate)
+            if capacity is not None:
+                if capacity < 1:
+                    raise ValueError("Rate limiter capacity must be at least 1.")
+                self.capacity = float(capacity)
+            if state_path:
+                self.state_path = state_path
+
+    def _connection(self):
+        """Returns this process's connection to the state file. Caller holds self._lock."""
+        return self._db.connection(self.state_path)
+
+    def _refilled(self, row, now):
+        """Returns the token balance at `now` given the stored (tokens, updated_at) row."""
+        if row is None:
+            return self.capacity
+        tokens, updated_at = row
+        return min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate)
+
+    def _update(self, delta, at_most=None, at_least=None):
+        """
+        Atomically adds `delta` tokens (negative to take), caps the balance at `at_most` if given,
+        and returns the new balance. If the new balance would be below `at_least`, nothing
+        changes and None is returned.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = self._clock()
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                balance = self._refilled(row, now) + delta
+                if at_most is not None:
+                    balance = min(balance, at_most)
+                if at_least is not None and balance < at_least:
+                    conn.execute("ROLLBACK")
+                    return None
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limit_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self.name, balance, now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return balance
+
+    def reserve(self, tokens=1):
+        """Takes `tokens` from the bucket without sleeping.
+
+        Returns:
+            The number of seconds the caller must wait before using the reservation (0.0 if none).
+        """
+        balance = self._update(-float(tokens))
+        return max(0.0, -balance / self.rate)
+
+    def try_reserve(self, tokens=1) -> bool:
+        """Takes `tokens` only if the bucket holds them right now. Never borrows, so low-priority
+        callers using it can't delay those that reserve()."""
+        return self._update(-float(tokens), at_least=0.0) is not None
+
+    def acquire(self, tokens=1):
+        """Takes `tokens` from the bucket, sleeping only if the shared budget is exhausted.
+
+        Returns:
+            The number of seconds the caller was delayed.
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            with self._lock:
+                self._waiting += 1
+            try:
+                (self._sleep or time.sleep)(wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        self._record(wait)
+        return wait
+
+    async def acquire_async(self, tokens=1):
+        """Coroutine counterpart of acquire(); awaits the delay instead of blocking the thread.
+
+        Draws from the same host-wide bucket, so async and blocking callers share one budget.
+
+        Returns:
+            The number of seconds the caller was delayed.
+        """
+        # The reservation may wait on another process's IMMEDIATE transaction, keep it off the loop
+        wait = await asyncio.get_running_loop().run_in_executor(None, self.reserve, tokens)
+        if wait > 0:
+            with self._lock:
+                self._waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+        self._record(wait)
+        return wait
+
+    def penalize(self, seconds):
+        """Pushes the shared bucket `seconds` into debt, e.g. after the upstream answered 429.
+
+        Every worker's next acquire() then waits the penalty out instead of only the caller
+        that received the error.
+        """
+        if seconds > 0:
+            self._update(-seconds * self.rate)
+            logger.warning(f"Rate limiter '{self.name}' penalized by {seconds:.2f} seconds.")
+
+    def pause(self, seconds):
+        """Empties the shared bucket and pushes it `seconds` into debt (unless it is already deeper),
+        so no caller on the host gets a token for that long, whatever the bucket held."""
+        if seconds > 0:
+            self._update(0.0, at_most=-seconds * self.rate)
+            logger.warning(f"Rate limiter '{self.name}' paused for {seconds:.2f} seconds.")
+
+    def credit(self, tokens):
+        """Returns `tokens` to the shared bucket (negative to take more), e.g. when a reservation
+        turned out larger than what was used, or was given up on."""
+        if tokens:
+            self._update(float(tokens))
+
+    def _record(self, wait):
+        with self._lock:
+            self._acquired += 1
+            self._last_wait = wait
+            if wait > 0:
+                self._delayed += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+
+    def stats(self) -> dict:
+        """Returns host-wide queue state and this process's wait-time counters."""
+        with self._lock:
+            try:
+                row = self._connection().execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                balance = self._refilled(row, self._clock())
+            except sqlite3.Error as e:
+                logger.warning(f"Could not read rate limiter state: {e}")
+                balance = None
+            stats = {
+                'name': self.name,
+                'rate_per_second': self.rate,
+                'capacity': self.capacity,
+                'tokens_available': max(0.0, balance) if balance is not None else None,
+                # Callers on the host that hold a reservation they are still waiting on
+                'queue_depth': math.ceil(-balance) if balance is not None and balance < 0 else 0,
+                'estimated_wait_seconds': max(0.0, -balance / self.rate) if balance is not None else None,
+                'process_waiting': self._waiting,
+                'process_acquired': self._acquired,
+                'process_delayed': self._delayed,
+                'process_total_wait_seconds': round(self._total_wait, 3),
+                'process_max_wait_seconds': round(self._max_wait, 3),
+                'process_last_wait_seconds': round(self._last_wait, 3),
+            }
+        return stats
+
+    def reset(self):
+        """Refills the bucket and clears this process's counters (mainly for tests)."""
+        with self._lock:
+            self._connection().execute("DELETE FROM rate_limit_buckets WHERE name = ?", (self.name,))
+            self._acquired = self._delayed = 0
+            self._total_wait = self._max_wait = self._last_wait = 0.0
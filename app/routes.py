@@ -1,23 +1,31 @@
-from flask import Blueprint, jsonify, render_template, current_app, request, flash, url_for, redirect
-from app.arxiv_api import search_papers
+from flask import Blueprint, jsonify, render_template, current_app, request, flash, url_for, redirect, make_response, Response, stream_with_context
+from app.arxiv_api import search_page, arxiv_rate_limiter, search_flight, search_cache, search_breaker
 # Updated custom exception imports
 from app.exceptions import (
     ArxivAPIException,
     NetworkException,
+    CircuitOpenException,
     ParsingException,
     ValidationException
 )
+import json
 import math
-import os # Added for OpenAI API Key
+from contextlib import closing
 import datetime # Added for subscription confirmation
-from openai import OpenAI, RateLimitError, APIError # Added for summarization
+from openai import RateLimitError, APIError # Added for summarization
 from threading import Thread
 
 # Imports for subscription routes
 from app.models import db, Subscription, _generate_email_hash
 from app.utils import send_email, generate_confirmation_token, verify_confirmation_token
-from app import limiter # Import limiter from app/__init__.py
-from app.scheduler import send_weekly_newsletter_job, summarize_abstracts_for_newsletter # Import the newsletter job and summarize_abstracts_for_newsletter
+from app import limiter, cache # Import limiter and cache from app/__init__.py
+from app import paper_store, local_search, paper_index, http_cache, fragment_cache, summary_store
+from app.summarizer import (summarize_papers, iter_summaries, single_summary_prompt, stream_single_summary, MODEL as SUMMARY_MODEL,
+                            SINGLE_SUMMARY_PROMPT_ID, SINGLE_SUMMARY_SYSTEM_PROMPT, SINGLE_SUMMARY_TEMPERATURE, SINGLE_SUMMARY_MAX_TOKENS)
+from app.summary_store import SummarySpec
+from app.llm_client import get_client as get_llm_client, llm_governor, estimate_tokens, response_tokens, QUEUE_TIMEOUT_SECONDS
+from app.llm_governor import GovernorTimeout
+from app.scheduler import send_weekly_newsletter_job, summarize_abstracts_for_newsletter, select_newsletter_papers, newsletter_index, NEWSLETTER_DAYS # Newsletter job and helpers shared with the test send
 
 main = Blueprint('main', __name__)
 
@@ -38,73 +46,202 @@ def index():
     # For now, the template handles display based on query presence.
     return render_template('index.html', title='Homepage') # Simplified from root app.py, can be enhanced later
 
+def _search_page_with_fallback(query, start_index, count):
+    """
+    Returns (result, from_local_index) for one /search page.
+
+    Pages come from arXiv through search_page unless the request asks for ?source=local. With
+    SEARCH_LOCAL_FALLBACK on, pages that need an arXiv fetch while the circuit breaker is open
+    (recent fetches slow or failing), or whose fetch fails with a network error, are answered
+    from the local full-text index of previously fetched papers instead. Pages in the search
+    cache are served from it either way.
+    """
+    if request.args.get('source') == 'local' and local_search.is_available():
+        return local_search.local_search(query, start_index, count), True
+    fallback = current_app.config.get('SEARCH_LOCAL_FALLBACK', True) and local_search.is_available()
+    try:
+        # Sliced from cached SEARCH_CHUNK_SIZE chunks; the breaker only gates uncached fetches
+        return search_page(query=query, start_index=start_index, count=count, use_circuit_breaker=fallback), False
+    except CircuitOpenException:
+        current_app.logger.info(f'arXiv circuit is open; answering "{query}" from the local index.')
+        return local_search.local_search(query, start_index, count), True
+    except NetworkException as e:
+        if not fallback:
+            raise
+        current_app.logger.warning(f'arXiv unavailable for "{query}" ({e}); answering from the local index.')
+        return local_search.local_search(query, start_index, count), True
+
+def _search_results_page(query, page, results_per_page):
+    """
+    Fetches one page of results for /search and /api/search.
+
+    Returns:
+        A dictionary with 'papers', 'total_results', 'total_pages', 'start_index', 'stale'
+        (served from an expired cache entry) and 'local' (answered from the local index).
+    Raises:
+        The arXiv client exceptions (see _search_error_message).
+    """
+    start_index = (page - 1) * results_per_page
+    current_app.logger.info(f'Searching for query: "{query}", page: {page}, start_index: {start_index}, count: {results_per_page}')
+
+    api_result, local_results = _search_page_with_fallback(query, start_index, results_per_page)
+
+    papers = api_result['papers']
+    total_results_count = api_result['total_results']
+
+    if total_results_count > 0 and results_per_page > 0:
+        total_pages = math.ceil(total_results_count / results_per_page)
+    else:
+        total_pages = 0
+
+    if not papers and total_results_count > 0 and page > total_pages and total_pages > 0:
+        current_app.logger.warning(f"Requested page {page} is out of bounds ({total_pages} total pages).")
+
+    current_app.logger.info(f'Query "{query}" yielded {len(papers)} papers on page {page}. Total results: {total_results_count}, Total pages: {total_pages}')
+    return {
+        'papers': papers,
+        'total_results': total_results_count,
+        'total_pages': total_pages,
+        'start_index': start_index,
+        'stale': api_result.get('stale', False), # arXiv unavailable; served the last known results
+        'local': local_results
+    }
+
+def _search_error_message(query, e):
+    """Logs a failed search and returns the message shown to the user."""
+    if isinstance(e, ValidationException):
+        current_app.logger.warning(f'Validation error for query "{query}": {e}', exc_info=True)
+        return str(e) # Simpler error message from root app.py
+    if isinstance(e, ArxivAPIException):
+        current_app.logger.error(f"arXiv API error for query '{query}': {e} (Status: {e.status_code if hasattr(e, 'status_code') else 'N/A'})")
+        return str(e) # Simpler error message from root app.py
+    if isinstance(e, NetworkException): # Added from root app.py logic
+        current_app.logger.error(f'Network error for query "{query}": {e}', exc_info=True)
+        error_message = "Could not connect to the arXiv service. Please check your internet connection or try again later."
+        if hasattr(e, 'status_code') and e.status_code:
+            error_message += f" (Server responded with status: {e.status_code})"
+        return error_message
+    if isinstance(e, ParsingException): # Added from root app.py logic
+        current_app.logger.error(f'Parsing error for query "{query}": {e}', exc_info=True)
+        return "There was an issue processing the data received from arXiv. Please try again. If the problem persists, the arXiv service might be temporarily unavailable."
+    current_app.logger.error(f'Unexpected error during search for query "{query}": {e}', exc_info=True)
+    return "An unexpected error occurred. Please try again later."
+
+def _search_results_context(query, page, results_per_page, results=None, error_message=None):
+    """
+    Template context of partials/search_results.html, which renders the results block for both
+    /search and /api/search, for a _search_results_page result or an error message.
+    """
+    papers = results['papers'] if results else []
+    if results and not papers and results['total_results'] == 0:
+        error_message = f"No results found for '{query}'."
+    start_index = results['start_index'] if results else 0
+    return dict(query=query,
+                papers=papers,
+                error_message=error_message,
+                page=page,
+                total_pages=results['total_pages'] if results else 0,
+                total_results=results['total_results'] if results else 0,
+                results_per_page=results_per_page,
+                stale_results=results['stale'] if results else False,
+                local_results=results['local'] if results else False,
+                start_index=start_index if papers else 0, # Corrected start_index and end_index from root app.py
+                end_index=start_index + len(papers) - 1 if papers else start_index)
+
 @main.route('/search')
 def search():
     query = request.args.get('query', '').strip()
-    papers = []
-    error_message = None
     page = request.args.get('page', 1, type=int)
     if page < 1:
         page = 1
-    total_pages = 0
-    total_results_count = 0
     results_per_page = current_app.config.get('RESULTS_PER_PAGE', 10)
 
     if not query:
         return render_template('index.html', title='Search', query=query, error_message="Please enter a search query.",
                                page=page, total_pages=0, total_results=0, papers=[]) # Pass all expected args
 
+    results = None
     try:
-        start_index = (page - 1) * results_per_page
-        current_app.logger.info(f'Searching for query: "{query}", page: {page}, start_index: {start_index}, count: {results_per_page}')
-        
-        api_result = search_papers(query=query, start_index=start_index, count=results_per_page)
-        
-        papers = api_result['papers']
-        total_results_count = api_result['total_results']
-        
-        if total_results_count > 0 and results_per_page > 0:
-            total_pages = math.ceil(total_results_count / results_per_page)
-        else:
-            total_pages = 0 
-
-        if not papers and total_results_count > 0 and page > total_pages and total_pages > 0:
-             current_app.logger.warning(f"Requested page {page} is out of bounds ({total_pages} total pages).")
-        if not papers and total_results_count == 0 and query:
-            error_message = f"No results found for '{query}'."
+        results = _search_results_page(query, page, results_per_page)
+        context = _search_results_context(query, page, results_per_page, results)
+    except Exception as e:
+        context = _search_results_context(query, page, results_per_page, error_message=_search_error_message(query, e))
+    papers, error_message = context['papers'], context['error_message']
+
+    results_block = None
+    if results is not None:
+        # Revalidations are answered from the (cached) results, before rendering
+        etag = http_cache.search_etag(query, page, results_per_page, results)
+        max_age = http_cache.search_max_age(results)
+        cached_response = http_cache.not_modified(etag, max_age)
+        if cached_response is not None:
+            return cached_response
+        results_block = fragment_cache.render_results_block(etag, **context)
+
+    response = make_response(render_template('index.html', 
+                           title=f'Search Results for "{query}"' if query and not error_message and papers else 'Search', 
+                           results_block=results_block,
+                           **context))
+    if results is not None:
+        http_cache.apply_cache_headers(response, etag, max_age)
+    return response
+
+# HTTP status of /api/search errors, by exception type
+_SEARCH_API_ERROR_STATUS = (
+    (ValidationException, 400),
+    (NetworkException, 503),
+    (ArxivAPIException, 502),
+    (ParsingException, 502),
+)
 
-        current_app.logger.info(f'Query "{query}" yielded {len(papers)} papers on page {page}. Total results: {total_results_count}, Total pages: {total_pages}')
+@main.route('/api/search')
+def api_search():
+    """
+    JSON version of /search, used by the front end to flip pages without rendering the layout.
+
+    Takes the same query, page and source parameters and returns the page's papers
+    (ArxivPaper.to_dict), pagination and where the results came from: 'stale' when arXiv
+    was unavailable and the last cached results were served, 'local' when they come from
+    the local index. 'html' is the results block rendered from partials/search_results.html
+    (through the fragment cache, shared with /search), which the front end displays as is.
+    Caching headers and 304s work as for /search (see http_cache).
+    Errors are returned as {"error": message, "html": error block} with a 4xx/5xx status.
+    """
+    query = request.args.get('query', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    results_per_page = current_app.config.get('RESULTS_PER_PAGE', 10)
+    if not query:
+        return jsonify({'error': "Please enter a search query."}), 400
 
-    except ValidationException as e:
-        current_app.logger.warning(f'Validation error for query "{query}": {e}', exc_info=True)
-        error_message = str(e) # Simpler error message from root app.py
-    except ArxivAPIException as e:
-        current_app.logger.error(f"arXiv API error for query '{query}': {e} (Status: {e.status_code if hasattr(e, 'status_code') else 'N/A'})")
-        error_message = str(e) # Simpler error message from root app.py
-    except NetworkException as e: # Added from root app.py logic
-        current_app.logger.error(f'Network error for query "{query}": {e}', exc_info=True)
-        error_message = "Could not connect to the arXiv service. Please check your internet connection or try again later."
-        if hasattr(e, 'status_code') and e.status_code:
-             error_message += f" (Server responded with status: {e.status_code})"
-    except ParsingException as e: # Added from root app.py logic
-        current_app.logger.error(f'Parsing error for query "{query}": {e}', exc_info=True)
-        error_message = "There was an issue processing the data received from arXiv. Please try again. If the problem persists, the arXiv service might be temporarily unavailable."
-    except Exception as e: 
-        current_app.logger.error(f'Unexpected error during search for query "{query}": {e}', exc_info=True)
-        error_message = "An unexpected error occurred. Please try again later."
-    
-    return render_template('index.html', 
-                           title=f'Search Results for "{query}"' if query and not error_message and papers else 'Search', 
-                           query=query, 
-                           papers=papers, 
-                           error_message=error_message,
-                           page=page,
-                           total_pages=total_pages,
-                           total_results=total_results_count,
-                           results_per_page=results_per_page,
-                           start_index=start_index if papers else 0, # Corrected start_index and end_index from root app.py
-                           end_index=start_index + len(papers) -1 if papers else (start_index if query else 0)
-                           ) 
+    try:
+        results = _search_results_page(query, page, results_per_page)
+    except Exception as e:
+        status = next((code for exc_type, code in _SEARCH_API_ERROR_STATUS if isinstance(e, exc_type)), 500)
+        error_message = _search_error_message(query, e)
+        html = render_template('partials/search_results.html',
+                               **_search_results_context(query, page, results_per_page, error_message=error_message))
+        return jsonify({'error': error_message, 'html': html}), status
+
+    etag = http_cache.search_etag(query, page, results_per_page, results, variant='json')
+    max_age = http_cache.search_max_age(results)
+    cached_response = http_cache.not_modified(etag, max_age)
+    if cached_response is not None:
+        return cached_response
+
+    html = fragment_cache.render_results_block(http_cache.search_etag(query, page, results_per_page, results),
+                                               **_search_results_context(query, page, results_per_page, results))
+    response = jsonify({
+        'query': query,
+        'page': page,
+        'results_per_page': results_per_page,
+        'total_results': results['total_results'],
+        'total_pages': results['total_pages'],
+        'stale': results['stale'],
+        'local': results['local'],
+        'papers': [paper.to_dict() for paper in results['papers']],
+        'html': html
+    })
+    return http_cache.apply_cache_headers(response, etag, max_age)
 
 # --- Routes moved from root app.py ---
 
@@ -122,82 +259,16 @@ def summarize_abstracts():
             current_app.logger.warning("No papers provided for summarization.")
             return jsonify({"error": "No papers provided."}), 400
 
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        client = get_llm_client() # Shared per process; summarize_papers retries, within its deadline
+        if client is None:
             current_app.logger.error("OPENAI_API_KEY not found in environment variables.")
             return jsonify({"error": "OpenAI API key not configured on the server."}), 500
-        
-        client = OpenAI(api_key=api_key)
-        
-        summarized_papers_data = []
-        max_retries_per_paper = 2
-
-        for paper_data in input_papers:
-            if not isinstance(paper_data, dict) or not all(key in paper_data for key in ['id', 'title', 'abstract_text']):
-                current_app.logger.warning(f"Skipping invalid paper object: {paper_data}")
-                summarized_papers_data.append({
-                    "id": paper_data.get("id", "unknown"), 
-                    "title": paper_data.get("title", "Unknown Title"), 
-                    "takeaways_text": "Error: Invalid paper data provided."
-                })
-                continue
-
-            paper_id = paper_data['id']
-            title = paper_data['title']
-            abstract = paper_data['abstract_text']
-
-            if not abstract or not abstract.strip():
-                current_app.logger.warning(f"Empty abstract for paper ID {paper_id} ('{title}'). Skipping summarization for this paper.")
-                summarized_papers_data.append({
-                    "id": paper_id, 
-                    "title": title, 
-                    "takeaways_text": "Abstract was empty, no takeaways generated."
-                })
-                continue
-            
-            # Truncate individual abstract if too long (though less likely for single abstracts)
-            max_words_per_abstract = 3000 
-            if len(abstract.split()) > max_words_per_abstract:
-                current_app.logger.warning(f"Abstract for paper '{title}' (ID: {paper_id}) exceeds {max_words_per_abstract} words. Truncating.")
-                abstract = ' '.join(abstract.split()[:max_words_per_abstract])
-
-            prompt = (
-                f"Extract exactly 3 key takeaways from the following research paper abstract. Present these takeaways as a numbered list. "
-                f"Each takeaway should be concise and highlight a main contribution, finding, or methodology.\n\n"
-                f"Title: {title}\n"
-                f"Abstract:\n{abstract}"
-            )
-            current_app.logger.info(f"Attempting to generate 3 key takeaways for paper: '{title}' (ID: {paper_id}).")
-            
-            takeaways_text = "Error: Could not generate takeaways."
-            for attempt in range(max_retries_per_paper):
-                try:
-                    response = client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[
-                            {"role": "system", "content": "You are a helpful assistant skilled in extracting key takeaways from academic research papers."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        temperature=0.5,
-                        max_tokens=300 # Max tokens for 3 takeaways from one abstract
-                    )
-                    takeaways_text = response.choices[0].message.content.strip()
-                    current_app.logger.info(f"Successfully generated takeaways for paper '{title}' (ID: {paper_id}).")
-                    break 
-                except RateLimitError as e:
-                    current_app.logger.warning(f"OpenAI RateLimitError for paper '{title}' (attempt {attempt + 1}/{max_retries_per_paper}): {e}")
-                    if attempt + 1 == max_retries_per_paper:
-                        takeaways_text = "Error: OpenAI API rate limit exceeded."
-                except APIError as e:
-                    current_app.logger.error(f"OpenAI API error for paper '{title}' (attempt {attempt + 1}/{max_retries_per_paper}): {e}")
-                    if attempt + 1 == max_retries_per_paper:
-                        takeaways_text = f"Error: OpenAI API error ({str(e)})."
-                except Exception as e:
-                    current_app.logger.error(f"Unexpected error for paper '{title}' (attempt {attempt + 1}/{max_retries_per_paper}): {e}")
-                    if attempt + 1 == max_retries_per_paper:
-                        takeaways_text = "Error: Unexpected error during takeaway generation."
-            
-            summarized_papers_data.append({"id": paper_id, "title": title, "takeaways_text": takeaways_text})
+        summarized_papers_data = summarize_papers(
+            input_papers, client,
+            max_concurrency=current_app.config.get('SUMMARY_MAX_CONCURRENCY', 5),
+            deadline=current_app.config.get('SUMMARY_DEADLINE', 30),
+            max_attempts=current_app.config.get('SUMMARY_MAX_ATTEMPTS', 2)
+        )
 
         current_app.logger.info(f"Finished processing {len(input_papers)} papers for key takeaways.")
         return jsonify({"papers_with_takeaways": summarized_papers_data})
@@ -206,6 +277,61 @@ def summarize_abstracts():
         current_app.logger.error(f"Error in /api/summarize_papers: {e}", exc_info=True)
         return jsonify({"error": "An internal server error occurred processing paper takeaways."}), 500
 
+def _sse(event: str, data: dict) -> str:
+    """Formats one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@main.route('/api/summarize_papers/stream', methods=['POST'])
+def summarize_abstracts_stream():
+    """
+    Streaming variant of /api/summarize_papers: the same request body, answered with
+    server-sent events as papers complete instead of one JSON document at the end.
+
+    Events: 'takeaways' ({index, id, title, takeaways_text}) per summarized paper, 'error'
+    (the same fields) per paper that could not be summarized, 'progress' ({done, total}) after
+    each paper, then 'done' ({total}). A failure of the whole request is an 'error' event with
+    just an 'error' message, after which the stream ends.
+    """
+    current_app.logger.info("Received request to /api/summarize_papers/stream")
+    data = request.get_json(silent=True)
+    if not data or 'papers' not in data or not isinstance(data['papers'], list):
+        current_app.logger.warning("Invalid request format: 'papers' field missing or not a list of objects.")
+        return jsonify({"error": "Invalid request format. 'papers' field (list of objects with id, title, abstract_text) is required."}), 400
+    input_papers = data['papers']
+    if not input_papers:
+        current_app.logger.warning("No papers provided for summarization.")
+        return jsonify({"error": "No papers provided."}), 400
+    client = get_llm_client()
+    if client is None:
+        current_app.logger.error("OPENAI_API_KEY not found in environment variables.")
+        return jsonify({"error": "OpenAI API key not configured on the server."}), 500
+
+    def events():
+        total = len(input_papers)
+        done = 0
+        yield _sse('progress', {'done': done, 'total': total})
+        try:
+            for index, result, ok in iter_summaries(
+                input_papers, client,
+                max_concurrency=current_app.config.get('SUMMARY_MAX_CONCURRENCY', 5),
+                deadline=current_app.config.get('SUMMARY_DEADLINE', 30),
+                max_attempts=current_app.config.get('SUMMARY_MAX_ATTEMPTS', 2)
+            ):
+                done += 1
+                yield _sse('takeaways' if ok else 'error', {'index': index, **result})
+                yield _sse('progress', {'done': done, 'total': total})
+        except Exception as e:
+            current_app.logger.error(f"Error in /api/summarize_papers/stream: {e}", exc_info=True)
+            yield _sse('error', {'error': "An internal server error occurred processing paper takeaways."})
+            return
+        current_app.logger.info(f"Finished streaming takeaways for {total} papers.")
+        yield _sse('done', {'total': total})
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Keep reverse proxies from buffering the stream
+    return response
+
 @main.route('/api/summarize_single_paper', methods=['POST'])
 def summarize_single_paper():
     current_app.logger.info("Received request to /api/summarize_single_paper")
@@ -223,36 +349,41 @@ def summarize_single_paper():
             current_app.logger.warning(f"Empty abstract provided for paper {paper_id} ({title}).")
             return jsonify({"error": "Cannot summarize an empty abstract."}), 400
 
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        spec = SummarySpec(str(paper_id), title, abstract, SINGLE_SUMMARY_PROMPT_ID, SUMMARY_MODEL, SINGLE_SUMMARY_TEMPERATURE)
+        stored_summary = summary_store.get_summary(spec)
+        if stored_summary is not None:
+            current_app.logger.info(f"Returning stored single paper summary for {paper_id}.")
+            return jsonify({"single_paper_summary": stored_summary, "paper_id": paper_id, "title": title})
+
+        client = get_llm_client()
+        if client is None:
             current_app.logger.error("OPENAI_API_KEY not found.")
             return jsonify({"error": "OpenAI API key not configured."}), 500
-        
-        client = OpenAI(api_key=api_key)
-        prompt = (
-            f"Please provide a detailed, structured summary of the research paper titled '{title}'. "
-            f"The summary should be suitable for a single page (approximately 300-500 words). "
-            f"Focus on clearly articulating the paper's core problem, objectives, key methodologies, main findings/results, and primary conclusions or contributions. "
-            f"Organize the summary logically, perhaps with subheadings for clarity if appropriate (e.g., Introduction/Background, Methods, Results, Discussion/Conclusion). "
-            f"Avoid overly technical jargon where possible, or briefly explain it. Ensure the summary is comprehensive yet concise.\\n\\n"
-            f"Abstract of the paper:\n{abstract}"
-        )
+
+        messages = [
+            {"role": "system", "content": SINGLE_SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": single_summary_prompt(title, abstract)}
+        ]
+        queue_timeout = current_app.config.get('LLM_QUEUE_TIMEOUT', QUEUE_TIMEOUT_SECONDS)
         current_app.logger.info(f"Attempting to generate detailed summary for paper: {paper_id} - '{title}'")
         max_retries = 2
         for attempt in range(max_retries):
             try:
-                response = client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are an expert research assistant, skilled at creating detailed and structured summaries of academic papers."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.4,
-                    max_tokens=1200
-                )
+                with llm_governor.request(estimate_tokens(messages, SINGLE_SUMMARY_MAX_TOKENS), timeout=queue_timeout) as lease:
+                    response = client.chat.completions.create(
+                        model=SUMMARY_MODEL,
+                        messages=messages,
+                        temperature=SINGLE_SUMMARY_TEMPERATURE,
+                        max_tokens=SINGLE_SUMMARY_MAX_TOKENS
+                    )
+                    lease.used_tokens = response_tokens(response)
                 single_summary = response.choices[0].message.content.strip()
+                summary_store.store_summary(spec, single_summary)
                 current_app.logger.info(f"Successfully generated single paper summary for {paper_id}.")
                 return jsonify({"single_paper_summary": single_summary, "paper_id": paper_id, "title": title})
+            except GovernorTimeout:
+                current_app.logger.warning(f"No LLM capacity for single paper summary of {paper_id} within {queue_timeout}s.")
+                return jsonify({"error": "The summarization service is busy. Please try again shortly.", "paper_id": paper_id}), 503
             except RateLimitError as e:
                 current_app.logger.warning(f"OpenAI RateLimitError (single paper summary, attempt {attempt + 1}/{max_retries}): {e}")
                 if attempt + 1 == max_retries:
@@ -270,10 +401,102 @@ def summarize_single_paper():
         current_app.logger.error(f"Error in /api/summarize_single_paper: {e}", exc_info=True)
         return jsonify({"error": "An internal server error occurred."}), 500
 
+@main.route('/api/summarize_single_paper/stream', methods=['POST'])
+def summarize_single_paper_stream():
+    """
+    Streaming variant of /api/summarize_single_paper: the same request body, answered with
+    server-sent events carrying the summary as the model generates it.
+
+    Events: 'delta' ({text}) per piece of generated text, then 'done' ({single_paper_summary,
+    paper_id, title}) with the whole summary, or 'error' ({error, paper_id}). A stored summary
+    is sent as a single delta. When the client disconnects, the completion is closed so the
+    remaining tokens aren't generated; only completed summaries are stored.
+    """
+    current_app.logger.info("Received request to /api/summarize_single_paper/stream")
+    data = request.get_json(silent=True)
+    if not data or not all(key in data for key in ['paper_id', 'title', 'abstract_text']):
+        current_app.logger.warning("Invalid request format for single paper summary.")
+        return jsonify({"error": "Invalid request. 'paper_id', 'title', and 'abstract_text' are required."}), 400
+
+    paper_id = data['paper_id']
+    title = data['title']
+    abstract = data['abstract_text']
+    if not abstract or not abstract.strip():
+        current_app.logger.warning(f"Empty abstract provided for paper {paper_id} ({title}).")
+        return jsonify({"error": "Cannot summarize an empty abstract."}), 400
+
+    spec = SummarySpec(str(paper_id), title, abstract, SINGLE_SUMMARY_PROMPT_ID, SUMMARY_MODEL, SINGLE_SUMMARY_TEMPERATURE)
+    stored_summary = summary_store.get_summary(spec)
+    client = get_llm_client() if stored_summary is None else None
+    if stored_summary is None and client is None:
+        current_app.logger.error("OPENAI_API_KEY not found.")
+        return jsonify({"error": "OpenAI API key not configured."}), 500
+    queue_timeout = current_app.config.get('LLM_QUEUE_TIMEOUT', QUEUE_TIMEOUT_SECONDS)
+
+    def events():
+        if stored_summary is not None:
+            current_app.logger.info(f"Returning stored single paper summary for {paper_id}.")
+            yield _sse('delta', {'text': stored_summary})
+            yield _sse('done', {'single_paper_summary': stored_summary, 'paper_id': paper_id, 'title': title})
+            return
+        current_app.logger.info(f"Streaming detailed summary for paper: {paper_id} - '{title}'")
+        parts = []
+        try:
+            # closing() ends the completion as soon as this generator is closed by a client disconnect
+            with closing(stream_single_summary(client, title, abstract, queue_timeout=queue_timeout)) as deltas:
+                for text in deltas:
+                    parts.append(text)
+                    yield _sse('delta', {'text': text})
+        except GeneratorExit:
+            current_app.logger.info(f"Client disconnected; stopped single paper summary for {paper_id} after {len(parts)} chunks.")
+            raise
+        except GovernorTimeout:
+            current_app.logger.warning(f"No LLM capacity for streamed single paper summary of {paper_id} within {queue_timeout}s.")
+            yield _sse('error', {'error': "The summarization service is busy. Please try again shortly.", 'paper_id': paper_id})
+            return
+        except RateLimitError as e:
+            current_app.logger.warning(f"OpenAI RateLimitError (streamed single paper summary): {e}")
+            yield _sse('error', {'error': "OpenAI API rate limit exceeded. Please try again later.", 'paper_id': paper_id})
+            return
+        except APIError as e:
+            current_app.logger.error(f"OpenAI API error (streamed single paper summary): {e}")
+            yield _sse('error', {'error': f"An error occurred with the OpenAI API: {str(e)}", 'paper_id': paper_id})
+            return
+        except Exception as e:
+            current_app.logger.error(f"Error in /api/summarize_single_paper/stream: {e}", exc_info=True)
+            yield _sse('error', {'error': "An unexpected error occurred while generating the single paper summary.", 'paper_id': paper_id})
+            return
+        single_summary = ''.join(parts).strip()
+        if single_summary:
+            summary_store.store_summary(spec, single_summary)
+        current_app.logger.info(f"Successfully streamed single paper summary for {paper_id}.")
+        yield _sse('done', {'single_paper_summary': single_summary, 'paper_id': paper_id, 'title': title})
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Keep reverse proxies from buffering the stream
+    return response
+
 @main.route('/health')
 def health_check():
     return jsonify({"status": "ok", "message": "Application is healthy"}), 200
 
+@main.route('/admin/metrics', methods=['GET'])
+def metrics():
+    """Operational counters for the arXiv client (rate limiter queue depth and wait times, coalesced searches, search cache states, cache tier hit rates, paper store writes, local search fallback state, mapped paper indexes, rendered fragment cache hits, stored LLM summaries, LLM request queue and latency)."""
+    return jsonify({
+        "arxiv_rate_limiter": arxiv_rate_limiter.stats(),
+        "search_single_flight": search_flight.stats(),
+        "search_cache": search_cache.stats(),
+        "cache_backend": cache.cache.stats() if hasattr(cache.cache, 'stats') else None,
+        "paper_store": paper_store.stats(),
+        "search_circuit_breaker": search_breaker.stats(),
+        "paper_index": paper_index.stats(),
+        "fragment_cache": fragment_cache.stats(),
+        "summary_store": summary_store.stats(),
+        "llm_governor": llm_governor.stats()
+    }), 200
+
 # --- Subscription Routes ---
 @main.route('/subscribe', methods=['POST'])
 @limiter.limit(lambda: current_app.config.get('RATELIMIT_SUBSCRIBE', "10 per minute")) # Uncommented and using imported limiter
@@ -452,22 +675,8 @@ def send_test_email_route():
     try:
         # --- Simplified single-user newsletter generation logic (adapted from scheduler.py) ---
         # 1. Fetch papers based on test_query
-        arxiv_results = search_papers(query=test_query, count=20, sort_by='submittedDate', sort_order='descending')
-        raw_papers = arxiv_results.get('papers', [])
-        one_week_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=7)
-        filtered_papers = []
-        for paper_obj in raw_papers:
-            published_dt = paper_obj.published_date
-            if published_dt and published_dt >= one_week_ago:
-                filtered_papers.append({
-                    'id': paper_obj.id_str,
-                    'title': paper_obj.title,
-                    'summary': paper_obj.summary,
-                    'pdf_link': paper_obj.pdf_link,
-                    'published_date': published_dt.isoformat(),
-                    'authors': paper_obj.authors,
-                    'primary_category': paper_obj.primary_category
-                })
+        one_week_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=NEWSLETTER_DAYS)
+        filtered_papers = select_newsletter_papers(test_query, one_week_ago, index=newsletter_index())
         
         if not filtered_papers:
             current_app.logger.info(f"Admin Test: No recent papers found for query '{test_query}'.")
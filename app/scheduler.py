@@ -1,31 +1,55 @@
-import os
+import re
 from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 from flask import current_app, render_template, url_for
-from openai import OpenAI, RateLimitError, APIError
+from openai import RateLimitError, APIError
 
 from .models import db, Subscription # Assuming models.py is in the same directory (app)
+from . import paper_index, summary_store
+from .summary_store import SummarySpec
+from .llm_client import get_client as get_llm_client, llm_governor, estimate_tokens, response_tokens, BATCH_QUEUE_TIMEOUT_SECONDS
+from .llm_governor import GovernorTimeout, BATCH
 from .utils import send_email # Or send_email_via_gmail_api if 12.4 was done
-from .arxiv_api import search_papers, ArxivAPIException, NetworkException, ParsingException, ValidationException
+from .arxiv_api import search_papers, search_papers_concurrently, ArxivAPIException, NetworkException, ParsingException, ValidationException
 
 # --- Direct AI Summarization Utility ---
+NEWSLETTER_SUMMARY_MODEL = "gpt-3.5-turbo"
+NEWSLETTER_SUMMARY_TEMPERATURE = 0.3
+NEWSLETTER_SUMMARY_PROMPT_ID = "newsletter-takeaways-v1" # Bump when editing the prompts below so stored summaries are regenerated
+
+def _newsletter_summary_spec(paper: dict) -> SummarySpec:
+    return SummarySpec(str(paper.get('id')), paper.get('title', 'N/A'), paper.get('summary', 'N/A'),
+                       NEWSLETTER_SUMMARY_PROMPT_ID, NEWSLETTER_SUMMARY_MODEL, NEWSLETTER_SUMMARY_TEMPERATURE)
+
 def summarize_abstracts_for_newsletter(abstracts_data: list, max_papers_to_summarize=5):
     """
     Generates summaries for a list of paper abstracts using OpenAI.
     abstracts_data: list of dicts, each like {'id': str, 'title': str, 'summary': str (original abstract), 'pdf_link': str, 'published_date': str}
     Returns a list of dicts, each with original paper data + 'ai_summary': str
+    Summaries already in the summary store are reused, so a paper shared by many subscribers' newsletters is summarized once.
+    OpenAI calls run at batch priority, so they only use LLM capacity interactive requests leave spare.
     """
     if not abstracts_data:
         return []
 
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    if not client.api_key:
+    papers_to_process = abstracts_data[:max_papers_to_summarize]
+    specs = [_newsletter_summary_spec(paper) for paper in papers_to_process]
+    stored = summary_store.get_summaries(specs)
+    if len(stored) == len({spec.key for spec in specs}):
+        current_app.logger.info(f"Newsletter: Using stored summaries for all {len(papers_to_process)} papers.")
+        return [{**paper, 'ai_summary': stored[spec.key]} for paper, spec in zip(papers_to_process, specs)]
+
+    client = get_llm_client()
+    if client is None:
         current_app.logger.error("Newsletter: OPENAI_API_KEY not configured.")
         return abstracts_data # Return original data, summarization failed
 
     summarized_papers_content = []
-    papers_to_process = abstracts_data[:max_papers_to_summarize]
 
-    for paper in papers_to_process:
+    for paper, spec in zip(papers_to_process, specs):
+        if spec.key in stored:
+            summarized_papers_content.append({**paper, 'ai_summary': stored[spec.key]})
+            continue
         prompt = (
             f"Extract exactly 3 key takeaways from the following research paper abstract. Present these takeaways as a numbered list. IMPORTANT: Each numbered takeaway MUST start on a new line, ideally separated by an HTML <br> tag.\n"
             f"Each takeaway should be concise and highlight a main contribution, finding, or methodology.\n\n"
@@ -33,20 +57,31 @@ def summarize_abstracts_for_newsletter(abstracts_data: list, max_papers_to_summa
             f"Abstract: {paper.get('summary', 'N/A')}"
         )
         
+        messages = [
+            {"role": "system", "content": "You are an assistant skilled in summarizing academic research paper abstracts concisely for a newsletter."},
+            {"role": "user", "content": prompt}
+        ]
         try:
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are an assistant skilled in summarizing academic research paper abstracts concisely for a newsletter."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=300 # Increased from 150 for 3 takeaways
-            )
+            max_tokens = 300 # Increased from 150 for 3 takeaways
+            # Batch priority, admitted paper by paper: interactive summaries go first between papers
+            with llm_governor.request(estimate_tokens(messages, max_tokens), priority=BATCH,
+                                      timeout=current_app.config.get('LLM_BATCH_QUEUE_TIMEOUT', BATCH_QUEUE_TIMEOUT_SECONDS)) as lease:
+                response = client.chat.completions.create(
+                    model=NEWSLETTER_SUMMARY_MODEL,
+                    messages=messages,
+                    temperature=NEWSLETTER_SUMMARY_TEMPERATURE,
+                    max_tokens=max_tokens
+                )
+                lease.used_tokens = response_tokens(response)
             ai_summary = response.choices[0].message.content.strip()
+            stored[spec.key] = ai_summary # Duplicate papers in the list reuse it
+            summary_store.store_summary(spec, ai_summary)
             paper_with_summary = {**paper, 'ai_summary': ai_summary}
             summarized_papers_content.append(paper_with_summary)
             current_app.logger.info(f"Newsletter: Successfully summarized paper ID {paper.get('id')}")
+        except GovernorTimeout:
+            current_app.logger.warning(f"Newsletter: No LLM capacity for paper ID {paper.get('id')}. Skipping summary for this paper.")
+            summarized_papers_content.append({**paper, 'ai_summary': "Summary currently unavailable (service busy)."})
         except RateLimitError:
             current_app.logger.warning(f"Newsletter: OpenAI RateLimitError for paper ID {paper.get('id')}. Skipping summary for this paper.")
             summarized_papers_content.append({**paper, 'ai_summary': "Summary currently unavailable (rate limit)."})
@@ -66,6 +101,59 @@ def summarize_abstracts_for_newsletter(abstracts_data: list, max_papers_to_summa
     return summarized_papers_content
 
 # --- Scheduled Job ---
+# Search used for every subscriber; shared by the prefetch and the per-subscriber loop
+NEWSLETTER_SEARCH_PARAMS = {'count': 20, 'sort_by': 'submittedDate', 'sort_order': 'descending'}
+NEWSLETTER_DAYS = 7 # Papers published this many days back make it into a newsletter
+# Queries made only of category terms joined by OR, e.g. "cat:cs.AI OR cat:cs.LG"
+_CATEGORY_QUERY_RE = re.compile(r'^\s*cat:[\w.\-]+(?:\s+OR\s+cat:[\w.\-]+)*\s*$')
+
+def _newsletter_query(subscriber) -> str:
+    """Returns the arXiv query for a subscriber, falling back to cs.AI when no keywords are set."""
+    return subscriber.keywords if subscriber.keywords and subscriber.keywords.strip() else "cat:cs.AI"
+
+def _query_categories(query: str) -> Optional[List[str]]:
+    """Returns the categories of a category-only query, or None if the query has other terms."""
+    if not _CATEGORY_QUERY_RE.match(query):
+        return None
+    return re.findall(r'cat:([\w.\-]+)', query)
+
+def newsletter_index():
+    """Returns the paper index if it was built within PAPER_INDEX_MAX_AGE, else None."""
+    index = paper_index.get_index()
+    if index is None or not index.built_at:
+        return None
+    age = (datetime.now(timezone.utc) - datetime.fromisoformat(index.built_at)).total_seconds()
+    return index if age <= current_app.config.get('PAPER_INDEX_MAX_AGE', 86400) else None
+
+def _newsletter_paper(paper_obj) -> dict:
+    return {
+        'id': paper_obj.id_str,
+        'title': paper_obj.title,
+        'summary': paper_obj.summary, # original abstract
+        'pdf_link': paper_obj.pdf_link,
+        'published_date': paper_obj.published_date.isoformat(), # ensure string for template
+        'authors': paper_obj.authors,
+        'primary_category': paper_obj.primary_category
+    }
+
+def select_newsletter_papers(query: str, since: datetime, index=None) -> List[dict]:
+    """
+    Returns up to NEWSLETTER_SEARCH_PARAMS['count'] of the newest papers matching `query`
+    published since `since`, as dicts for the newsletter template.
+
+    Category-only queries are answered from the paper index (see newsletter_index) when one is
+    given: a vectorized date and category mask over the index, without an arXiv call. Other
+    queries, or no index, search arXiv and keep the results published since `since`.
+    Raises the arXiv client exceptions.
+    """
+    categories = _query_categories(query)
+    if index is not None and categories:
+        rows = index.filter(categories=categories, published_since=since)[:NEWSLETTER_SEARCH_PARAMS['count']]
+        return [_newsletter_paper(paper_obj) for paper_obj in index.papers(rows)]
+    arxiv_results = search_papers(query=query, **NEWSLETTER_SEARCH_PARAMS)
+    return [_newsletter_paper(paper_obj) for paper_obj in arxiv_results.get('papers', [])
+            if paper_obj.published_date and paper_obj.published_date >= since]
+
 def send_weekly_newsletter_job():
     """
     Job to be scheduled weekly. Fetches new papers, summarizes them,
@@ -90,37 +178,32 @@ def send_weekly_newsletter_job():
         
         current_app.logger.info(f"Newsletter: Found {len(confirmed_subscribers)} confirmed subscribers.")
 
+        # Fetch every distinct subscriber query up front and concurrently; the per-subscriber
+        # search_papers calls below are then served from the cache. Failures are retried there.
+        # Category-only queries are answered from a recently built paper index instead.
+        index = newsletter_index()
+        newsletter_queries = sorted({_newsletter_query(subscriber) for subscriber in confirmed_subscribers})
+        if index is not None:
+            newsletter_queries = [query for query in newsletter_queries if _query_categories(query) is None]
+        prefetch_results = search_papers_concurrently(
+            [dict(query=query, **NEWSLETTER_SEARCH_PARAMS) for query in newsletter_queries]
+        )
+        for query, result in zip(newsletter_queries, prefetch_results):
+            if isinstance(result, Exception):
+                current_app.logger.warning(f"Newsletter: Prefetch failed for query '{query}': {result}")
+
         # --- Start of per-subscriber processing loop ---
         for subscriber in confirmed_subscribers:
             current_app.logger.info(f"Processing newsletter for subscriber: {subscriber.email_hash}")
             
             # 2. Select Relevant Papers (e.g., last 7 days, specific category or keywords)
-            subscriber_query = subscriber.keywords if subscriber.keywords and subscriber.keywords.strip() else "cat:cs.AI"
+            subscriber_query = _newsletter_query(subscriber)
             current_app.logger.info(f"Using query for subscriber {subscriber.email_hash}: '{subscriber_query}'")
 
-            newsletter_papers = [] # Renamed from recent_papers to avoid confusion, reset per subscriber
             try:
                 # Fetch more papers than we plan to summarize to have a selection
-                arxiv_results = search_papers(query=subscriber_query, count=20, sort_by='submittedDate', sort_order='descending')
-                
-                raw_papers = arxiv_results.get('papers', [])
-                
-                one_week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-                # Filter for papers from the last 7 days (approx)
-                # Name changed from recent_papers to filtered_papers to avoid confusion with the outer scope variable
-                filtered_papers = [] 
-                for paper_obj in raw_papers:
-                    published_dt = paper_obj.published_date 
-                    if published_dt and published_dt >= one_week_ago:
-                        filtered_papers.append({
-                            'id': paper_obj.id_str,
-                            'title': paper_obj.title,
-                            'summary': paper_obj.summary, # original abstract
-                            'pdf_link': paper_obj.pdf_link,
-                            'published_date': published_dt.isoformat(), # ensure string for template
-                            'authors': paper_obj.authors,
-                            'primary_category': paper_obj.primary_category
-                        })
+                one_week_ago = datetime.now(timezone.utc) - timedelta(days=NEWSLETTER_DAYS)
+                filtered_papers = select_newsletter_papers(subscriber_query, one_week_ago, index=index)
                 
                 if not filtered_papers:
                     current_app.logger.info(f"Newsletter: No recent papers found for subscriber {subscriber.email_hash} with query '{subscriber_query}'. Skipping for this subscriber.")
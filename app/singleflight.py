@@ -0,0 +1,210 @@
+# app/singleflight.py
+
+"""
+Single-flight coalescing for expensive calls.
+
+Concurrent callers asking for the same key while a call for it is already in flight
+wait for that call and share its result (or exception) instead of starting their own.
+
+Coalescing happens at two levels:
+  * Threads of one worker process wait on an in-process event.
+  * Worker processes coordinate through a lock key in the Flask-Caching backend
+    (`cache.add` is used as an atomic "set if absent"). The worker that takes the lock
+    publishes its result under a short-lived result key that the other workers poll.
+    This only spans workers when the configured backend is shared between them; with
+    a per-process backend such as SimpleCache it degrades to thread-level coalescing.
+
+Exceptions are only shared inside a process. When another worker's call fails, the
+waiting workers notice the lock disappearing without a result and one of them retries.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+
+from flask import has_app_context
+
+from .extensions import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WAIT_TIMEOUT_SECONDS = 45 # How long followers wait on another worker's call before calling themselves
+DEFAULT_POLL_INTERVAL_SECONDS = 0.1 # How often followers check the shared cache for the leader's result
+DEFAULT_RESULT_TTL_SECONDS = 30 # How long a published result stays readable by followers
+
+
+class _InFlightCall:
+    """A call in progress in this process; followers wait on `done`."""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key.
+
+    Args:
+        name: Group name, used in shared cache keys and metrics.
+        wait_timeout: Seconds a follower waits for an in-flight call (in this or another worker) before making the call itself.
+            Also the lifetime of the shared lock, so a crashed leader cannot block others for longer.
+        poll_interval: Seconds between checks of the shared cache while following another worker.
+        result_ttl: Seconds a published result remains available to followers in other workers.
+        shared: Whether to coordinate with other workers through the cache backend.
+    """
+
+    def __init__(self, name, wait_timeout=DEFAULT_WAIT_TIMEOUT_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL_SECONDS,
+                 result_ttl=DEFAULT_RESULT_TTL_SECONDS, shared=True):
+        self.name = name
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._calls = {}
+        # Per-process counters, reported by stats()
+        self._requests = 0
+        self._executions = 0
+        self._coalesced_local = 0
+        self._coalesced_remote = 0
+        self._wait_timeouts = 0
+
+    def configure(self, wait_timeout=None, shared=None):
+        """Updates the coordination parameters, e.g. from the Flask config in create_app."""
+        if wait_timeout is not None:
+            self.wait_timeout = wait_timeout
+        if shared is not None:
+            self.shared = shared
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Calls fn(*args, **kwargs) unless a call for `key` is already in flight, in which case
+        waits for it and returns its result (or raises its exception).
+
+        Args:
+            key: Hashable identity of the call; callers with equal keys are coalesced.
+            fn: The function to call.
+        """
+        with self._lock:
+            self._requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+            else:
+                self._coalesced_local += 1
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self._wait_timeouts += 1
+                logger.warning(f"Single-flight '{self.name}': gave up waiting on an in-process call after {self.wait_timeout}s.")
+                return self._execute(fn, args, kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._call_shared(key, fn, args, kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _execute(self, fn, args, kwargs):
+        with self._lock:
+            self._executions += 1
+        return fn(*args, **kwargs)
+
+    def _call_shared(self, key, fn, args, kwargs):
+        """Runs the call once across worker processes, using the cache backend as the lock service."""
+        if not self.shared or not has_app_context():
+            return self._execute(fn, args, kwargs)
+
+        lock_key, result_key = self._shared_keys(key)
+        token = f"{os.getpid()}:{uuid.uuid4().hex}"
+        deadline = time.monotonic() + self.wait_timeout
+
+        while True:
+            try:
+                acquired = cache.add(lock_key, token, timeout=self.wait_timeout)
+            except Exception as e:
+                logger.warning(f"Single-flight '{self.name}': cache backend unavailable ({e}); calling without coordination.")
+                return self._execute(fn, args, kwargs)
+
+            if acquired:
+                try:
+                    result = self._execute(fn, args, kwargs)
+                    self._publish(result_key, result)
+                    return result
+                finally:
+                    self._release(lock_key, token)
+
+            # Another worker is making this call; wait for it to publish the result
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                try:
+                    result = cache.get(result_key)
+                    if result is not None:
+                        with self._lock:
+                            self._coalesced_remote += 1
+                        return result
+                    if not cache.has(lock_key):
+                        break # The leader gave up without a result; compete for the lock again
+                except Exception as e:
+                    logger.warning(f"Single-flight '{self.name}': cache backend unavailable ({e}); calling without coordination.")
+                    return self._execute(fn, args, kwargs)
+            else:
+                with self._lock:
+                    self._wait_timeouts += 1
+                logger.warning(f"Single-flight '{self.name}': gave up waiting on another worker after {self.wait_timeout}s.")
+                return self._execute(fn, args, kwargs)
+
+    def _shared_keys(self, key):
+        """Returns the (lock, result) cache keys for `key`."""
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return f"singleflight:{self.name}:lock:{digest}", f"singleflight:{self.name}:result:{digest}"
+
+    def _publish(self, result_key, result):
+        try:
+            cache.set(result_key, result, timeout=self.result_ttl)
+        except Exception as e:
+            logger.warning(f"Single-flight '{self.name}': could not publish result: {e}")
+
+    def _release(self, lock_key, token):
+        try:
+            # Only drop the lock if it is still ours; it may have expired and been re-taken
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        except Exception as e:
+            logger.warning(f"Single-flight '{self.name}': could not release lock: {e}")
+
+    def stats(self) -> dict:
+        """Returns this process's coalescing counters."""
+        with self._lock:
+            return {
+                'name': self.name,
+                'requests': self._requests,
+                'executions': self._executions,
+                'coalesced_local': self._coalesced_local,
+                'coalesced_remote': self._coalesced_remote,
+                'coalesced_total': self._coalesced_local + self._coalesced_remote,
+                'wait_timeouts': self._wait_timeouts,
+                'in_flight': len(self._calls),
+            }
+
+    def reset(self):
+        """Clears this process's counters (mainly for tests)."""
+        with self._lock:
+            self._requests = self._executions = 0
+            self._coalesced_local = self._coalesced_remote = self._wait_timeouts = 0
@@ -0,0 +1,81 @@
+# app/state_db.py
+
+"""
+SQLite connections for host-wide state shared by every worker process.
+
+The rate limiter, the LLM governor and the L2 cache each keep their shared state in a small
+SQLite file in WAL mode. StateDB holds one such connection per process: it is opened on first
+use, reopened after a fork (a connection inherited from the parent must not be reused) or when
+the path changes, and creates the owner's tables. A file that cannot be opened is replaced by
+an in-memory database, with a warning, so the owner keeps working with per-process state
+(or, with fallback=False, the sqlite3.Error is raised to the owner).
+"""
+
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def open_state_db(path, schema, label, timeout=30, synchronous='OFF', fallback=True):
+    """Opens a WAL-mode connection to `path` (in autocommit mode) and runs the `schema` statements.
+
+    Args:
+        path: Path of the SQLite file.
+        schema: CREATE ... IF NOT EXISTS statements for the owner's tables and indexes.
+        label: What the state belongs to, for the warning logged when falling back to memory.
+        timeout: Seconds to wait for another process's write lock.
+        synchronous: SQLite synchronous level. State that can be lost needs no fsync ('OFF').
+        fallback: Whether to use an in-memory database when `path` cannot be opened, or raise.
+    """
+    try:
+        conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    except sqlite3.Error as e:
+        if not fallback:
+            raise
+        logger.warning(f"Could not open {label} state file '{path}': {e}. Falling back to a per-process {label}.")
+        conn = sqlite3.connect(':memory:', isolation_level=None, check_same_thread=False)
+    for statement in schema:
+        conn.execute(statement)
+    return conn
+
+
+class StateDB:
+    """This process's connection to a state file, see open_state_db for the arguments.
+
+    Not thread-safe: callers serialize connection() and close() with their own lock.
+    """
+
+    def __init__(self, schema, label, timeout=30, synchronous='OFF', fallback=True):
+        self.schema = tuple(schema)
+        self.label = label
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self.fallback = fallback
+        self._conn = None
+        self._pid = None
+        self._path = None
+
+    def connection(self, path):
+        """Returns the connection to `path`, reopening it after a fork or a path change."""
+        if self._conn is not None and self._pid == os.getpid() and self._path == path:
+            return self._conn
+        if self._pid == os.getpid():
+            self.close()
+        self._conn = open_state_db(path, self.schema, self.label, timeout=self.timeout, synchronous=self.synchronous,
+                                   fallback=self.fallback)
+        self._pid = os.getpid()
+        self._path = path
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
+        self._pid = None
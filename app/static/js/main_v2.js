@@ -4,6 +4,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const jsSearchErrorMessage = document.getElementById('js-search-error-message');
     const searchResultsBlock = document.getElementById('search-results-block');
     const searchButton = searchForm ? searchForm.querySelector('button[type="submit"]') : null;
+    const searchApiUrl = (searchForm && searchForm.dataset.apiUrl) || '/api/search';
 
     // AI Summary elements - these will be re-fetched in functions if they are inside searchResultsBlock
     // const initialSummarizeButton = document.getElementById('summarize-button');
@@ -141,58 +142,32 @@ document.addEventListener('DOMContentLoaded', () => {
                     clickedSummarizeButton.disabled = false;
                     return;
                 }
-                fetch('/api/summarize_papers', { 
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({ papers: papersToSummarize })
-                })
-                .then(response => {
-                    if (!response.ok) {
-                        return response.json().then(errData => { throw new Error(errData.error || `HTTP error! status: ${response.status}`); })
-                                         .catch(() => { throw new Error(`HTTP error! status: ${response.status}`); });
-                    }
-                    return response.json();
-                })
-                .then(data => {
-                    const freshAiSummaryContent = document.getElementById('ai-summary-content'); // Re-fetch in case it was cleared
-                    if (!freshAiSummaryContent) return;
-
-                    if (data.papers_with_takeaways && Array.isArray(data.papers_with_takeaways)) {
-                        let htmlContent = '';
-                        if (data.papers_with_takeaways.length === 0) {
-                            htmlContent = '<p>No takeaways could be generated for the top papers.</p>';
-                        } else {
-                            data.papers_with_takeaways.forEach(paper => {
-                                htmlContent += `<div class="paper-takeaways-block" style="margin-bottom: 15px;">`;
-                                htmlContent += `<h5><a href="#" class="single-paper-summary-link" data-paper-id="${paper.id}" data-paper-title="${paper.title.replace(/"/g, '&quot;')}" data-paper-abstract="" data-paper-pdf-link="/pdf/${paper.id}">${paper.title}</a></h5>`; // Assuming PDF link structure, abstract can be fetched later if needed for modal
-                                let takeaways = paper.takeaways_text.replace(/\n/g, '<br>');
-                                // Basic styling for takeaways if they aren't already in a list
-                                if (!takeaways.match(/^\s*<ol>|<ul/i) && takeaways.includes('<br>')) {
-                                    // Attempt to wrap lines that look like list items
-                                    const lines = takeaways.split('<br>').map(line => line.trim()).filter(line => line.length > 0);
-                                    if (lines.every(line => /^\d+[.)]?\s+/.test(line)) || lines.every(line => /^[-*+]\s+/.test(line))) {
-                                        takeaways = `<ul>${lines.map(line => `<li>${line.replace(/^\d+[.)]?\s+|^[-*+]\s+/, '')}</li>`).join('')}</ul>`;
-                                    } else {
-                                        takeaways = `<p>${takeaways}</p>`; // Fallback to paragraph
-                                    }
-                                } else if (!takeaways.match(/^\s*<[uo]l>/i)) {
-                                     takeaways = `<p>${takeaways}</p>`; // Fallback for non-list text
-                                }
-                                htmlContent += takeaways;
-                                htmlContent += `</div>`;
-                            });
-                        }
-                        freshAiSummaryContent.innerHTML = htmlContent;
-                        openAiSummary();
-                    } else if (data.error) {
-                        freshAiSummaryContent.innerHTML = `<p class="summary-error-text">Error from summarization service: ${data.error}</p>`;
-                    } else {
-                        freshAiSummaryContent.innerHTML = '<p class="summary-error-text">Received an unexpected response from the summarization service.</p>';
+                const progressText = done => `Summarizing key takeaways: ${done} of ${papersToSummarize.length} papers done...`;
+                currentAiSummaryContent.innerHTML =
+                    `<p class="loading-indicator-text" id="ai-summary-progress" role="status" aria-live="polite">${progressText(0)}</p>` +
+                    papersToSummarize.map((paper, index) =>
+                        `<div class="paper-takeaways-block" id="paper-takeaways-${index}" style="margin-bottom: 15px;">` +
+                        `<h5>${escapeHtml(paper.title)}</h5><div class="summary-spinner"></div></div>`).join('');
+
+                // Each paper is filled into its own block as soon as the server finishes it
+                streamEvents('/api/summarize_papers/stream', { papers: papersToSummarize }, (eventName, data) => {
+                    const progress = document.getElementById('ai-summary-progress');
+                    if (eventName === 'progress') {
+                        if (progress) progress.textContent = progressText(data.done);
+                    } else if (eventName === 'done') {
+                        if (progress) progress.remove();
+                    } else if ((eventName === 'takeaways' || eventName === 'error') && data.index !== undefined) {
+                        const block = document.getElementById(`paper-takeaways-${data.index}`);
+                        if (block) block.innerHTML = renderTakeawaysBlock(data, eventName === 'error');
+                    } else if (eventName === 'error') {
+                        throw new Error(data.error);
                     }
                 })
                 .catch(error => {
                     const freshAiSummaryContentOnError = document.getElementById('ai-summary-content');
-                    if(freshAiSummaryContentOnError) freshAiSummaryContentOnError.innerHTML = `<p class="summary-error-text">Could not retrieve summary: ${error.message}</p>`;
+                    if(freshAiSummaryContentOnError) freshAiSummaryContentOnError.insertAdjacentHTML('afterbegin', `<p class="summary-error-text">Could not retrieve summary: ${escapeHtml(error.message)}</p>`);
+                    const progress = document.getElementById('ai-summary-progress');
+                    if (progress) progress.remove();
                     console.error('Error calling summarization API:', error);
                 })
                 .finally(() => {
@@ -233,37 +208,37 @@ document.addEventListener('DOMContentLoaded', () => {
                 // Show loading state in modal
                 openSinglePaperSummaryModal(paperTitle, '<div class="summary-spinner"></div><span class="loading-indicator-text" role="status" aria-live="assertive">Generating detailed summary...</span>', paperPdfLink);
 
+                // Text is shown as it is generated; closing the modal aborts the request, which stops generation on the server
+                if (singleSummaryAbort) singleSummaryAbort.abort();
+                const abortController = new AbortController();
+                singleSummaryAbort = abortController;
+                const formatSummary = text => escapeHtml(text).replace(/\n/g, '<br>');
+                let summaryText = '';
                 try {
-                    const response = await fetch('/api/summarize_single_paper', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({ 
-                            paper_id: paperId, 
-                            title: paperTitle, 
-                            abstract_text: paperAbstract 
-                        })
-                    });
-
-                    if (!response.ok) {
-                        const errData = await response.json().catch(() => ({})); // Try to parse error, default to empty obj
-                        throw new Error(errData.error || `HTTP error! status: ${response.status}`);
-                    }
-
-                    const data = await response.json();
-                    if (data.single_paper_summary) {
-                        let formattedSingleSummary = data.single_paper_summary.replace(/\n/g, '<br>');
-                        singleSummaryCache[paperId] = formattedSingleSummary; // Cache the result
-                        openSinglePaperSummaryModal(paperTitle, formattedSingleSummary, paperPdfLink);
-                    } else if (data.error) {
-                        openSinglePaperSummaryModal(paperTitle, `<p class="summary-error-text">Error: ${data.error}</p>`, paperPdfLink);
-                    } else {
-                        openSinglePaperSummaryModal(paperTitle, '<p class="summary-error-text">Received an unexpected response for single paper summary.</p>', paperPdfLink);
-                    }
+                    await streamEvents('/api/summarize_single_paper/stream', {
+                        paper_id: paperId,
+                        title: paperTitle,
+                        abstract_text: paperAbstract
+                    }, (eventName, data) => {
+                        if (eventName === 'delta') {
+                            if (!summaryText) openSinglePaperSummaryModal(paperTitle, '<div id="single-paper-summary-text"></div>', paperPdfLink);
+                            summaryText += data.text;
+                            const summaryElement = document.getElementById('single-paper-summary-text');
+                            if (summaryElement) summaryElement.innerHTML = formatSummary(summaryText);
+                        } else if (eventName === 'done') {
+                            singleSummaryCache[paperId] = formatSummary(data.single_paper_summary); // Cache the result
+                            const summaryElement = document.getElementById('single-paper-summary-text');
+                            if (summaryElement) summaryElement.innerHTML = singleSummaryCache[paperId];
+                        } else if (eventName === 'error') {
+                            throw new Error(data.error);
+                        }
+                    }, abortController.signal);
                 } catch (error) {
+                    if (error.name === 'AbortError') return; // The modal was closed
                     console.error('Error fetching single paper summary:', error);
-                    openSinglePaperSummaryModal(paperTitle, `<p class="summary-error-text">Could not retrieve detailed summary: ${error.message}</p>`, paperPdfLink);
+                    openSinglePaperSummaryModal(paperTitle, `<p class="summary-error-text">Could not retrieve detailed summary: ${escapeHtml(error.message)}</p>`, paperPdfLink);
+                } finally {
+                    if (singleSummaryAbort === abortController) singleSummaryAbort = null;
                 }
             }
         });
@@ -289,6 +264,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Cache for single paper summaries
     const singleSummaryCache = {};
+    // Aborts the single paper summary being streamed, if any
+    let singleSummaryAbort = null;
 
     // Function to open and populate the single paper summary modal
     function openSinglePaperSummaryModal(title, content, pdfLink) { // Add pdfLink parameter
@@ -315,6 +292,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // Function to close the single paper summary modal
     function closeSinglePaperSummaryModal() {
         const modal = document.getElementById('single-paper-summary-modal');
+        if (singleSummaryAbort) singleSummaryAbort.abort(); // Stop paying for a summary nobody reads
         if (modal) {
             modal.style.display = 'none';
             // Optionally, return focus to the link that opened the modal if possible/tracked
@@ -336,6 +314,62 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    // POSTs a JSON body and calls onEvent(eventName, data) for each server-sent event of the response (abortable through signal)
+    async function streamEvents(url, body, onEvent, signal) {
+        const response = await fetch(url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+            body: JSON.stringify(body),
+            signal: signal
+        });
+        if (!response.ok) {
+            const errData = await response.json().catch(() => ({}));
+            throw new Error(errData.error || `HTTP error! status: ${response.status}`);
+        }
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let eventName = 'message';
+                const dataLines = [];
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                    else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+                });
+                if (dataLines.length > 0) onEvent(eventName, JSON.parse(dataLines.join('\n')));
+            }
+        }
+    }
+
+    // One paper of the "Summarize Top 5" panel: its title and takeaways (as a list when they are numbered)
+    function renderTakeawaysBlock(paper, isError) {
+        const title = `<h5><a href="#" class="single-paper-summary-link" data-paper-id="${escapeHtml(paper.id)}" data-paper-title="${escapeHtml(paper.title)}" data-paper-abstract="" data-paper-pdf-link="/pdf/${escapeHtml(paper.id)}">${escapeHtml(paper.title)}</a></h5>`;
+        if (isError) {
+            return title + `<p class="summary-error-text">${escapeHtml(paper.takeaways_text)}</p>`;
+        }
+        const lines = paper.takeaways_text.split('\n').map(line => line.trim()).filter(line => line.length > 0);
+        if (lines.length > 1 && (lines.every(line => /^\d+[.)]?\s+/.test(line)) || lines.every(line => /^[-*+]\s+/.test(line)))) {
+            return title + `<ul>${lines.map(line => `<li>${escapeHtml(line.replace(/^\d+[.)]?\s+|^[-*+]\s+/, ''))}</li>`).join('')}</ul>`;
+        }
+        return title + `<p>${lines.map(escapeHtml).join('<br>')}</p>`;
+    }
+
+    function escapeHtml(text) {
+        return String(text)
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;')
+            .replace(/'/g, '&#39;');
+    }
+
     async function handleSearchFormSubmit(baseUrl, query, page) {
         if (!query) {
             jsSearchErrorMessage.textContent = 'Please enter a search query.';
@@ -343,6 +377,7 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
         jsSearchErrorMessage.style.display = 'none';
+        page = parseInt(page, 10) || 1;
 
         // Add loading indicator logic here (for subtask 8.2)
         if(searchResultsBlock) {
@@ -353,55 +388,35 @@ document.addEventListener('DOMContentLoaded', () => {
             searchButton.disabled = true;
         }
 
-        const url = new URL(baseUrl, window.location.origin);
-        url.searchParams.set('query', query);
-        if (page) {
-            url.searchParams.set('page', page);
-        }
+        // Results come from the JSON API; the address bar keeps the bookmarkable /search URL
+        const pageUrl = new URL(baseUrl, window.location.origin);
+        pageUrl.searchParams.set('query', query);
+        pageUrl.searchParams.set('page', page);
+        const apiUrl = new URL(searchApiUrl, window.location.origin);
+        apiUrl.searchParams.set('query', query);
+        apiUrl.searchParams.set('page', page);
 
         try {
-            const response = await fetch(url.toString(), {
+            const response = await fetch(apiUrl.toString(), {
                 method: 'GET',
-                headers: {
-                    'X-Requested-With': 'XMLHttpRequest' // Optional: helps server identify AJAX
-                }
+                headers: { 'Accept': 'application/json' }
             });
+            const data = await response.json().catch(() => ({}));
 
             if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-
-            const htmlText = await response.text();
-            const parser = new DOMParser();
-            const doc = parser.parseFromString(htmlText, 'text/html');
-            
-            const newSearchResultsBlock = doc.getElementById('search-results-block');
-            const newTitle = doc.querySelector('title');
-
-            if (searchResultsBlock && newSearchResultsBlock) {
-                searchResultsBlock.innerHTML = newSearchResultsBlock.innerHTML;
-            } else if (searchResultsBlock) {
-                // Fallback if the new content doesn't have the specific block,
-                // try to replace the whole content area or show an error.
-                // For this app, index.html search results are expected to always have search-results-block
-                const newContentArea = doc.getElementById('search-content-area');
-                 if (newContentArea) {
-                    const currentContentArea = document.getElementById('search-content-area');
-                    if (currentContentArea) currentContentArea.innerHTML = newContentArea.innerHTML;
-                     // Re-bind form listener if the whole form was replaced
-                     // This example assumes search-form itself is outside search-results-block or is re-initialized.
-                     // For simplicity, we're assuming the form remains, and only searchResultsBlock is updated.
-                 } else {
-                    searchResultsBlock.innerHTML = '<p>Error: Could not parse search results.</p>';
-                 }
+                if (!data.html) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                searchResultsBlock.innerHTML = data.html; // The error block of partials/search_results.html
+                document.title = 'Search - Paper Lense';
+            } else {
+                // Rendered by the server from partials/search_results.html, like the first page load
+                searchResultsBlock.innerHTML = data.html;
+                document.title = data.papers.length ? `Search Results for "${query}" - Paper Lense` : 'Search - Paper Lense';
             }
 
-            if (newTitle) {
-                document.title = newTitle.textContent;
-            }
-            
             // Update URL
-            history.pushState({ query, page }, document.title, url.toString());
+            history.pushState({ query, page }, document.title, pageUrl.toString());
 
         } catch (error) {
             console.error('Search error:', error);
@@ -0,0 +1,250 @@
+# app/summarizer.py
+
+"""
+Key-takeaway generation for /api/summarize_papers and its streaming variant, and the prompts
+and token stream of /api/summarize_single_paper.
+
+Each paper is one chat completion. The completions run concurrently on a small thread pool
+(SUMMARY_MAX_CONCURRENCY) so "Summarize Top 5" takes about one LLM round trip instead of five,
+under an overall deadline (SUMMARY_DEADLINE): papers still unfinished when it passes get an
+error entry and their requests are abandoned. Each paper is retried up to SUMMARY_MAX_ATTEMPTS
+times. Every attempt is admitted by the host-wide llm_governor (app/llm_client.py) first, which
+also makes retries after a rate limit wait for the server's Retry-After; an attempt that can't
+be admitted before the deadline is given up on.
+
+Takeaways already in the summary store (same paper version, abstract, prompt and model) are
+returned without a call; new ones are stored once generated. Store access stays on the
+calling thread, which has the app context.
+
+iter_summaries yields each paper as soon as it is done (for /api/summarize_papers/stream);
+summarize_papers collects the same results in input order. Either way there is one entry per
+input paper, with error text in place of takeaways where a paper could not be summarized.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from typing import Iterator, List, Optional, Tuple
+
+from openai import APIError, RateLimitError
+
+from . import summary_store
+from .llm_client import CHARS_PER_TOKEN, QUEUE_TIMEOUT_SECONDS, estimate_tokens, llm_governor, response_tokens
+from .llm_governor import GovernorTimeout
+from .summary_store import SummarySpec
+
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-3.5-turbo"
+TEMPERATURE = 0.5
+PROMPT_ID = "takeaways-v1" # Bump when editing SYSTEM_PROMPT or takeaways_prompt so stored takeaways are regenerated
+TAKEAWAYS_MAX_TOKENS = 300 # Max tokens for 3 takeaways from one abstract
+MAX_WORDS_PER_ABSTRACT = 3000
+DEFAULT_MAX_CONCURRENCY = 5
+DEFAULT_DEADLINE_SECONDS = 30.0
+DEFAULT_MAX_ATTEMPTS = 2
+TIMED_OUT_TEXT = "Error: Timed out generating takeaways."
+
+SYSTEM_PROMPT = "You are a helpful assistant skilled in extracting key takeaways from academic research papers."
+
+
+def takeaways_prompt(title: str, abstract: str) -> str:
+    return (
+        f"Extract exactly 3 key takeaways from the following research paper abstract. Present these takeaways as a numbered list. "
+        f"Each takeaway should be concise and highlight a main contribution, finding, or methodology.\n\n"
+        f"Title: {title}\n"
+        f"Abstract:\n{abstract}"
+    )
+
+
+SINGLE_SUMMARY_PROMPT_ID = "single-summary-v1" # Bump when editing the single-paper prompts
+SINGLE_SUMMARY_TEMPERATURE = 0.4
+SINGLE_SUMMARY_MAX_TOKENS = 1200
+SINGLE_SUMMARY_SYSTEM_PROMPT = "You are an expert research assistant, skilled at creating detailed and structured summaries of academic papers."
+
+
+def single_summary_prompt(title: str, abstract: str) -> str:
+    """Prompt for the one-page summary of /api/summarize_single_paper."""
+    return (
+        f"Please provide a detailed, structured summary of the research paper titled '{title}'. "
+        f"The summary should be suitable for a single page (approximately 300-500 words). "
+        f"Focus on clearly articulating the paper's core problem, objectives, key methodologies, main findings/results, and primary conclusions or contributions. "
+        f"Organize the summary logically, perhaps with subheadings for clarity if appropriate (e.g., Introduction/Background, Methods, Results, Discussion/Conclusion). "
+        f"Avoid overly technical jargon where possible, or briefly explain it. Ensure the summary is comprehensive yet concise.\\n\\n"
+        f"Abstract of the paper:\n{abstract}"
+    )
+
+
+def stream_single_summary(client, title: str, abstract: str, queue_timeout: float = QUEUE_TIMEOUT_SECONDS) -> Iterator[str]:
+    """
+    Yields the one-page summary of a paper as the model generates it, one text delta at a time.
+
+    The request holds an llm_governor lease until the stream ends. Closing the generator
+    before the end closes the completion's connection, which makes the API stop generating
+    (and billing) the remaining tokens. Raises GovernorTimeout if the request isn't admitted
+    within queue_timeout seconds, and the OpenAI client's errors; nothing is retried.
+    """
+    messages = [
+        {"role": "system", "content": SINGLE_SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": single_summary_prompt(title, abstract)}
+    ]
+    with llm_governor.request(estimate_tokens(messages, SINGLE_SUMMARY_MAX_TOKENS), timeout=queue_timeout) as lease:
+        stream = client.chat.completions.create(
+            model=MODEL,
+            messages=messages,
+            temperature=SINGLE_SUMMARY_TEMPERATURE,
+            max_tokens=SINGLE_SUMMARY_MAX_TOKENS,
+            stream=True
+        )
+        generated_chars = 0
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    generated_chars += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        finally:
+            stream.close()
+            # Streamed chunks carry no usage; charge roughly what was generated
+            lease.used_tokens = lease.estimated_tokens - SINGLE_SUMMARY_MAX_TOKENS + generated_chars // CHARS_PER_TOKEN
+
+
+def _generate_takeaways(client, paper_id: str, title: str, prompt: str, give_up_at: float, max_attempts: int) -> Tuple[str, bool]:
+    """One paper's completion with retries. Never raises: returns (takeaways, True), or (error text, False)."""
+    takeaways_text = "Error: Could not generate takeaways."
+    for attempt in range(max_attempts):
+        remaining = give_up_at - time.monotonic()
+        if remaining <= 0:
+            return TIMED_OUT_TEXT, False
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        try:
+            with llm_governor.request(estimate_tokens(messages, TAKEAWAYS_MAX_TOKENS),
+                                      timeout=remaining if remaining != float('inf') else None) as lease:
+                response = client.chat.completions.create(
+                    model=MODEL,
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    max_tokens=TAKEAWAYS_MAX_TOKENS,
+                    timeout=max(0.001, give_up_at - time.monotonic()) if remaining != float('inf') else None
+                )
+                lease.used_tokens = response_tokens(response)
+            logger.info(f"Successfully generated takeaways for paper '{title}' (ID: {paper_id}).")
+            return response.choices[0].message.content.strip(), True
+        except RateLimitError as e:
+            logger.warning(f"OpenAI RateLimitError for paper '{title}' (attempt {attempt + 1}/{max_attempts}): {e}")
+            takeaways_text = "Error: OpenAI API rate limit exceeded." # The governor holds the retry back for Retry-After
+        except GovernorTimeout:
+            logger.warning(f"No capacity to generate takeaways for paper '{title}' (ID: {paper_id}) before the deadline.")
+            return (TIMED_OUT_TEXT if attempt == 0 else takeaways_text), False
+        except APIError as e:
+            logger.error(f"OpenAI API error for paper '{title}' (attempt {attempt + 1}/{max_attempts}): {e}")
+            takeaways_text = f"Error: OpenAI API error ({str(e)})."
+        except Exception as e:
+            logger.error(f"Unexpected error for paper '{title}' (attempt {attempt + 1}/{max_attempts}): {e}")
+            takeaways_text = "Error: Unexpected error during takeaway generation."
+    return takeaways_text, False
+
+
+def iter_summaries(papers: List[dict], client, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                   deadline: Optional[float] = DEFAULT_DEADLINE_SECONDS,
+                   max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Iterator[Tuple[int, dict, bool]]:
+    """
+    Generates 3 key takeaways per paper, concurrently, yielding each paper as soon as it is done.
+
+    Invalid, empty and stored papers come first, then generated ones in completion order, then
+    any given up on at the deadline. Closing the generator early abandons the unfinished papers.
+
+    Args:
+        papers: Dicts with 'id', 'title' and 'abstract_text'.
+        client: An OpenAI client.
+        max_concurrency: Most completions in flight at once.
+        deadline: Seconds until unfinished papers are given up on (None waits for all).
+        max_attempts: Attempts per paper.
+
+    Yields:
+        (input index, {'id', 'title', 'takeaways_text'}, ok) for every input paper, where ok is
+        False if takeaways_text is an error message.
+    """
+    jobs = []
+    for index, paper_data in enumerate(papers):
+        if not isinstance(paper_data, dict) or not all(key in paper_data for key in ['id', 'title', 'abstract_text']):
+            logger.warning(f"Skipping invalid paper object: {paper_data}")
+            paper_data = paper_data if isinstance(paper_data, dict) else {}
+            yield index, {
+                "id": paper_data.get("id", "unknown"),
+                "title": paper_data.get("title", "Unknown Title"),
+                "takeaways_text": "Error: Invalid paper data provided."
+            }, False
+            continue
+
+        paper_id = paper_data['id']
+        title = paper_data['title']
+        abstract = paper_data['abstract_text']
+        if not abstract or not abstract.strip():
+            logger.warning(f"Empty abstract for paper ID {paper_id} ('{title}'). Skipping summarization for this paper.")
+            yield index, {"id": paper_id, "title": title, "takeaways_text": "Abstract was empty, no takeaways generated."}, False
+            continue
+        if len(abstract.split()) > MAX_WORDS_PER_ABSTRACT:
+            logger.warning(f"Abstract for paper '{title}' (ID: {paper_id}) exceeds {MAX_WORDS_PER_ABSTRACT} words. Truncating.")
+            abstract = ' '.join(abstract.split()[:MAX_WORDS_PER_ABSTRACT])
+        jobs.append((index, paper_id, title, abstract))
+
+    specs = {index: SummarySpec(str(paper_id), title, abstract, PROMPT_ID, MODEL, TEMPERATURE) for index, _, _, abstract in jobs}
+    stored = summary_store.get_summaries(specs.values())
+    if stored:
+        logger.info(f"Found stored takeaways for {len(stored)} of {len(jobs)} papers.")
+    pending = []
+    for index, paper_id, title, abstract in jobs:
+        takeaways_text = stored.get(specs[index].key)
+        if takeaways_text is None:
+            pending.append((index, paper_id, title, takeaways_prompt(title, abstract)))
+        else:
+            yield index, {"id": paper_id, "title": title, "takeaways_text": takeaways_text}, True
+    if not pending:
+        return
+
+    give_up_at = time.monotonic() + (deadline if deadline is not None else float('inf'))
+    workers = max(1, min(max_concurrency, len(pending)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summarize')
+    futures = {
+        executor.submit(_generate_takeaways, client, paper_id, title, prompt, give_up_at, max_attempts): (index, paper_id, title)
+        for index, paper_id, title, prompt in pending
+    }
+    logger.info(f"Generating takeaways for {len(pending)} papers, {workers} at a time.")
+    finished = set()
+    try:
+        try:
+            for future in as_completed(futures, timeout=deadline):
+                finished.add(future)
+                index, paper_id, title = futures[future]
+                takeaways_text, ok = future.result()
+                if ok:
+                    summary_store.store_summary(specs[index], takeaways_text)
+                yield index, {"id": paper_id, "title": title, "takeaways_text": takeaways_text}, ok
+        except FuturesTimeoutError:
+            pass
+        for future, (index, paper_id, title) in futures.items():
+            if future not in finished:
+                logger.warning(f"Takeaways for paper '{title}' (ID: {paper_id}) not ready after {deadline}s; giving up.")
+                yield index, {"id": paper_id, "title": title, "takeaways_text": TIMED_OUT_TEXT}, False
+    finally:
+        # Unstarted papers are dropped; running calls end at their own timeout (the deadline)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def summarize_papers(papers: List[dict], client, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                     deadline: Optional[float] = DEFAULT_DEADLINE_SECONDS,
+                     max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> List[dict]:
+    """
+    Generates 3 key takeaways per paper, concurrently (see iter_summaries for the arguments).
+
+    Returns:
+        One {'id', 'title', 'takeaways_text'} dict per input paper, in input order.
+    """
+    results: List[Optional[dict]] = [None] * len(papers)
+    for index, result, _ in iter_summaries(papers, client, max_concurrency=max_concurrency, deadline=deadline,
+                                           max_attempts=max_attempts):
+        results[index] = result
+    return results
@@ -0,0 +1,154 @@
+# app/summary_store.py
+
+"""
+Persistent store of LLM-generated summaries, kept in the `summaries` table of the application database.
+
+A summary only depends on the paper text and on how it was asked for, so the same popular
+paper would otherwise be summarized (and paid for) again for every visitor and every
+newsletter that includes it. Each summary is stored under a SummarySpec key: the paper ID
+(with version), a hash of the title and abstract, the prompt template ID, the model and the
+temperature. Changing any of those, e.g. bumping a prompt ID after editing its template,
+simply misses and generates a new summary.
+
+Only successful completions are stored. Lookups and writes are best-effort: a no-op outside an
+app context or when SUMMARY_STORE_ENABLED is off, and database errors are logged rather than
+raised so they never fail a summarization.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from typing import Dict, Iterable, Tuple
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import db, StoredSummary
+
+logger = logging.getLogger(__name__)
+
+READ_BATCH_SIZE = 500 # Keys per SELECT; older SQLite builds allow 999 parameters
+
+_lock = threading.Lock()
+_counters = {'lookups': 0, 'lookup_hits': 0, 'summaries_written': 0, 'errors': 0}
+
+
+def _count(**increments):
+    with _lock:
+        for name, value in increments.items():
+            _counters[name] += value
+
+
+class SummarySpec(namedtuple('SummarySpec', 'paper_id title abstract prompt_id model temperature')):
+    """Everything a stored summary depends on."""
+    __slots__ = ()
+
+    @property
+    def content_hash(self) -> str:
+        return hashlib.sha256(f"{self.title}\0{self.abstract}".encode('utf-8')).hexdigest()
+
+    @property
+    def key(self) -> str:
+        identity = f"{self.paper_id}\0{self.content_hash}\0{self.prompt_id}\0{self.model}\0{float(self.temperature)!r}"
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+
+def _enabled() -> bool:
+    return has_app_context() and current_app.config.get('SUMMARY_STORE_ENABLED', True)
+
+
+def get_summaries(specs: Iterable[SummarySpec]) -> Dict[str, str]:
+    """
+    Looks up stored summaries in batches.
+
+    Returns:
+        A dictionary mapping the key of each spec that has a stored summary to its text.
+    """
+    keys = list(dict.fromkeys(spec.key for spec in specs))
+    if not keys or not _enabled():
+        return {}
+    found = {}
+    try:
+        for offset in range(0, len(keys), READ_BATCH_SIZE):
+            batch = keys[offset:offset + READ_BATCH_SIZE]
+            found.update(db.session.execute(
+                select(StoredSummary.key, StoredSummary.text).where(StoredSummary.key.in_(batch))
+            ).all())
+    except SQLAlchemyError as e:
+        _count(errors=1)
+        logger.warning(f"Could not look up {len(keys)} summaries in the summary store: {e}")
+        return {}
+    _count(lookups=len(keys), lookup_hits=len(found))
+    return found
+
+
+def get_summary(spec: SummarySpec):
+    """Returns the stored summary text for one spec, or None."""
+    return get_summaries([spec]).get(spec.key)
+
+
+def store_summaries(summaries: Iterable[Tuple[SummarySpec, str]]) -> int:
+    """
+    Stores (spec, text) pairs whose key isn't stored yet, in their own transaction.
+
+    Returns:
+        The number of distinct summaries written or already present (0 when the store is off or the write failed).
+    """
+    rows = list({spec.key: {
+        'key': spec.key,
+        'paper_id': spec.paper_id,
+        'content_hash': spec.content_hash,
+        'prompt_id': spec.prompt_id,
+        'model': spec.model,
+        'temperature': float(spec.temperature),
+        'text': text,
+    } for spec, text in summaries}.values())
+    if not rows or not _enabled():
+        return 0
+    table = StoredSummary.__table__
+    try:
+        with db.engine.begin() as connection:
+            dialect = connection.dialect.name
+            if dialect in ('sqlite', 'postgresql'):
+                insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+                connection.execute(insert(table).on_conflict_do_nothing(index_elements=['key']), rows)
+            else:
+                # No portable upsert: drop the keys that already exist, then insert the rest
+                existing = set(connection.scalars(select(table.c.key).where(table.c.key.in_([row['key'] for row in rows]))))
+                rows = [row for row in rows if row['key'] not in existing]
+                if rows:
+                    connection.execute(table.insert(), rows)
+    except SQLAlchemyError as e:
+        _count(errors=1)
+        logger.warning(f"Could not store {len(rows)} summaries in the summary store: {e}")
+        return 0
+    _count(summaries_written=len(rows))
+    return len(rows)
+
+
+def store_summary(spec: SummarySpec, text: str):
+    """Stores one summary (see store_summaries)."""
+    store_summaries([(spec, text)])
+
+
+def stats() -> dict:
+    """Returns this process's lookup/write counters and, inside an app context, the number of stored summaries."""
+    with _lock:
+        result = dict(_counters)
+    if has_app_context():
+        try:
+            result['stored_summaries'] = db.session.scalar(select(func.count()).select_from(StoredSummary))
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not count stored summaries: {e}")
+            result['stored_summaries'] = None
+    return result
+
+
+def reset():
+    """Clears the per-process counters (used by tests)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
@@ -0,0 +1,188 @@
+# app/swr_cache.py
+
+"""
+Stale-while-revalidate cache layer on top of the Flask-Caching backend.
+
+Entries are stored with the time they were fetched and classified by age:
+  * younger than the soft TTL: fresh, returned as is;
+  * between the soft and hard TTL: returned immediately while a background thread
+    refreshes the entry;
+  * older than the hard TTL: refreshed synchronously, but if the refresh fails with one
+    of the configured "serve stale" exceptions (e.g. the upstream is down or rate limiting
+    us) the last known value is returned instead and flagged as stale.
+
+Entries are kept in the backend for `stale_ttl` seconds, which bounds how old a value
+served on error can be.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app, has_app_context
+
+from .extensions import cache
+
+logger = logging.getLogger(__name__)
+
+FRESH = 'fresh'
+REVALIDATING = 'revalidating' # Served past the soft TTL while a background refresh runs
+STALE = 'stale' # Past the hard TTL; only served when the synchronous refresh fails
+MISS = 'miss' # Fetched synchronously, either not cached or past the hard TTL
+
+CacheLookup = namedtuple('CacheLookup', ['value', 'fetched_at', 'age', 'state'])
+
+
+class StaleWhileRevalidateCache:
+    """Soft/hard TTL cache for an expensive fetch function.
+
+    Args:
+        name: Cache name, used in log messages and metrics.
+        soft_ttl: Seconds an entry is served without any refresh.
+        hard_ttl: Seconds after which an entry is only served if a synchronous refresh fails.
+        stale_ttl: Seconds an entry is kept in the backend for serve-stale-on-error.
+        stale_exceptions: Exception types that make a failed refresh fall back to the stale value.
+        clock: Wall-clock function, injectable for tests.
+    """
+
+    def __init__(self, name, soft_ttl=300, hard_ttl=900, stale_ttl=86400, stale_exceptions=(), clock=time.time):
+        self.name = name
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.stale_ttl = stale_ttl
+        self.stale_exceptions = tuple(stale_exceptions)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._refreshing = {}
+        # Per-process counters, reported by stats()
+        self._counts = {FRESH: 0, REVALIDATING: 0, STALE: 0, MISS: 0}
+        self._refreshes = 0
+        self._refresh_failures = 0
+
+    def configure(self, soft_ttl=None, hard_ttl=None, stale_ttl=None):
+        """Updates the TTLs, e.g. from the Flask config in create_app."""
+        if soft_ttl is not None:
+            self.soft_ttl = soft_ttl
+        if hard_ttl is not None:
+            self.hard_ttl = hard_ttl
+        if stale_ttl is not None:
+            self.stale_ttl = stale_ttl
+        if self.hard_ttl < self.soft_ttl or self.stale_ttl < self.hard_ttl:
+            raise ValueError("Cache TTLs must satisfy soft_ttl <= hard_ttl <= stale_ttl.")
+
+    def lookup(self, key) -> CacheLookup:
+        """Returns the entry for `key` and its state (FRESH, REVALIDATING, STALE or MISS)."""
+        try:
+            entry = cache.get(key)
+        except Exception:
+            logger.exception("Exception possibly due to cache backend.")
+            entry = None
+        if entry is None:
+            return CacheLookup(None, None, None, MISS)
+        fetched_at, value = entry
+        age = max(0.0, self._clock() - fetched_at)
+        if age < self.soft_ttl:
+            state = FRESH
+        elif age < self.hard_ttl:
+            state = REVALIDATING
+        else:
+            state = STALE
+        return CacheLookup(value, fetched_at, age, state)
+
+    def store(self, key, value):
+        """Stores `value` as fetched now."""
+        try:
+            cache.set(key, (self._clock(), value), timeout=self.stale_ttl)
+        except Exception:
+            logger.exception("Exception possibly due to cache backend.")
+
+    def get_or_fetch(self, key, fetch, *args, **kwargs):
+        """
+        Returns the cached value for `key`, fetching it with fetch(*args, **kwargs) as needed.
+
+        Returns:
+            A (value, state) tuple. MISS means the value was fetched synchronously by this call;
+            STALE means the value is past its hard TTL and was served because the refresh
+            raised one of `stale_exceptions`.
+        Raises:
+            Whatever `fetch` raises when there is no cached value to fall back to.
+        """
+        entry = self.lookup(key)
+        if entry.state == FRESH:
+            self._count(FRESH)
+            return entry.value, FRESH
+        if entry.state == REVALIDATING:
+            self._count(REVALIDATING)
+            self.refresh_in_background(key, fetch, *args, **kwargs)
+            return entry.value, REVALIDATING
+
+        try:
+            value = fetch(*args, **kwargs)
+        except self.stale_exceptions as e:
+            if entry.state == MISS:
+                raise
+            with self._lock:
+                self._refresh_failures += 1
+            self._count(STALE)
+            logger.warning(f"Cache '{self.name}': refresh failed ({e}); serving value fetched {entry.age:.0f}s ago.")
+            return entry.value, STALE
+        self.store(key, value)
+        self._count(MISS)
+        return value, MISS
+
+    def refresh_in_background(self, key, fetch, *args, **kwargs):
+        """Refreshes `key` with fetch(*args, **kwargs) in a background thread (at most one per key)."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            app = current_app._get_current_object() if has_app_context() else None
+            thread = threading.Thread(target=self._refresh, args=(app, key, fetch, args, kwargs),
+                                      name=f"swr-refresh-{self.name}", daemon=True)
+            self._refreshing[key] = thread
+        thread.start()
+
+    def _refresh(self, app, key, fetch, args, kwargs):
+        try:
+            if app is not None:
+                with app.app_context():
+                    self.store(key, fetch(*args, **kwargs))
+            else:
+                self.store(key, fetch(*args, **kwargs))
+            with self._lock:
+                self._refreshes += 1
+        except Exception as e:
+            with self._lock:
+                self._refresh_failures += 1
+            logger.warning(f"Cache '{self.name}': background refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def join_refreshes(self, timeout=None):
+        """Waits for running background refreshes (used by tests and at shutdown)."""
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def _count(self, state):
+        with self._lock:
+            self._counts[state] += 1
+
+    def stats(self) -> dict:
+        """Returns this process's hit/stale counters and the configured TTLs."""
+        with self._lock:
+            return {
+                'name': self.name,
+                'soft_ttl': self.soft_ttl,
+                'hard_ttl': self.hard_ttl,
+                'stale_ttl': self.stale_ttl,
+                'fresh_hits': self._counts[FRESH],
+                'revalidating_hits': self._counts[REVALIDATING],
+                'stale_served': self._counts[STALE],
+                'misses': self._counts[MISS],
+                'background_refreshes': self._refreshes,
+                'refresh_failures': self._refresh_failures,
+                'refreshes_in_flight': len(self._refreshing),
+            }
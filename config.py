@@ -42,9 +42,53 @@ class Config:
             ENCRYPTION_KEY = os.urandom(32)
 
     # Cache settings
-    CACHE_TYPE = 'SimpleCache'  # In-memory cache
+    CACHE_TYPE = 'app.cache_backends.TieredCache'  # Per-worker LRU (L1) in front of a host-wide SQLite cache (L2)
     CACHE_DEFAULT_TIMEOUT = 300   # 5 minutes
-    CACHE_THRESHOLD = 500         # Max number of items in cache
+    CACHE_THRESHOLD = 500         # Max number of items in cache (SimpleCache only)
+    CACHE_L1_POLICY = 'tinylfu'   # 'tinylfu' (byte-bounded, frequency-aware admission) or 'lru' (entry-bounded)
+    CACHE_L1_MAX_BYTES = 32 * 1024 * 1024 # Size budget of each worker's in-process tier ('tinylfu')
+    CACHE_L1_MAX_ENTRIES = 256    # Entries kept in each worker's in-process tier ('lru')
+    CACHE_L1_MAX_TIMEOUT = 60     # Seconds an entry may live in L1 before it is re-read from the shared tier
+    CACHE_L2_MAX_ENTRIES = 10000  # Entries kept in the shared tier
+    CACHE_L2_PATH = os.environ.get('CACHE_L2_PATH') # SQLite file shared by all workers; defaults to the temp dir
+
+    # arXiv API client
+    ARXIV_RATE_LIMIT_INTERVAL = 3.1 # Seconds between arXiv requests, shared by all workers on the host
+    ARXIV_RATE_LIMIT_BURST = 1      # Requests allowed back-to-back after an idle period
+    RATE_LIMIT_STATE_PATH = os.environ.get('RATE_LIMIT_STATE_PATH') # SQLite file holding the shared bucket; defaults to the temp dir
+    ARXIV_HTTP_POOL_SIZE = 10       # Keep-alive connections pooled per worker process
+    ARXIV_CONNECT_TIMEOUT = 5       # Seconds to establish a connection to arXiv
+    ARXIV_READ_TIMEOUT = 30         # Seconds to wait for response data from arXiv
+    SEARCH_SINGLE_FLIGHT_TIMEOUT = 45 # Seconds a worker waits on another worker's identical search before fetching itself
+    SEARCH_SINGLE_FLIGHT_SHARED = True # Coordinate identical searches across workers through the cache backend
+    SEARCH_CHUNK_SIZE = 100         # Results per arXiv call when paging /search; pages are sliced from cached chunks
+    SEARCH_CACHE_SOFT_TTL = 300     # Seconds search results are served without a refresh
+    SEARCH_CACHE_HARD_TTL = 900     # Until here stale results are served while refreshing in the background
+    SEARCH_CACHE_STALE_TTL = 86400  # Oldest result served when arXiv is down or rate limiting (NetworkException/429)
+    ARXIV_ID_CHUNK_SIZE = 100       # Most IDs per id_list query when resolving papers by ID
+    ARXIV_PAPER_CACHE_TTL = 86400   # Seconds a paper resolved by ID stays in the per-paper cache
+    PAPER_STORE_ENABLED = True      # Persist every paper parsed from arXiv responses in the `papers` table
+    SEARCH_LOCAL_FALLBACK = True    # Answer /search from the local full-text index while arXiv is failing or slow
+    SEARCH_FALLBACK_WINDOW = 20     # Recent arXiv search fetches the fallback decision is based on
+    SEARCH_FALLBACK_ERROR_RATE = 0.5 # Fraction of those failing with network errors that switches to the local index
+    SEARCH_FALLBACK_LATENCY = 10.0  # Median seconds per fetch (rate limiter waits included) that switches to the local index
+    SEARCH_FALLBACK_COOLDOWN = 60   # Seconds on the local index before arXiv is probed again
+    SUMMARY_MAX_CONCURRENCY = 5     # OpenAI completions run at once by one /api/summarize_papers request
+    SUMMARY_DEADLINE = 30           # Seconds /api/summarize_papers waits before giving up on unfinished papers
+    SUMMARY_MAX_ATTEMPTS = 2        # Attempts per paper (rate-limited attempts wait for Retry-After first)
+    SUMMARY_STORE_ENABLED = True    # Reuse LLM summaries from the `summaries` table for the same paper, prompt and model
+    LLM_MAX_IN_FLIGHT = 8           # OpenAI requests in flight at once across all workers on the host (AIMD ceiling)
+    LLM_MIN_IN_FLIGHT = 1           # Floor the in-flight limit is halved down to on rate-limit errors
+    LLM_TOKENS_PER_MINUTE = 90000   # Host-wide OpenAI token budget (prompt estimate + max_tokens, corrected by usage)
+    LLM_QUEUE_TIMEOUT = 30          # Seconds a single-paper summary waits for the governor
+    LLM_BATCH_QUEUE_TIMEOUT = 600   # Seconds each newsletter summary (batch priority) waits for spare LLM capacity
+    LLM_BATCH_RESERVED_SLOTS = 1    # In-flight slots newsletter summaries always leave free for interactive requests
+    OPENAI_HTTP_POOL_SIZE = 20      # Keep-alive connections pooled by the shared OpenAI client per worker process
+    OPENAI_CONNECT_TIMEOUT = 5      # Seconds to connect to the OpenAI API
+    OPENAI_READ_TIMEOUT = 60        # Seconds to wait for OpenAI response data
+    FRAGMENT_CACHE_ENABLED = True   # Cache rendered paper cards and result blocks of /search in the app cache
+    PAPER_INDEX_PATH = os.environ.get('PAPER_INDEX_PATH') or os.path.join(basedir, 'instance', 'paper_index') # Memory-mapped columnar index built by `python -m app.paper_index`
+    PAPER_INDEX_MAX_AGE = 86400     # Seconds after a build the newsletter still selects category-only queries from the paper index
 
     # --- Email Configuration ---
     # The MAIL_DEFAULT_SENDER_NAME and MAIL_DEFAULT_SENDER_EMAIL might still be useful for display purposes
@@ -90,6 +134,9 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:' # Keeps tests away from the development database
+    CACHE_TYPE = 'SimpleCache' # Keeps tests isolated from the host-wide cache file
+    PAPER_INDEX_PATH = None # Tests build their own indexes in temporary directories
     # Testing-specific settings (e.g., different database)
 
 class ProductionConfig(Config):
@@ -0,0 +1,130 @@
+"""
+Benchmark: bare requests.get vs. the pooled keep-alive arXiv session.
+
+Starts a local mock arXiv Atom server (HTTP/1.1, gzip when requested) and times
+N sequential fetches with each client. The mock server can add an artificial
+delay to every new TCP connection to emulate the DNS + TCP/TLS setup cost of
+talking to export.arxiv.org.
+
+Usage:
+    python scripts/bench_arxiv_session.py --requests 50 --entries 50 --connect-latency 0.05
+"""
+import argparse
+import gzip
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.arxiv_api import get_session, close_session  # noqa: E402
+
+ENTRY_TEMPLATE = '''  <entry>
+    <id>http://arxiv.org/abs/2401.{n:05d}v1</id>
+    <updated>2024-01-02T00:00:00Z</updated>
+    <published>2024-01-01T00:00:00Z</published>
+    <title>Mock paper {n} on efficient transformers</title>
+    <summary>{summary}</summary>
+    <author><name>Author {n}</name></author>
+    <arxiv:primary_category term="cs.LG"/>
+    <category term="cs.LG"/>
+  </entry>
+'''
+
+
+def build_feed(entries):
+    summary = "We study a mock problem in considerable detail. " * 20
+    body = ''.join(ENTRY_TEMPLATE.format(n=n, summary=summary) for n in range(entries))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom" '
+        'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">\n'
+        f'  <opensearch:totalResults>{entries}</opensearch:totalResults>\n{body}</feed>\n'
+    ).encode('utf-8')
+
+
+def make_handler(feed, gzipped_feed, connect_latency):
+    class MockArxivHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Allows keep-alive
+        disable_nagle_algorithm = True  # Avoids 40 ms delayed-ACK stalls skewing the numbers
+
+        def setup(self):
+            # Emulates connection establishment cost once per TCP connection
+            if connect_latency:
+                time.sleep(connect_latency)
+            super().setup()
+
+        def do_GET(self):
+            use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+            payload = gzipped_feed if use_gzip else feed
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/atom+xml; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            if use_gzip:
+                self.send_header('Content-Encoding', 'gzip')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockArxivHandler
+
+
+def time_requests(fetch, url, count):
+    """Returns per-request timings and the wire size of the last response body."""
+    timings = []
+    wire_bytes = 0
+    for _ in range(count):
+        started = time.perf_counter()
+        response = fetch(url)
+        response.raise_for_status()
+        _ = response.text
+        timings.append(time.perf_counter() - started)
+        wire_bytes = int(response.headers.get('Content-Length', 0))
+    return timings, wire_bytes
+
+
+def report(label, timings, wire_bytes):
+    print(f"{label:<28} mean {statistics.mean(timings) * 1000:8.2f} ms   "
+          f"p50 {statistics.median(timings) * 1000:8.2f} ms   wire bytes/request {wire_bytes:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50, help='Requests per client')
+    parser.add_argument('--entries', type=int, default=50, help='Atom entries per response')
+    parser.add_argument('--connect-latency', type=float, default=0.05,
+                        help='Seconds of artificial delay per new connection')
+    args = parser.parse_args()
+
+    feed = build_feed(args.entries)
+    gzipped_feed = gzip.compress(feed)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(feed, gzipped_feed, args.connect_latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/query?search_query=all:mock"
+
+    try:
+        # Baseline: what make_api_request used to do (a new connection for every call)
+        bare, bare_bytes = time_requests(lambda u: requests.get(u, timeout=10), url, args.requests)
+        session = get_session()
+        pooled, pooled_bytes = time_requests(lambda u: session.get(u, timeout=(5, 30)), url, args.requests)
+    finally:
+        close_session()
+        server.shutdown()
+
+    print(f"{args.requests} requests, {args.entries} entries/response, "
+          f"{args.connect_latency * 1000:.0f} ms emulated connect cost")
+    print(f"Uncompressed feed size: {len(feed)} bytes")
+    report("requests.get (baseline)", bare, bare_bytes)
+    report("pooled session + gzip", pooled, pooled_bytes)
+    saved = statistics.mean(bare) - statistics.mean(pooled)
+    print(f"Per-request saving: {saved * 1000:.2f} ms ({saved / statistics.mean(bare) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: filtering by category and published date with the memory-mapped paper index
+against a Python loop over ArxivPaper objects.
+
+Writes a synthetic index of N papers (arXiv-like category mix, ~150 categories) to a temporary
+directory, then times "categories in {cs.AI, cs.LG} and published in the last 7 days", the same
+category filter over all dates, and category facet counts for the last 30 days. The loop
+baseline runs over a smaller list of ArxivPaper objects and is scaled to N.
+
+Usage:
+    python scripts/bench_paper_index.py --papers 2000000 --loop-papers 200000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.models import ArxivPaper  # noqa: E402
+from app.paper_index import FORMAT_VERSION, PaperIndex  # noqa: E402
+
+CATEGORIES = ['cs.AI', 'cs.LG', 'cs.CL', 'cs.CV', 'stat.ML', 'math.OC'] + [f"x.{n}" for n in range(144)]
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+SPAN_SECONDS = 10 * 365 * 86400
+
+
+def synthetic_columns(papers, rng):
+    published = np.sort(rng.integers(int(NOW.timestamp()) - SPAN_SECONDS, int(NOW.timestamp()), papers))
+    first = rng.zipf(1.5, papers) % len(CATEGORIES)
+    second = rng.integers(0, len(CATEGORIES), papers)
+    has_second = rng.random(papers) < 0.6
+    return published, first, np.where(has_second, second, first)
+
+
+def write_index(path, published, first, second):
+    papers = len(published)
+    words = (len(CATEGORIES) + 63) // 64
+    bits = np.zeros((papers, words), dtype=np.uint64)
+    for codes in (first, second):
+        np.bitwise_or.at(bits, (np.arange(papers), codes // 64), np.left_shift(np.uint64(1), (codes % 64).astype(np.uint64)))
+    np.save(os.path.join(path, 'published.npy'), published)
+    np.save(os.path.join(path, 'updated.npy'), published)
+    np.save(os.path.join(path, 'primary.npy'), first.astype(np.int16))
+    np.save(os.path.join(path, 'categories.npy'), bits)
+    for name in ('ids', 'titles', 'summaries'):
+        np.save(os.path.join(path, f"{name}.off.npy"), np.zeros(papers + 1, dtype=np.int64))
+        open(os.path.join(path, f"{name}.bin"), 'wb').close()
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump({'version': FORMAT_VERSION, 'rows': papers, 'categories': CATEGORIES}, f)
+
+
+def best_of(runs, fn):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--papers', type=int, default=2_000_000)
+    parser.add_argument('--loop-papers', type=int, default=200_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    wanted = {'cs.AI', 'cs.LG'}
+    since = NOW - timedelta(days=7)
+
+    with tempfile.TemporaryDirectory() as path:
+        write_index(path, *synthetic_columns(args.papers, rng))
+        index = PaperIndex(path)
+        filter_time, rows = best_of(args.runs, lambda: index.filter(categories=wanted, published_since=since))
+        scan_time, _ = best_of(args.runs, lambda: index.filter(categories=wanted))
+        last_month = index.filter(published_since=NOW - timedelta(days=30))
+        facet_time, _ = best_of(args.runs, lambda: index.category_counts(last_month))
+
+        published, first, second = synthetic_columns(args.loop_papers, rng)
+        papers = [
+            ArxivPaper(id_str=f"p{n}", title="t", summary="", published_date=datetime.fromtimestamp(int(ts), timezone.utc),
+                       updated_date=datetime.fromtimestamp(int(ts), timezone.utc),
+                       categories=[CATEGORIES[a], CATEGORIES[b]], primary_category=CATEGORIES[a])
+            for n, (ts, a, b) in enumerate(zip(published, first, second))
+        ]
+        loop_time, _ = best_of(args.runs, lambda: [
+            paper for paper in papers
+            if paper.published_date >= since and any(category in wanted for category in paper.categories)
+        ])
+        loop_scaled = loop_time * args.papers / args.loop_papers
+
+        print(f"papers indexed:                  {args.papers:,}")
+        print(f"index: categories + last 7 days  {filter_time * 1000:9.2f} ms ({len(rows):,} rows)")
+        print(f"index: categories, all dates     {scan_time * 1000:9.2f} ms")
+        print(f"index: facets, last 30 days      {facet_time * 1000:9.2f} ms ({len(last_month):,} rows)")
+        print(f"python loop (scaled from {args.loop_papers:,}) {loop_scaled * 1000:9.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Benchmark: the slotted ArxivPaper against the previous dict-backed dataclass.
+
+Builds N papers from feed-like field values (string timestamps, list authors and
+categories) with each class and reports bytes retained per paper (tracemalloc, strings included),
+construction throughput, to_dict()/from_dict() round-trip throughput and pickle size,
+which is what the cache backends store.
+
+Usage:
+    python scripts/bench_paper_model.py --papers 10000
+"""
+import argparse
+import gc
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.models import ArxivPaper  # noqa: E402
+
+CATEGORIES = ['cs.LG', 'cs.AI', 'cs.CL', 'cs.CV', 'stat.ML', 'math.OC', 'physics.comp-ph', 'q-bio.NC']
+
+
+@dataclass(frozen=True)
+class LegacyArxivPaper:
+    """The ArxivPaper implementation before slots, tuples and the timestamp fast path."""
+    id_str: str
+    title: str
+    summary: str
+    published_date: Optional[datetime] = None
+    updated_date: Optional[datetime] = None
+    authors: List[str] = field(default_factory=list)
+    categories: List[str] = field(default_factory=list)
+    primary_category: Optional[str] = None
+    pdf_link: Optional[str] = None
+    doi: Optional[str] = None
+
+    def __post_init__(self):
+        if not self.id_str:
+            raise ValueError("Paper ID (id_str) cannot be empty or None.")
+        if not self.title:
+            raise ValueError("Paper title cannot be empty or None.")
+        if self.summary is None:
+            raise ValueError("Paper summary cannot be None.")
+        for date_field_name in ['published_date', 'updated_date']:
+            date_val_str = getattr(self, date_field_name)
+            parsed_dt = None
+            if isinstance(date_val_str, str):
+                try:
+                    processed_date_str = date_val_str.replace('Z', '+00:00') if date_val_str.endswith('Z') else date_val_str
+                    parsed_dt = datetime.fromisoformat(processed_date_str)
+                except ValueError:
+                    try:
+                        parsed_dt = datetime.strptime(date_val_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+                    except ValueError:
+                        pass
+            elif isinstance(date_val_str, datetime):
+                parsed_dt = date_val_str
+            object.__setattr__(self, date_field_name, parsed_dt)
+        if self.published_date is None:
+            raise ValueError("Published date could not be parsed or was None.")
+        if self.updated_date is None:
+            raise ValueError("Updated date could not be parsed or was None.")
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        for date_field in ['published_date', 'updated_date']:
+            if isinstance(data[date_field], datetime):
+                data[date_field] = data[date_field].isoformat()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LegacyArxivPaper":
+        return cls(**data)
+
+
+def build_records(count):
+    """Field values as parse_arxiv_xml produces them; category strings are fresh objects per entry."""
+    records = []
+    for n in range(count):
+        published = f"2024-{n % 12 + 1:02d}-{n % 28 + 1:02d}T{n % 24:02d}:{n % 60:02d}:{n * 7 % 60:02d}Z"
+        updated = published if n % 3 else f"2024-12-{n % 28 + 1:02d}T00:00:00Z"
+        # Copies, not the literals: every parsed entry carries its own category strings
+        categories = [(CATEGORIES[(n + i) % len(CATEGORIES)] + ' ')[:-1] for i in range(1 + n % 3)]
+        records.append({
+            'id_str': f"2401.{n:05d}",
+            'title': f"Mock paper {n} on efficient transformers",
+            'summary': "We study a mock problem in considerable detail. " * 4,
+            'published_date': published,
+            'updated_date': updated,
+            'authors': [f"Author {n}", f"Author {n + 1}", "Common Coauthor"],
+            'categories': categories,
+            'primary_category': (categories[0] + ' ')[:-1],
+            'pdf_link': f"http://arxiv.org/pdf/2401.{n:05d}.pdf",
+            'doi': None,
+        })
+    return records
+
+
+def retained_bytes_per_paper(cls, count):
+    """Bytes still allocated once the papers are built and the parsed records are dropped."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    papers = [cls(**record) for record in build_records(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / count, papers
+
+
+def throughput(fn, items, repeat=5):
+    """Best items/second over `repeat` runs, with the cyclic GC paused like timeit does."""
+    best = float('inf')
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for item in items:
+                fn(item)
+            best = min(best, time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return len(items) / best
+
+
+def measure(cls, records):
+    bytes_per_paper, papers = retained_bytes_per_paper(cls, len(records))
+    dicts = [paper.to_dict() for paper in papers]
+    return {
+        'bytes/paper': bytes_per_paper,
+        'construct/s': throughput(lambda record: cls(**record), records),
+        'to_dict/s': throughput(lambda paper: paper.to_dict(), papers),
+        'from_dict/s': throughput(cls.from_dict, dicts),
+        'pickle bytes/paper': len(pickle.dumps(papers, protocol=pickle.HIGHEST_PROTOCOL)) / len(papers),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--papers', type=int, default=10000, help='Papers to build per class')
+    args = parser.parse_args()
+
+    records = build_records(args.papers)
+    legacy = measure(LegacyArxivPaper, records)
+    current = measure(ArxivPaper, records)
+
+    print(f"{args.papers} papers")
+    print(f"{'metric':<20} {'legacy':>14} {'slotted':>14} {'change':>9}")
+    for metric in legacy:
+        change = (current[metric] - legacy[metric]) / legacy[metric] * 100
+        print(f"{metric:<20} {legacy[metric]:>14,.1f} {current[metric]:>14,.1f} {change:>+8.1f}%")
+
+
+if __name__ == '__main__':
+    main()
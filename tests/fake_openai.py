@@ -0,0 +1,139 @@
+"""
+A local OpenAI-compatible chat completions server for tests.
+
+Serves POST /v1/chat/completions on a free port with configurable latency and injected
+429 responses, and records how many requests were in flight at once. The reply to a prompt
+containing "Title: X" is "1. Takeaway for X" so tests can match replies to papers.
+Requests with "stream": true get the reply as server-sent chunks, one word (plus
+stream_extra_words filler words) every token_delay seconds; streams the client hangs up on
+are counted in streams_cancelled. Connections are kept alive; connections counts them.
+
+    with FakeOpenAIServer(latency=0.2, rate_limited_requests=2) as server:
+        client = OpenAI(api_key='test', base_url=server.base_url, max_retries=0)
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TITLE_RE = re.compile(r'Title: (.*)')
+
+
+class FakeOpenAIServer:
+    def __init__(self, latency=0.0, rate_limited_requests=0, retry_after=0, latency_by_title=None,
+                 token_delay=0.0, stream_extra_words=0):
+        self.latency = latency
+        self.latency_by_title = latency_by_title or {}
+        self.rate_limited_requests = rate_limited_requests
+        self.retry_after = retry_after
+        self.token_delay = token_delay
+        self.stream_extra_words = stream_extra_words
+        self.chunks_sent = 0
+        self.connections = 0
+        self.streams_cancelled = 0
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._server.block_on_close = False # Don't wait for handlers still sleeping on abandoned requests
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # Keep-alive, like the real API
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body, headers=None):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, content):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                words = content.split(' ') + [f"word{n}" for n in range(server.stream_extra_words)]
+                try:
+                    for n, word in enumerate(words):
+                        delta = {'content': word if n == 0 else ' ' + word}
+                        finish_reason = 'stop' if n == len(words) - 1 else None
+                        chunk = {'id': 'chatcmpl-test', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                                 'model': body.get('model', 'test'),
+                                 'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]}
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                        self.wfile.flush()
+                        with server._lock:
+                            server.chunks_sent += 1
+                        time.sleep(server.token_delay)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.streams_cancelled += 1
+                self.close_connection = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                prompt = body.get('messages', [{}])[-1].get('content', '')
+                match = _TITLE_RE.search(prompt)
+                title = match.group(1).strip() if match else ''
+                with server._lock:
+                    server.requests.append(title)
+                    limited = server.rate_limited_requests > 0
+                    if limited:
+                        server.rate_limited_requests -= 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    if limited:
+                        self._reply(429, {'error': {'message': 'Rate limit reached', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                                    {'Retry-After': str(server.retry_after)})
+                        return
+                    time.sleep(server.latency_by_title.get(title, server.latency))
+                    if body.get('stream'):
+                        self._stream(body, f"1. Takeaway for {title}")
+                        return
+                    self._reply(200, {
+                        'id': 'chatcmpl-test', 'object': 'chat.completion', 'created': int(time.time()),
+                        'model': body.get('model', 'test'),
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant', 'content': f"1. Takeaway for {title}"}}],
+                        'usage': {'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15},
+                    })
+                except (BrokenPipeError, ConnectionResetError):
+                    pass # The client gave up on this request
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+        return Handler
@@ -0,0 +1,44 @@
+"""
+Papers and an app set up for search tests.
+
+make_paper(n) builds an ArxivPaper with id 2301.<n>v1 (or the given arXiv id) and fixed fields
+that tests override by keyword. SearchTestCase is a base TestCase with an app context, a test
+client and app.routes.search_page patched (self.search_page) to return papers 1 and 2 of 25
+results; the fallback to the local index is disabled and the search caches are cleared.
+
+    class TestSomething(SearchTestCase):
+        def test_page(self):
+            self.search_page.return_value = {'papers': [make_paper(3, title="Other")], 'total_results': 1}
+"""
+import unittest
+from unittest.mock import patch
+
+from app import create_app, cache
+from app.arxiv_api import search_breaker
+from app.models import ArxivPaper
+
+
+def make_paper(paper_id, *, title=None, summary=None, published='2023-01-01T00:00:00Z', updated=None,
+               authors=("Author One",), categories=("cs.AI", "cs.LG")):
+    arxiv_id = paper_id if isinstance(paper_id, str) else f"2301.{paper_id:05d}v1"
+    categories = list(categories)
+    return ArxivPaper(id_str=arxiv_id, title=title or f"Paper {paper_id}",
+                      summary=summary or f"Abstract of {arxiv_id} – αβ.",
+                      published_date=published, updated_date=updated or published,
+                      authors=list(authors), categories=categories, primary_category=categories[0] if categories else None,
+                      pdf_link=f"http://arxiv.org/pdf/{arxiv_id}.pdf")
+
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        self.app.config['SEARCH_LOCAL_FALLBACK'] = False
+        cache.clear()
+        search_breaker.reset()
+        self.client = self.app.test_client()
+        patcher = patch('app.routes.search_page', return_value={'papers': [make_paper(1), make_paper(2)], 'total_results': 25})
+        self.search_page = patcher.start()
+        self.addCleanup(patcher.stop)
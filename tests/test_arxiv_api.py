@@ -1,10 +1,16 @@
+import asyncio
+import io
+import threading
+import time
 import unittest
-from unittest.mock import patch, MagicMock, call
-import xml.etree.ElementTree as ET
-from dataclasses import asdict
+from unittest.mock import patch, MagicMock, AsyncMock
+import httpx
+from dataclasses import asdict, FrozenInstanceError
 import requests
-from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+from datetime import datetime, timezone
 import logging
+import pickle
 
 # Assuming your project structure allows this import path
 # If run from project root: python -m unittest discover tests
@@ -12,13 +18,28 @@ from app.arxiv_api import (
     construct_query_url,
     make_api_request,
     parse_arxiv_xml,
+    ArxivFeedStream,
     search_papers,
     ARXIV_API_URL, 
     REQUEST_THROTTLE_SECONDS,
     MAX_RETRIES,
-    DEFAULT_TIMEOUT_SECONDS
+    CONNECT_TIMEOUT_SECONDS,
+    READ_TIMEOUT_SECONDS,
+    get_session,
+    close_session,
+    async_make_api_request,
+    async_search_papers,
+    search_papers_concurrently,
+    search_cache_key,
+    search_page,
+    search_flight,
+    search_cache,
+    fetch_papers_by_ids,
+    normalize_arxiv_id,
+    iter_search_results
 )
-from app.models import ArxivPaper
+from app import create_app, cache
+from app.models import ArxivPaper, parse_arxiv_timestamp
 # Import new custom exceptions
 from app.exceptions import (
     ValidationException,
@@ -228,6 +249,43 @@ class TestArxivPaperModel(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "Error creating ArxivPaper from dict: __init__\\(\\) got an unexpected keyword argument 'extra_field'.*Data: {.*}"):
             ArxivPaper.from_dict(data_with_extra)
 
+    def test_post_init_validation_unparsable_date(self):
+        invalid_data = EXPECTED_PAPER_DICT_SINGLE_ENTRY.copy()
+        invalid_data["published_date"] = "last tuesday"
+        with self.assertRaisesRegex(ValueError, "Published date could not be parsed: 'last tuesday'"):
+            ArxivPaper(**invalid_data)
+
+    def test_instances_are_slotted(self):
+        paper = ArxivPaper(**EXPECTED_PAPER_DICT_SINGLE_ENTRY)
+        self.assertFalse(hasattr(paper, '__dict__'))
+        with self.assertRaises(FrozenInstanceError):
+            paper.title = "Changed"
+        self.assertEqual(paper.authors, ("Author One", "Author Two"))
+        self.assertEqual(hash(paper), hash(ArxivPaper(**EXPECTED_PAPER_DICT_SINGLE_ENTRY)))
+
+    def test_categories_are_interned(self):
+        data = EXPECTED_PAPER_DICT_SINGLE_ENTRY.copy()
+        data["categories"] = [("cs.A" + "I x")[:-2], "cs.LG"] # Built at runtime, so not interned yet
+        paper = ArxivPaper(**data)
+        self.assertIs(paper.categories[0], EXPECTED_PAPER_OBJ_SINGLE_ENTRY.categories[0])
+        self.assertIs(paper.categories[0], paper.primary_category)
+
+    def test_pickle_round_trip(self):
+        paper = EXPECTED_PAPER_OBJ_SINGLE_ENTRY
+        restored = pickle.loads(pickle.dumps(paper))
+        self.assertEqual(restored, paper)
+        self.assertEqual(restored.published_date, datetime(2023, 1, 1, tzinfo=timezone.utc))
+
+    def test_parse_arxiv_timestamp(self):
+        expected = datetime(2023, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        self.assertEqual(parse_arxiv_timestamp("2023-01-02T03:04:05Z"), expected)
+        self.assertIs(parse_arxiv_timestamp("2023-01-02T03:04:05Z").tzinfo, timezone.utc)
+        self.assertEqual(parse_arxiv_timestamp("2023-01-02T03:04:05+00:00"), expected)
+        self.assertEqual(parse_arxiv_timestamp("2023-01-02T03:04:05.250Z"), expected.replace(microsecond=250000))
+        self.assertIs(parse_arxiv_timestamp(expected), expected)
+        self.assertIsNone(parse_arxiv_timestamp("2023-13-02T03:04:05Z"))
+        self.assertIsNone(parse_arxiv_timestamp(None))
+
 class TestConstructQueryUrl(unittest.TestCase):
     def test_basic_search_query(self):
         url = construct_query_url(search_query="ti:electron")
@@ -290,9 +348,19 @@ class TestConstructQueryUrl(unittest.TestCase):
         mock_logger_error.assert_called_with("Either search_query or id_list must be provided.")
 
 class TestMakeApiRequest(unittest.TestCase):
+    def setUp(self):
+        # The shared rate limiter is exercised in test_rate_limiter.py; stub it out here
+        limiter_patcher = patch('app.arxiv_api.arxiv_rate_limiter')
+        self.mock_limiter = limiter_patcher.start()
+        self.mock_limiter.acquire.return_value = 0.0
+        self.addCleanup(limiter_patcher.stop)
+        session_patcher = patch('app.arxiv_api.get_session')
+        self.mock_session = session_patcher.start().return_value
+        self.addCleanup(session_patcher.stop)
+
     @patch('app.arxiv_api.time.sleep', return_value=None)
-    @patch('app.arxiv_api.requests.get')
-    def test_successful_request(self, mock_requests_get, mock_time_sleep):
+    def test_successful_request(self, mock_time_sleep):
+        mock_requests_get = self.mock_session.get
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.text = "<feed>success</feed>"
@@ -302,12 +370,13 @@ class TestMakeApiRequest(unittest.TestCase):
         result = make_api_request("http://fakeurl.com/query")
 
         self.assertEqual(result, "<feed>success</feed>")
-        mock_requests_get.assert_called_once_with("http://fakeurl.com/query", timeout=DEFAULT_TIMEOUT_SECONDS)
-        mock_time_sleep.assert_called_once_with(REQUEST_THROTTLE_SECONDS)
+        mock_requests_get.assert_called_once_with("http://fakeurl.com/query", timeout=(CONNECT_TIMEOUT_SECONDS, READ_TIMEOUT_SECONDS), stream=False)
+        self.mock_limiter.acquire.assert_called_once_with()
+        mock_time_sleep.assert_not_called() # No unconditional throttle sleep
 
     @patch('app.arxiv_api.time.sleep', return_value=None)
-    @patch('app.arxiv_api.requests.get')
-    def test_http_error_client_404_no_retry(self, mock_requests_get, mock_time_sleep):
+    def test_http_error_client_404_no_retry(self, mock_time_sleep):
+        mock_requests_get = self.mock_session.get
         mock_response = MagicMock()
         mock_response.status_code = 404
         http_error = requests.exceptions.HTTPError(response=mock_response)
@@ -319,11 +388,11 @@ class TestMakeApiRequest(unittest.TestCase):
         self.assertEqual(cm.exception.status_code, 404)
         self.assertIn("Client error with arXiv API request.", str(cm.exception))
         mock_requests_get.assert_called_once()
-        mock_time_sleep.assert_called_once_with(REQUEST_THROTTLE_SECONDS)
+        self.mock_limiter.acquire.assert_called_once_with()
 
     @patch('app.arxiv_api.time.sleep', return_value=None)
-    @patch('app.arxiv_api.requests.get')
-    def test_http_error_server_500_with_retries(self, mock_requests_get, mock_time_sleep):
+    def test_http_error_server_500_with_retries(self, mock_time_sleep):
+        mock_requests_get = self.mock_session.get
         mock_response = MagicMock()
         mock_response.status_code = 500
         http_error = requests.exceptions.HTTPError(response=mock_response)
@@ -337,8 +406,8 @@ class TestMakeApiRequest(unittest.TestCase):
         self.assertEqual(mock_requests_get.call_count, MAX_RETRIES)
 
     @patch('app.arxiv_api.time.sleep', return_value=None)
-    @patch('app.arxiv_api.requests.get')
-    def test_http_error_rate_limit_429_with_retries_and_backoff(self, mock_requests_get, mock_time_sleep):
+    def test_http_error_rate_limit_429_with_retries_and_backoff(self, mock_time_sleep):
+        mock_requests_get = self.mock_session.get
         mock_response = MagicMock()
         mock_response.status_code = 429
         http_error = requests.exceptions.HTTPError(response=mock_response)
@@ -350,18 +419,21 @@ class TestMakeApiRequest(unittest.TestCase):
         self.assertEqual(cm.exception.status_code, 429)
         self.assertIn("arXiv API rate limit exceeded.", str(cm.exception))
         self.assertEqual(mock_requests_get.call_count, MAX_RETRIES)
+        self.assertEqual(self.mock_limiter.acquire.call_count, MAX_RETRIES)
+        # Backoff is applied to the shared bucket so every worker slows down
+        self.mock_limiter.penalize.assert_called_with(REQUEST_THROTTLE_SECONDS * MAX_RETRIES)
 
     @patch('app.arxiv_api.time.sleep', return_value=None)
-    @patch('app.arxiv_api.requests.get')
-    def test_timeout_error_with_retries(self, mock_requests_get, mock_time_sleep):
+    def test_timeout_error_with_retries(self, mock_time_sleep):
+        mock_requests_get = self.mock_session.get
         mock_requests_get.side_effect = requests.exceptions.Timeout("Timeout test")
         with self.assertRaisesRegex(NetworkException, "Request to arXiv API timed out."):
             make_api_request("http://fakeurl.com/query")
         self.assertEqual(mock_requests_get.call_count, MAX_RETRIES)
 
     @patch('app.arxiv_api.time.sleep', return_value=None)
-    @patch('app.arxiv_api.requests.get')
-    def test_request_exception_with_retries(self, mock_requests_get, mock_time_sleep):
+    def test_request_exception_with_retries(self, mock_time_sleep):
+        mock_requests_get = self.mock_session.get
         mock_requests_get.side_effect = requests.exceptions.RequestException("Some generic network error")
         with self.assertRaisesRegex(NetworkException, "A general network or request error occurred: Some generic network error"):
             make_api_request("http://fakeurl.com/query")
@@ -369,8 +441,8 @@ class TestMakeApiRequest(unittest.TestCase):
 
     @patch('app.arxiv_api.logger.error')
     @patch('app.arxiv_api.time.sleep', return_value=None)
-    @patch('app.arxiv_api.requests.get')
-    def test_final_retry_failure_logs_error(self, mock_requests_get, mock_time_sleep, mock_logger_error):
+    def test_final_retry_failure_logs_error(self, mock_time_sleep, mock_logger_error):
+        mock_requests_get = self.mock_session.get
         mock_requests_get.side_effect = requests.exceptions.Timeout() 
         with self.assertRaises(NetworkException): # Expect NetworkException on final timeout
             make_api_request("http://fakeurl.com/query")
@@ -379,6 +451,64 @@ class TestMakeApiRequest(unittest.TestCase):
         all_log_calls = [call_args[0][0] for call_args in mock_logger_error.call_args_list] # Get the first arg of each call
         self.assertTrue(any(f"All {MAX_RETRIES} retries failed for URL: http://fakeurl.com/query" in log_msg for log_msg in all_log_calls))
 
+class TestHttpSession(unittest.TestCase):
+    def tearDown(self):
+        close_session()
+
+    def test_session_is_reused(self):
+        self.assertIs(get_session(), get_session())
+
+    def test_session_requests_gzip_and_keep_alive(self):
+        session = get_session()
+        self.assertIn('gzip', session.headers['Accept-Encoding'])
+        self.assertEqual(session.headers['Connection'], 'keep-alive')
+
+    def test_session_is_recreated_after_close(self):
+        first = get_session()
+        close_session()
+        self.assertIsNot(get_session(), first)
+
+    @patch('app.arxiv_api.os.getpid')
+    def test_session_is_not_shared_across_fork(self, mock_getpid):
+        mock_getpid.return_value = 1
+        parent_session = get_session()
+        mock_getpid.return_value = 2 # Simulates a forked worker
+        self.assertIsNot(get_session(), parent_session)
+
+class TestArxivFeedStream(unittest.TestCase):
+    def test_yields_papers_from_byte_chunks(self):
+        data = SAMPLE_XML_VALID_MULTIPLE_ENTRIES_WITH_TOTAL.encode('utf-8')
+        chunks = [data[i:i + 7] for i in range(0, len(data), 7)] # Tags split across chunks
+        stream = ArxivFeedStream(chunks)
+        self.assertEqual(list(stream), EXPECTED_PAPERS_MULTIPLE_ENTRIES)
+        self.assertEqual(stream.total_results, 2)
+
+    def test_reads_file_like_objects(self):
+        stream = ArxivFeedStream(io.BytesIO(SAMPLE_XML_VALID_SINGLE_ENTRY.encode('utf-8')), chunk_size=16)
+        self.assertEqual(list(stream), [EXPECTED_PAPER_OBJ_SINGLE_ENTRY])
+
+    def test_reads_streamed_requests_response(self):
+        response = MagicMock(spec=['iter_content'])
+        response.iter_content.return_value = iter([SAMPLE_XML_VALID_SINGLE_ENTRY.encode('utf-8')])
+        self.assertEqual(list(ArxivFeedStream(response)), [EXPECTED_PAPER_OBJ_SINGLE_ENTRY])
+        response.iter_content.assert_called_once()
+
+    def test_papers_are_yielded_before_document_ends(self):
+        head, _, _ = SAMPLE_XML_VALID_MULTIPLE_ENTRIES_WITH_TOTAL.partition('<entry>\n    <id>http://arxiv.org/abs/9876.5432')
+        def chunks():
+            yield head.encode('utf-8')
+            raise AssertionError("Parser read past the first entry before yielding it")
+        first = next(iter(ArxivFeedStream(chunks())))
+        self.assertEqual(first.id_str, "1234.5678")
+
+    def test_malformed_stream_raises_parsing_exception(self):
+        with self.assertRaisesRegex(ParsingException, "Failed to parse XML response from arXiv."):
+            list(ArxivFeedStream([MALFORMED_XML.encode('utf-8')]))
+
+    def test_nested_entries_are_ignored(self):
+        xml = SAMPLE_XML_VALID_SINGLE_ENTRY.replace('<summary>', '<source><entry><title>Nested</title></entry></source><summary>')
+        self.assertEqual(len(list(ArxivFeedStream(xml))), 1)
+
 class TestParseArxivXml(unittest.TestCase):
     def test_valid_single_entry(self):
         result = parse_arxiv_xml(SAMPLE_XML_VALID_SINGLE_ENTRY)
@@ -409,7 +539,7 @@ class TestParseArxivXml(unittest.TestCase):
         self.assertEqual(len(result['papers']), 1) 
         self.assertEqual(result['papers'][0], EXPECTED_PAPER_FROM_VALID_ENTRY_IN_MIXED_XML)
         self.assertEqual(result['total_results'], 1) # totalResults in XML was 1
-        self.assertTrue(any("Skipping entry due to validation error: Paper title cannot be empty or None." in call[0][0] for call in mock_logger_warning.call_args_list))
+        self.assertTrue(any("Skipping entry due to validation error: Paper title cannot be empty or None." in logged[0][0] for logged in mock_logger_warning.call_args_list))
 
     def test_malformed_xml_raises_parsing_exception(self):
         with self.assertRaisesRegex(ParsingException, "Failed to parse XML response from arXiv."):
@@ -435,7 +565,7 @@ class TestParseArxivXml(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(len(result['papers']), 0)
         self.assertEqual(result['total_results'], 0)
-        self.assertTrue(any("Skipping entry due to validation error" in call[0][0] for call in mock_logger_warning.call_args_list))
+        self.assertTrue(any("Skipping entry due to validation error" in logged[0][0] for logged in mock_logger_warning.call_args_list))
 
     @patch('app.arxiv_api.logger.warning')
     def test_missing_total_results_tag(self, mock_logger_warning):
@@ -500,5 +630,404 @@ class TestSearchPapersIntegration(unittest.TestCase):
         with self.assertRaises(ParsingException):
             search_papers(query="ti:test")
 
+class TestAsyncMakeApiRequest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        limiter_patcher = patch('app.arxiv_api.arxiv_rate_limiter')
+        self.mock_limiter = limiter_patcher.start()
+        self.mock_limiter.acquire_async = AsyncMock(return_value=0.0)
+        self.addCleanup(limiter_patcher.stop)
+        throttle_patcher = patch('app.arxiv_api.REQUEST_THROTTLE_SECONDS', 0) # No real back-off sleeps
+        throttle_patcher.start()
+        self.addCleanup(throttle_patcher.stop)
+        self.requested_urls = []
+        self.responses = []
+
+    def handler(self, request):
+        self.requested_urls.append(str(request.url))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def asyncSetUp(self):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        client_patcher = patch('app.arxiv_api.get_async_client', return_value=client)
+        client_patcher.start()
+        self.addCleanup(client_patcher.stop)
+        self.addAsyncCleanup(client.aclose)
+
+    async def test_successful_request(self):
+        self.responses = [httpx.Response(200, text="<feed>success</feed>")]
+        result = await async_make_api_request("http://fakeurl.com/query")
+        self.assertEqual(result, "<feed>success</feed>")
+        self.assertEqual(self.requested_urls, ["http://fakeurl.com/query"])
+        self.mock_limiter.acquire_async.assert_awaited_once_with()
+
+    async def test_http_error_client_404_no_retry(self):
+        self.responses = [httpx.Response(404)]
+        with self.assertRaises(ArxivAPIException) as cm:
+            await async_make_api_request("http://fakeurl.com/query")
+        self.assertNotIsInstance(cm.exception, NetworkException)
+        self.assertEqual(cm.exception.status_code, 404)
+        self.assertEqual(len(self.requested_urls), 1)
+
+    async def test_http_error_server_500_with_retries(self):
+        self.responses = [httpx.Response(500) for _ in range(MAX_RETRIES)]
+        with self.assertRaises(NetworkException) as cm:
+            await async_make_api_request("http://fakeurl.com/query")
+        self.assertEqual(cm.exception.status_code, 500)
+        self.assertEqual(len(self.requested_urls), MAX_RETRIES)
+        self.assertEqual(self.mock_limiter.acquire_async.await_count, MAX_RETRIES)
+
+    async def test_rate_limit_429_penalizes_shared_bucket_then_recovers(self):
+        self.responses = [httpx.Response(429), httpx.Response(200, text="<feed/>")]
+        result = await async_make_api_request("http://fakeurl.com/query")
+        self.assertEqual(result, "<feed/>")
+        self.mock_limiter.penalize.assert_called_once()
+
+    async def test_timeout_error_with_retries(self):
+        self.responses = [httpx.ReadTimeout("timed out") for _ in range(MAX_RETRIES)]
+        with self.assertRaisesRegex(NetworkException, "timed out"):
+            await async_make_api_request("http://fakeurl.com/query")
+        self.assertEqual(len(self.requested_urls), MAX_RETRIES)
+
+    async def test_connection_error_with_retries(self):
+        self.responses = [httpx.ConnectError("refused") for _ in range(MAX_RETRIES)]
+        with self.assertRaises(NetworkException):
+            await async_make_api_request("http://fakeurl.com/query")
+
+class TestAsyncSearchPapers(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        cache.clear()
+
+    def test_cache_key_ignores_call_style(self):
+        self.assertEqual(
+            search_cache_key(query="ti:test", count=20),
+            search_cache_key("ti:test", None, 0, 20, "relevance", "descending")
+        )
+        self.assertNotEqual(search_cache_key(query="ti:test"), search_cache_key(query="ti:test", start_index=10))
+
+    @patch('app.arxiv_api.make_api_request')
+    @patch('app.arxiv_api.async_make_api_request', new_callable=AsyncMock)
+    def test_async_results_are_served_to_sync_callers(self, mock_async_request, mock_sync_request):
+        mock_async_request.return_value = SAMPLE_XML_VALID_SINGLE_ENTRY
+        async_result = asyncio.run(async_search_papers(query="ti:test", count=5))
+        sync_result = search_papers(query="ti:test", start_index=0, count=5)
+
+        self.assertEqual(sync_result, async_result)
+        self.assertEqual(async_result['papers'], [EXPECTED_PAPER_OBJ_SINGLE_ENTRY])
+        mock_sync_request.assert_not_called()
+
+    @patch('app.arxiv_api.make_api_request')
+    @patch('app.arxiv_api.async_make_api_request', new_callable=AsyncMock)
+    def test_sync_results_are_served_to_async_callers(self, mock_async_request, mock_sync_request):
+        mock_sync_request.return_value = SAMPLE_XML_VALID_SINGLE_ENTRY
+        sync_result = search_papers(query="ti:test")
+        async_result = asyncio.run(async_search_papers(query="ti:test"))
+
+        self.assertEqual(async_result, sync_result)
+        mock_async_request.assert_not_called()
+
+    def test_invalid_parameters_raise_validation_exception(self):
+        with self.assertRaises(ValidationException):
+            asyncio.run(async_search_papers(query=None, ids=None))
+
+    @patch('app.arxiv_api.async_make_api_request', new_callable=AsyncMock)
+    def test_concurrent_searches_keep_order_and_return_errors(self, mock_async_request):
+        async def fake_request(url):
+            if "fails" in url:
+                raise NetworkException("Simulated network failure")
+            return SAMPLE_XML_VALID_SINGLE_ENTRY
+        mock_async_request.side_effect = fake_request
+
+        results = search_papers_concurrently([{'query': 'ti:ok'}, {'query': 'ti:fails'}, {'query': 'ti:ok2'}])
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['total_results'], 1)
+        self.assertIsInstance(results[1], NetworkException)
+        self.assertEqual(results[2]['papers'], [EXPECTED_PAPER_OBJ_SINGLE_ENTRY])
+
+class TestSearchPapersSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        with self.app.app_context():
+            cache.clear()
+        search_flight.reset()
+
+    @patch('app.arxiv_api.make_api_request')
+    def test_concurrent_identical_searches_share_one_fetch(self, mock_make_request):
+        release = threading.Event()
+        def slow_request(url):
+            release.wait(5)
+            return SAMPLE_XML_VALID_SINGLE_ENTRY
+        mock_make_request.side_effect = slow_request
+        results = []
+
+        def worker(kwargs):
+            with self.app.app_context():
+                results.append(search_papers(**kwargs))
+
+        # Different call styles for the same normalized arguments
+        calls = [{'query': 'ti:test'}, {'query': 'ti:test', 'start_index': 0}, {'query': 'ti:test', 'count': 10}]
+        threads = [threading.Thread(target=worker, args=(kwargs,)) for kwargs in calls]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while search_flight.stats()['coalesced_local'] < len(calls) - 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(mock_make_request.call_count, 1)
+        self.assertEqual(len(results), len(calls))
+        self.assertTrue(all(result['papers'] == [EXPECTED_PAPER_OBJ_SINGLE_ENTRY] for result in results))
+        self.assertEqual(search_flight.stats()['coalesced_local'], len(calls) - 1)
+
+class TestSearchPapersStaleCache(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        cache.clear()
+        self.now = 1000.0
+        clock_patcher = patch.object(search_cache, '_clock', lambda: self.now)
+        clock_patcher.start()
+        self.addCleanup(clock_patcher.stop)
+
+    @patch('app.arxiv_api.make_api_request')
+    def test_last_known_result_is_served_when_arxiv_is_rate_limiting(self, mock_make_request):
+        mock_make_request.return_value = SAMPLE_XML_VALID_SINGLE_ENTRY
+        fresh = search_papers(query="ti:test")
+        self.assertNotIn('stale', fresh)
+
+        self.now += search_cache.hard_ttl + 1
+        mock_make_request.side_effect = NetworkException("Rate limited", status_code=429)
+        stale = search_papers(query="ti:test")
+
+        self.assertTrue(stale['stale'])
+        self.assertEqual(stale['papers'], fresh['papers'])
+
+    @patch('app.arxiv_api.make_api_request')
+    def test_stale_flag_is_propagated_by_search_page(self, mock_make_request):
+        mock_make_request.return_value = SAMPLE_XML_VALID_SINGLE_ENTRY
+        search_page("ti:test", start_index=0, count=10)
+
+        self.now += search_cache.hard_ttl + 1
+        mock_make_request.side_effect = NetworkException("arXiv down")
+        page = search_page("ti:test", start_index=0, count=10)
+
+        self.assertTrue(page['stale'])
+        self.assertEqual(page['papers'], [EXPECTED_PAPER_OBJ_SINGLE_ENTRY])
+
+class TestSearchPage(unittest.TestCase):
+    TOTAL_RESULTS = 250
+
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app.config['SEARCH_CHUNK_SIZE'] = 100
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        cache.clear()
+        patcher = patch('app.arxiv_api.search_papers')
+        self.mock_search = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.chunks = {}
+        def fake_search(query, start_index, count, sort_by, sort_order, use_circuit_breaker):
+            # Mimics the memoize layer: each chunk is fetched once
+            if start_index not in self.chunks:
+                self.chunks[start_index] = {
+                    'papers': list(range(start_index, min(start_index + count, self.TOTAL_RESULTS))),
+                    'total_results': self.TOTAL_RESULTS
+                }
+            return self.chunks[start_index]
+        self.mock_search.side_effect = fake_search
+
+    def test_first_ten_pages_cost_one_fetch(self):
+        for page in range(10):
+            result = search_page("ti:test", start_index=page * 10, count=10)
+            self.assertEqual(result['papers'], list(range(page * 10, page * 10 + 10)))
+            self.assertEqual(result['total_results'], self.TOTAL_RESULTS)
+        self.assertEqual(list(self.chunks), [0])
+        self.mock_search.assert_called_with(query="ti:test", start_index=0, count=100, sort_by="relevance", sort_order="descending",
+                                            use_circuit_breaker=False)
+
+    def test_page_spanning_two_chunks(self):
+        result = search_page("ti:test", start_index=95, count=10)
+        self.assertEqual(result['papers'], list(range(95, 105)))
+        self.assertEqual(sorted(self.chunks), [0, 100])
+
+    def test_last_partial_page(self):
+        result = search_page("ti:test", start_index=240, count=20)
+        self.assertEqual(result['papers'], list(range(240, 250)))
+
+    def test_page_past_cached_total_skips_fetch(self):
+        search_page("ti:test", start_index=0, count=10)
+        self.mock_search.reset_mock()
+        result = search_page("ti:test", start_index=300, count=10)
+        self.assertEqual(result, {'papers': [], 'total_results': self.TOTAL_RESULTS})
+        self.mock_search.assert_not_called()
+
+    def test_sort_orders_are_cached_separately(self):
+        search_page("ti:test", start_index=0, count=10)
+        search_page("ti:test", start_index=0, count=10, sort_by="submittedDate")
+        self.assertEqual(self.mock_search.call_count, 2)
+        self.assertEqual(self.mock_search.call_args.kwargs['sort_by'], "submittedDate")
+
+    def test_invalid_page_raises_validation_exception(self):
+        with self.assertRaises(ValidationException):
+            search_page("ti:test", start_index=-10, count=10)
+
+class TestFetchPapersByIds(unittest.TestCase):
+    ENTRY = """  <entry>
+    <id>http://arxiv.org/abs/{id}</id>
+    <updated>2023-01-01T00:00:00Z</updated>
+    <published>2023-01-01T00:00:00Z</published>
+    <title>Paper {id}</title>
+    <summary>Summary.</summary>
+  </entry>
+"""
+    UNKNOWN_IDS = {"2301.99999"}
+
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app.config['ARXIV_ID_CHUNK_SIZE'] = 4
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        cache.clear()
+        patcher = patch('app.arxiv_api.make_api_request')
+        self.mock_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.requested_chunks = []
+        def fake_request(query_url):
+            params = parse_qs(urlparse(query_url).query)
+            chunk = params['id_list'][0].split(',')
+            self.assertEqual(int(params['max_results'][0]), len(chunk))
+            self.requested_chunks.append(chunk)
+            # Unversioned IDs come back as their latest version, in arXiv's own order
+            entries = ''.join(self.ENTRY.format(id=arxiv_id if 'v' in arxiv_id else arxiv_id + 'v2')
+                              for arxiv_id in reversed(chunk) if arxiv_id not in self.UNKNOWN_IDS)
+            return ('<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+                    f'<opensearch:totalResults>{len(chunk)}</opensearch:totalResults>{entries}</feed>')
+        self.mock_request.side_effect = fake_request
+
+    def test_results_follow_input_order_with_missing_ids(self):
+        result = fetch_papers_by_ids(["2301.00003", "2301.99999", "2301.00001v1", "2301.00002"])
+        self.assertEqual([paper.id_str for paper in result['papers']], ["2301.00003v2", "2301.00001v1", "2301.00002v2"])
+        self.assertEqual(result['missing'], ["2301.99999"])
+
+    def test_duplicates_are_fetched_once(self):
+        result = fetch_papers_by_ids(["2301.00001", "arXiv:2301.00001", "https://arxiv.org/abs/2301.00001", "2301.00002"])
+        self.assertEqual(len(result['papers']), 2)
+        self.assertEqual(self.requested_chunks, [["2301.00001", "2301.00002"]])
+
+    def test_ids_are_split_into_even_chunks(self):
+        ids = [f"2301.{n:05d}" for n in range(9)]
+        result = fetch_papers_by_ids(ids)
+        self.assertEqual(len(result['papers']), 9)
+        self.assertEqual([len(chunk) for chunk in self.requested_chunks], [3, 3, 3])
+
+    def test_cached_papers_are_not_refetched(self):
+        fetch_papers_by_ids(["2301.00001", "2301.00002"])
+        result = fetch_papers_by_ids(["2301.00002", "2301.00003", "2301.00001"])
+        self.assertEqual([paper.id_str for paper in result['papers']], ["2301.00002v2", "2301.00003v2", "2301.00001v2"])
+        self.assertEqual(self.requested_chunks[1:], [["2301.00003"]])
+
+    def test_malformed_ids_are_reported_without_a_fetch(self):
+        result = fetch_papers_by_ids(["not an id", ""])
+        self.assertEqual(result, {'papers': [], 'missing': ["not an id", ""]})
+        self.mock_request.assert_not_called()
+
+    def test_normalize_arxiv_id(self):
+        self.assertEqual(normalize_arxiv_id(" arXiv:2301.01234v3 "), "2301.01234v3")
+        self.assertEqual(normalize_arxiv_id("http://arxiv.org/pdf/hep-th/9901001v1.pdf"), "hep-th/9901001v1")
+        self.assertEqual(normalize_arxiv_id("math.AG/0101001"), "math.AG/0101001")
+        self.assertIsNone(normalize_arxiv_id("2301.123"))
+
+
+class TestIterSearchResults(unittest.TestCase):
+    TOTAL_RESULTS = 230
+
+    def setUp(self):
+        patcher = patch('app.arxiv_api.make_api_request')
+        self.mock_request = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pages = [] # (start, max_results) per request
+        self.failures = {} # max_results -> exception raised for pages of that size
+        self.results = [f"2301.{n:05d}" for n in range(self.TOTAL_RESULTS)] # Newest first
+        def fake_request(query_url, stream=False):
+            self.assertTrue(stream)
+            params = parse_qs(urlparse(query_url).query)
+            start, size = int(params['start'][0]), int(params['max_results'][0])
+            if size in self.failures:
+                raise self.failures[size]
+            self.pages.append((start, size))
+            entries = ''.join(self.entry(n) for n in range(start, min(start + size, len(self.results))))
+            return io.BytesIO(('<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+                               f'<opensearch:totalResults>{len(self.results)}</opensearch:totalResults>{entries}</feed>').encode())
+        self.mock_request.side_effect = fake_request
+
+    def entry(self, n):
+        day = 28 - n // 10 # Ten papers a day, newest first
+        return (f"<entry><id>http://arxiv.org/abs/{self.results[n]}</id><title>Paper {n}</title><summary>S</summary>"
+                f"<published>2023-01-{day:02d}T00:00:00Z</published><updated>2023-01-{day:02d}T00:00:00Z</updated></entry>")
+
+    def test_walks_all_results_with_growing_pages(self):
+        ids = [paper.id_str for paper in iter_search_results("ti:test", page_size=20)]
+        self.assertEqual(ids, self.results)
+        self.assertEqual(self.pages, [(0, 20), (20, 40), (60, 80), (140, 90)])
+
+    def test_results_are_fetched_lazily(self):
+        results = iter(iter_search_results("ti:test", page_size=20))
+        next(results)
+        self.assertEqual(self.pages, [(0, 20)])
+
+    def test_limit_caps_results_and_page_size(self):
+        iterator = iter_search_results("ti:test", limit=30, page_size=20)
+        self.assertEqual(len(list(iterator)), 30)
+        self.assertEqual(self.pages, [(0, 20), (20, 10)])
+
+    def test_date_cutoff_stops_iteration(self):
+        papers = list(iter_search_results("ti:test", since=datetime(2023, 1, 26), page_size=20))
+        self.assertEqual(len(papers), 30) # Days 28, 27 and 26
+        self.assertEqual(self.pages, [(0, 20), (20, 40)])
+
+    def test_date_cutoff_requires_descending_date_sort(self):
+        with self.assertRaises(ValidationException):
+            iter_search_results("ti:test", sort_by="relevance", since=datetime(2023, 1, 26))
+
+    def test_resume_from_cursor(self):
+        iterator = iter_search_results("ti:test", page_size=20)
+        first = [paper.id_str for _, paper in zip(range(25), iterator)]
+        resumed = [paper.id_str for paper in iter_search_results("ti:test", cursor=iterator.cursor, page_size=20)]
+        self.assertEqual(first + resumed, self.results)
+
+    def test_results_shifted_by_new_submissions_are_not_repeated(self):
+        iterator = iter(iter_search_results("ti:test", page_size=20))
+        first_page = [next(iterator).id_str for _ in range(20)]
+        self.results.insert(0, "2301.99999") # Pushes the last paper of page one onto page two
+        rest = [paper.id_str for paper in iterator]
+        self.assertEqual(len(first_page + rest), len(set(first_page + rest)))
+        self.assertEqual(first_page + rest, self.results[1:])
+
+    def test_page_size_shrinks_after_timeout(self):
+        self.failures[40] = NetworkException("Request to arXiv API timed out.")
+        iterator = iter_search_results("ti:test", limit=60, page_size=20)
+        self.assertEqual(len(list(iterator)), 60)
+        self.assertEqual(self.pages, [(0, 20), (20, 20), (40, 20)])
+
+    def test_rate_limit_errors_are_raised(self):
+        self.failures[20] = NetworkException("arXiv API rate limit exceeded.", status_code=429)
+        with self.assertRaises(NetworkException):
+            list(iter_search_results("ti:test", page_size=20))
+
+
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,251 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app import create_app, cache
+from app.cache_backends import MemoryLRUCache, SQLiteCache, TieredCache, TinyLFUCache, CountMinSketch, PRUNE_EVERY_WRITES
+
+
+class TestMemoryLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        lru = MemoryLRUCache(max_entries=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a') # 'b' becomes the least recently used
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+
+    def test_expired_entries_are_misses(self):
+        lru = MemoryLRUCache()
+        lru.set('a', 1, timeout=1)
+        with patch('app.cache_backends.time.time', return_value=time.time() + 2):
+            self.assertIsNone(lru.get('a'))
+            self.assertTrue(lru.add('a', 2))
+
+    def test_add_does_not_overwrite(self):
+        lru = MemoryLRUCache()
+        self.assertTrue(lru.add('a', 1))
+        self.assertFalse(lru.add('a', 2))
+        self.assertEqual(lru.get('a'), 1)
+
+
+class TestCountMinSketch(unittest.TestCase):
+    def test_estimates_are_never_below_true_count(self):
+        sketch = CountMinSketch(width=64)
+        for i in range(50):
+            for _ in range(i % 5):
+                sketch.increment(f'key{i}')
+        for i in range(50):
+            self.assertGreaterEqual(sketch.estimate(f'key{i}'), i % 5)
+
+    def test_counters_saturate_and_age(self):
+        sketch = CountMinSketch(width=16, sample_size=40)
+        for _ in range(30):
+            sketch.increment('hot')
+        self.assertEqual(sketch.estimate('hot'), CountMinSketch.MAX_COUNT)
+        for i in range(10):
+            sketch.increment(f'other{i}') # Reaches sample_size and halves every counter
+        self.assertLessEqual(sketch.estimate('hot'), CountMinSketch.MAX_COUNT // 2 + 1)
+
+
+class TestTinyLFUCache(unittest.TestCase):
+    VALUE = 'x' * 450 # ~500 bytes per entry once pickled with its key
+
+    def make_cache(self, max_bytes=10000, window_ratio=0.1):
+        return TinyLFUCache(max_bytes=max_bytes, window_ratio=window_ratio)
+
+    def read_through(self, lfu, key):
+        """Mimics a caller: look up, and store on a miss."""
+        if lfu.get(key) is None:
+            lfu.set(key, self.VALUE)
+
+    def test_total_bytes_stay_within_budget(self):
+        lfu = self.make_cache()
+        for i in range(200):
+            self.read_through(lfu, f'key{i}')
+        stats = lfu.stats()
+        self.assertLessEqual(stats['bytes'], 10000)
+        self.assertGreater(stats['entries'], 10)
+
+    def test_scan_of_rare_keys_does_not_flush_hot_keys(self):
+        lfu = self.make_cache()
+        hot_keys = [f'hot{i}' for i in range(8)]
+        for _ in range(5):
+            for key in hot_keys:
+                self.read_through(lfu, key)
+        for i in range(500):
+            self.read_through(lfu, f'scan{i}')
+        self.assertTrue(all(lfu.has(key) for key in hot_keys))
+        self.assertGreater(lfu.stats()['admission_rejections'], 0)
+
+    def test_plain_lru_would_lose_hot_keys_in_same_scan(self):
+        # Same workload with an LRU of equal capacity, for contrast
+        lru = MemoryLRUCache(max_entries=18)
+        hot_keys = [f'hot{i}' for i in range(8)]
+        for _ in range(5):
+            for key in hot_keys:
+                lru.get(key) or lru.set(key, self.VALUE)
+        for i in range(500):
+            lru.get(f'scan{i}') or lru.set(f'scan{i}', self.VALUE)
+        self.assertFalse(any(lru.has(key) for key in hot_keys))
+
+    def test_entry_larger_than_budget_is_rejected(self):
+        lfu = self.make_cache(max_bytes=1000)
+        self.assertFalse(lfu.set('huge', 'x' * 5000))
+        self.assertIsNone(lfu.get('huge'))
+
+    def test_large_entry_bypasses_window(self):
+        lfu = self.make_cache(max_bytes=10000, window_ratio=0.01)
+        self.assertTrue(lfu.set('page', self.VALUE))
+        self.assertEqual(lfu.get('page'), self.VALUE)
+        self.assertEqual(lfu.stats()['window_bytes'], 0)
+
+    def test_second_hit_promotes_to_protected(self):
+        lfu = self.make_cache(max_bytes=10000, window_ratio=0.01)
+        lfu.set('page', self.VALUE)
+        lfu.get('page')
+        stats = lfu.stats()
+        self.assertEqual(stats['probation_bytes'], 0)
+        self.assertGreater(stats['protected_bytes'], 0)
+
+    def test_overwrite_replaces_size(self):
+        lfu = self.make_cache()
+        lfu.set('key', 'x' * 2000)
+        lfu.set('key', 'small')
+        self.assertLess(lfu.stats()['bytes'], 100)
+        self.assertEqual(lfu.get('key'), 'small')
+
+    def test_expiry_add_and_delete(self):
+        lfu = self.make_cache()
+        lfu.set('key', 1, timeout=1)
+        self.assertFalse(lfu.add('key', 2))
+        with patch('app.cache_backends.time.time', return_value=time.time() + 2):
+            self.assertIsNone(lfu.get('key'))
+            self.assertTrue(lfu.add('key', 3))
+        self.assertTrue(lfu.delete('key'))
+        self.assertFalse(lfu.has('key'))
+
+    def test_stats_report_hit_ratio(self):
+        lfu = self.make_cache()
+        lfu.set('key', 1)
+        lfu.get('key')
+        lfu.get('missing')
+        stats = lfu.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 1, 0.5))
+
+
+class SQLiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+class TestSQLiteCache(SQLiteTestCase):
+    def test_entries_are_shared_between_instances(self):
+        # Two instances on one file model two worker processes
+        worker_a = SQLiteCache(self.path)
+        worker_b = SQLiteCache(self.path)
+        worker_a.set('key', {'papers': [1, 2], 'total_results': 2})
+        self.assertEqual(worker_b.get('key'), {'papers': [1, 2], 'total_results': 2})
+        worker_b.delete('key')
+        self.assertIsNone(worker_a.get('key'))
+
+    def test_add_is_exclusive_across_instances(self):
+        worker_a = SQLiteCache(self.path)
+        worker_b = SQLiteCache(self.path)
+        self.assertTrue(worker_a.add('lock', 'a', timeout=30))
+        self.assertFalse(worker_b.add('lock', 'b', timeout=30))
+        self.assertEqual(worker_b.get('lock'), 'a')
+
+    def test_add_replaces_expired_entry(self):
+        l2 = SQLiteCache(self.path)
+        l2.set('lock', 'old', timeout=1)
+        with patch('app.cache_backends.time.time', return_value=time.time() + 2):
+            self.assertFalse(l2.has('lock'))
+            self.assertTrue(l2.add('lock', 'new', timeout=30))
+            self.assertEqual(l2.get('lock'), 'new')
+
+    def test_size_limit_evicts_oldest_entries(self):
+        l2 = SQLiteCache(self.path, max_entries=10)
+        for i in range(PRUNE_EVERY_WRITES):
+            l2.set(f'key{i}', i)
+        self.assertEqual(l2.stats()['entries'], 10)
+        self.assertIsNone(l2.get('key0'))
+        self.assertEqual(l2.get(f'key{PRUNE_EVERY_WRITES - 1}'), PRUNE_EVERY_WRITES - 1)
+
+    def test_unusable_path_degrades_to_misses(self):
+        l2 = SQLiteCache(os.path.join(self.tmp_dir, 'missing', 'cache.sqlite'))
+        self.assertFalse(l2.set('key', 1))
+        self.assertIsNone(l2.get('key'))
+
+
+class TestTieredCache(SQLiteTestCase):
+    def make_worker(self):
+        return TieredCache(MemoryLRUCache(max_entries=8), SQLiteCache(self.path), l1_max_timeout=60)
+
+    def test_l2_hit_is_promoted_to_l1(self):
+        worker_a = self.make_worker()
+        worker_b = self.make_worker()
+        worker_a.set('key', 'value')
+
+        self.assertEqual(worker_b.get('key'), 'value') # L1 miss, L2 hit
+        self.assertEqual(worker_b.get('key'), 'value') # L1 hit
+        stats = worker_b.stats()
+        self.assertEqual((stats['l1_hits'], stats['l1_misses'], stats['l2_hits'], stats['l2_misses']), (1, 1, 1, 0))
+        self.assertEqual(stats['promotions'], 1)
+        self.assertEqual(stats['l1']['entries'], 1)
+
+    def test_miss_in_both_tiers(self):
+        worker = self.make_worker()
+        self.assertIsNone(worker.get('missing'))
+        self.assertEqual(worker.stats()['l2_misses'], 1)
+
+    def test_l1_lifetime_is_capped(self):
+        worker_a = self.make_worker()
+        worker_b = self.make_worker()
+        worker_a.set('key', 'v1', timeout=3600)
+        worker_b.get('key')
+        worker_a.set('key', 'v2', timeout=3600)
+        self.assertEqual(worker_b.get('key'), 'v1') # Still served from worker B's L1
+        with patch('app.cache_backends.time.time', return_value=time.time() + 61):
+            self.assertEqual(worker_b.get('key'), 'v2')
+
+    def test_add_is_decided_by_shared_tier(self):
+        worker_a = self.make_worker()
+        worker_b = self.make_worker()
+        self.assertTrue(worker_a.add('lock', 'a'))
+        self.assertFalse(worker_b.add('lock', 'b'))
+        worker_a.delete('lock')
+        self.assertFalse(worker_b.has('lock'))
+        self.assertTrue(worker_b.add('lock', 'b'))
+
+    def test_tinylfu_l1_policy(self):
+        app = create_app(config_name='testing')
+        app.config.update(CACHE_TYPE='app.cache_backends.TieredCache', CACHE_L2_PATH=self.path,
+                          CACHE_L1_POLICY='tinylfu', CACHE_L1_MAX_BYTES=4096)
+        cache.init_app(app)
+        with app.app_context():
+            self.assertIsInstance(cache.cache.l1, TinyLFUCache)
+            self.assertEqual(cache.cache.l1.max_bytes, 4096)
+            cache.set('key', 'value')
+            self.assertEqual(cache.get('key'), 'value')
+
+    def test_configured_as_flask_caching_backend(self):
+        app = create_app(config_name='testing')
+        app.config.update(CACHE_TYPE='app.cache_backends.TieredCache', CACHE_L2_PATH=self.path, CACHE_L1_POLICY='lru', CACHE_L1_MAX_ENTRIES=4)
+        cache.init_app(app)
+        with app.app_context():
+            self.assertIsInstance(cache.cache, TieredCache)
+            cache.set('key', 'value')
+            self.assertEqual(SQLiteCache(self.path).get('key'), 'value')
+            self.assertEqual(cache.cache.l1.max_entries, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from app.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+class FakeClock:
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('test', window=10, min_calls=4, error_threshold=0.5,
+                                      latency_threshold=5.0, cooldown=30, clock=self.clock)
+
+    def test_stays_closed_while_calls_are_healthy(self):
+        for _ in range(20):
+            self.breaker.record(0.5)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_opens_on_error_rate(self):
+        for failed in (False, True, False, True):
+            self.breaker.record(0.5, failed=failed)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.breaker.stats()['rejected_calls'], 1)
+
+    def test_opens_on_median_latency(self):
+        for latency in (6.0, 7.0, 1.0, 8.0):
+            self.breaker.record(latency)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_needs_min_calls_before_opening(self):
+        for _ in range(3):
+            self.breaker.record(0.5, failed=True)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_probe_after_cooldown_closes_on_success(self):
+        for _ in range(4):
+            self.breaker.record(0.5, failed=True)
+        self.clock.now += 31
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow_request()) # Only one probe at a time
+        self.breaker.record(0.5)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertTrue(self.breaker.allow_request())
+
+    def test_failed_probe_reopens(self):
+        for _ in range(4):
+            self.breaker.record(0.5, failed=True)
+        self.clock.now += 31
+        self.breaker.allow_request()
+        self.breaker.record(9.0) # Too slow
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.breaker.stats()['times_opened'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import patch
+
+from app import fragment_cache
+from tests.search_fixtures import SearchTestCase, make_paper
+
+
+class TestFragmentCache(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        fragment_cache.reset()
+
+    def test_cached_page_matches_uncached_render(self):
+        self.app.config['FRAGMENT_CACHE_ENABLED'] = False
+        uncached = self.client.get('/search?query=paper').data
+        self.app.config['FRAGMENT_CACHE_ENABLED'] = True
+        self.assertEqual(self.client.get('/search?query=paper').data, uncached)
+        self.assertEqual(self.client.get('/search?query=paper').data, uncached)
+        self.assertIn(b'<mark>Paper</mark> 1', uncached)
+        self.assertIn(b'id="paper-2-title"', uncached)
+
+    def test_repeat_render_skips_filters(self):
+        self.client.get('/search?query=paper')
+        with patch('app.template_filters.bleach.clean') as clean:
+            self.client.get('/search?query=paper')
+        clean.assert_not_called()
+        self.assertEqual(fragment_cache.stats()['results_hits'], 1)
+
+    def test_cards_are_shared_across_pages_and_positions(self):
+        self.client.get('/search?query=paper')
+        self.search_page.return_value = {'papers': [make_paper(3), make_paper(1)], 'total_results': 25}
+        html = self.client.get('/search?query=paper&page=2').data
+        self.assertEqual(fragment_cache.stats()['card_hits'], 1)
+        self.assertIn(b'id="paper-2-title" class="mb-2"><a href="http://arxiv.org/pdf/2301.00001v1.pdf"', html)
+
+    def test_new_version_or_terms_render_again(self):
+        self.client.get('/search?query=paper')
+        self.search_page.return_value = {'papers': [make_paper(1, updated='2023-03-01T00:00:00Z', title="Revised paper")],
+                                         'total_results': 1}
+        self.assertIn(b'Revised', self.client.get('/search?query=paper').data)
+        html = self.client.get('/search?query=abstract').data
+        self.assertIn(b'<mark>Abstract</mark>', html)
+        self.assertNotIn(b'<mark>Paper</mark>', html)
+        self.assertEqual(fragment_cache.stats()['card_hits'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import re
+import unittest
+from unittest.mock import patch
+
+from app import http_cache
+from tests.search_fixtures import SearchTestCase, make_paper
+
+
+class HttpCacheTestCase(SearchTestCase):
+    def setUp(self):
+        super().setUp()
+        http_cache.reset()
+
+
+class TestSearchConditionalRequests(HttpCacheTestCase):
+    def test_search_carries_strong_etag_and_max_age(self):
+        response = self.client.get('/search?query=transformers')
+        etag, weak = response.get_etag()
+        self.assertTrue(etag)
+        self.assertFalse(weak)
+        self.assertTrue(response.cache_control.public)
+        self.assertEqual(response.cache_control.max_age, self.app.config['SEARCH_CACHE_SOFT_TTL'])
+
+    def test_matching_if_none_match_skips_rendering(self):
+        etag = self.client.get('/search?query=transformers').headers['ETag']
+        with patch('app.routes.render_template') as render:
+            response = self.client.get('/search?query=transformers', headers={'If-None-Match': etag})
+        render.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_etag_follows_page_and_result_identity(self):
+        first = self.client.get('/search?query=transformers').headers['ETag']
+        self.assertNotEqual(self.client.get('/search?query=transformers&page=2').headers['ETag'], first)
+        self.assertNotEqual(self.client.get('/api/search?query=transformers').headers['ETag'], first)
+        self.search_page.return_value = {'papers': [make_paper(1), make_paper(2, updated='2023-02-01T00:00:00Z')],
+                                         'total_results': 2}
+        response = self.client.get('/search?query=transformers', headers={'If-None-Match': first})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], first)
+
+    def test_stale_results_must_be_revalidated(self):
+        self.search_page.return_value = {'papers': [make_paper(1)], 'total_results': 1, 'stale': True}
+        response = self.client.get('/search?query=transformers')
+        self.assertEqual(response.cache_control.max_age, 0)
+        self.assertTrue(response.cache_control.no_cache)
+
+    def test_errors_are_not_cacheable(self):
+        self.search_page.side_effect = RuntimeError("bug")
+        response = self.client.get('/search?query=transformers')
+        self.assertIsNone(response.headers.get('ETag'))
+        self.assertFalse(response.cache_control.public)
+
+
+class TestStaticAssets(HttpCacheTestCase):
+    def test_static_urls_carry_content_hash(self):
+        html = self.client.get('/').get_data(as_text=True)
+        match = re.search(r'/static/js/main_v2\.js\?v=([0-9a-f]+)', html)
+        self.assertIsNotNone(match)
+        self.assertEqual(match.group(1), http_cache.static_digest('js/main_v2.js'))
+
+    def test_hashed_static_urls_are_immutable(self):
+        digest = http_cache.static_digest('css/style.css')
+        response = self.client.get(f'/static/css/style.css?v={digest}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.cache_control.max_age, http_cache.STATIC_MAX_AGE)
+        self.assertTrue(response.cache_control.immutable)
+        self.assertFalse(response.cache_control.no_cache)
+        response.close()
+
+    def test_outdated_hash_is_not_cached_long(self):
+        response = self.client.get('/static/css/style.css?v=000000000000')
+        self.assertFalse(response.cache_control.immutable)
+        self.assertNotEqual(response.cache_control.max_age, http_cache.STATIC_MAX_AGE)
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
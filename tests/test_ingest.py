@@ -0,0 +1,104 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from app import create_app
+from app import paper_store, local_search
+from app.ingest import ingest_snapshot, paper_from_snapshot_record
+from app.models import db
+
+
+def snapshot_record(arxiv_id, title, update_date='2023-01-10', versions=1, categories='cs.LG stat.ML'):
+    return {
+        'id': arxiv_id,
+        'submitter': 'Jane Doe',
+        'authors': 'Jane Doe and John Smith',
+        'title': f"{title}\n  revisited",
+        'comments': None,
+        'journal-ref': None,
+        'doi': '10.1000/xyz' if arxiv_id.endswith('1') else None,
+        'report-no': None,
+        'categories': categories,
+        'license': None,
+        'abstract': "  We study\nthings.\n",
+        'versions': [{'version': f'v{n}', 'created': 'Mon, 2 Jan 2023 18:00:00 GMT'} for n in range(1, versions + 1)],
+        'update_date': update_date,
+        'authors_parsed': [['Doe', 'Jane', ''], ['Smith', 'John', 'Jr']],
+    }
+
+
+RECORDS = [
+    snapshot_record('2301.00001', 'Sparse attention'),
+    snapshot_record('2301.00002', 'Graph kernels', versions=2),
+    snapshot_record('2301.00003', 'Bayesian optimization', categories='math.OC'),
+]
+
+
+class TestPaperFromSnapshotRecord(unittest.TestCase):
+    def test_maps_record_fields(self):
+        paper = paper_from_snapshot_record(RECORDS[1])
+        self.assertEqual(paper.id_str, '2301.00002v2')
+        self.assertEqual(paper.title, 'Graph kernels revisited')
+        self.assertEqual(paper.summary, 'We study things.')
+        self.assertEqual(paper.authors, ('Jane Doe', 'John Smith Jr'))
+        self.assertEqual(paper.categories, ('cs.LG', 'stat.ML'))
+        self.assertEqual(paper.primary_category, 'cs.LG')
+        self.assertEqual(paper.published_date.isoformat(), '2023-01-02T18:00:00+00:00')
+        self.assertEqual(paper.updated_date.isoformat(), '2023-01-10T00:00:00+00:00')
+        self.assertEqual(paper.pdf_link, 'http://arxiv.org/pdf/2301.00002v2.pdf')
+        self.assertIsNone(paper.doi)
+
+    def test_falls_back_to_author_string(self):
+        record = dict(RECORDS[0], authors_parsed=None)
+        self.assertEqual(paper_from_snapshot_record(record).authors, ('Jane Doe', 'John Smith'))
+
+
+class TestIngestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        db.drop_all()
+        db.create_all()
+        db.session.execute(db.text(f"DROP TABLE IF EXISTS {local_search.FTS_TABLE}"))
+        db.session.commit()
+        local_search.create_index()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_snapshot(self, records, name='snapshot.json', compress=False, extra_lines=()):
+        path = os.path.join(self.tmpdir.name, name)
+        content = ''.join(json.dumps(record) + '\n' for record in records) + ''.join(extra_lines)
+        with (gzip.open(path, 'wt') if compress else open(path, 'w')) as f:
+            f.write(content)
+        return path
+
+    def test_ingests_into_store_and_index(self):
+        path = self.write_snapshot(RECORDS, extra_lines=['not json\n', '\n'])
+        counts = ingest_snapshot(path, batch_size=2, workers=1, show_progress=False)
+        self.assertEqual(counts, {'lines': 4, 'papers': 3, 'invalid': 1, 'written': 3, 'unchanged': 0})
+        self.assertEqual(paper_store.get_paper('2301.00002').id_str, '2301.00002v2')
+        ids = [paper.id_str for paper in local_search.local_search('cat:math.OC')['papers']]
+        self.assertEqual(ids, ['2301.00003v1'])
+
+    def test_gzip_with_worker_processes(self):
+        path = self.write_snapshot(RECORDS, name='snapshot.json.gz', compress=True)
+        counts = ingest_snapshot(path, batch_size=1, workers=2, show_progress=False)
+        self.assertEqual(counts['written'], 3)
+        self.assertEqual(set(paper_store.get_papers(['2301.00001', '2301.00002', '2301.00003'])),
+                         {'2301.00001', '2301.00002', '2301.00003'})
+
+    def test_reingest_only_writes_updated_records(self):
+        ingest_snapshot(self.write_snapshot(RECORDS), workers=1, show_progress=False)
+        updated = [RECORDS[0], snapshot_record('2301.00002', 'Graph kernels', update_date='2023-06-01', versions=3),
+                   RECORDS[2]]
+        counts = ingest_snapshot(self.write_snapshot(updated, name='newer.json'), workers=1, show_progress=False)
+        self.assertEqual((counts['written'], counts['unchanged']), (1, 2))
+        self.assertEqual(paper_store.get_paper('2301.00002').id_str, '2301.00002v3')
+
+
+if __name__ == '__main__':
+    unittest.main()
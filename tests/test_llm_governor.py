@@ -0,0 +1,182 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+from app.llm_client import get_client, estimate_tokens, llm_governor
+from app.llm_governor import GovernorTimeout, LLMGovernor, INTERACTIVE, BATCH
+from app.rate_limiter import TokenBucketRateLimiter
+from tests.fake_openai import FakeOpenAIServer
+from tests.test_rate_limiter import FakeClock
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after=None):
+        super().__init__("429")
+        self.response = type('Response', (), {'headers': {'retry-after': retry_after} if retry_after is not None else {}})()
+
+
+class TestLLMGovernor(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        self.state_path = os.path.join(self.tmp_dir, 'governor.sqlite')
+        self.clock = FakeClock()
+
+    def make_governor(self, **kwargs):
+        kwargs.setdefault('max_in_flight', 4)
+        kwargs.setdefault('tokens_per_minute', 6000)
+        kwargs.setdefault('sleep', self.clock.sleep)
+        return LLMGovernor('test', state_path=self.state_path, rate_limit_errors=(RateLimited,), clock=self.clock, **kwargs)
+
+    def test_in_flight_requests_are_capped_across_governors(self):
+        first, second = self.make_governor(max_in_flight=2), self.make_governor(max_in_flight=2) # Two workers
+        leases = [first.acquire(10), second.acquire(10)]
+        with self.assertRaises(GovernorTimeout):
+            first.acquire(10, timeout=0.2)
+        second.release(leases[1], 'succeeded')
+        first.acquire(10, timeout=0.2)
+        self.assertEqual(first.stats()['in_flight'], 2)
+        self.assertEqual(first.stats()['process_timeouts'], 1)
+
+    def test_abandoned_leases_expire(self):
+        governor = self.make_governor(max_in_flight=1, lease_ttl=60)
+        governor.acquire(10)
+        self.clock.now += 61
+        governor.acquire(10, timeout=0)
+
+    def test_token_budget_delays_requests(self):
+        governor = self.make_governor(tokens_per_minute=600) # 10 tokens per second
+        governor.release(governor.acquire(600), 'succeeded')
+        self.clock.sleeps.clear()
+        governor.acquire(100)
+        self.assertAlmostEqual(sum(self.clock.sleeps), 10.0, places=3)
+        with self.assertRaises(GovernorTimeout):
+            governor.acquire(600, timeout=5) # Would need a minute
+        self.assertEqual(governor.stats()['token_wait_seconds'], 0.0) # The refused reservation was returned
+
+    def test_reported_usage_corrects_the_estimate(self):
+        governor = self.make_governor(tokens_per_minute=600)
+        with governor.request(500) as lease:
+            lease.used_tokens = 100
+        self.assertAlmostEqual(governor.stats()['tokens_available'], 500, places=3)
+
+    def test_aimd_limit(self):
+        governor = self.make_governor(max_in_flight=8)
+        for _ in range(2): # One burst of 429s halves the limit once
+            with self.assertRaises(RateLimited):
+                with governor.request(10):
+                    raise RateLimited(retry_after='0')
+        self.assertEqual(governor.stats()['concurrency_limit'], 4)
+        self.clock.now += 2
+        with self.assertRaises(RateLimited):
+            with governor.request(10):
+                raise RateLimited(retry_after='0')
+        self.assertEqual(governor.stats()['concurrency_limit'], 2)
+        for _ in range(4):
+            with governor.request(10):
+                pass
+        self.assertEqual(governor.stats()['concurrency_limit'], 3.55) # 2 + 1/2 + 1/2.5 + ...
+        stats = governor.stats()
+        self.assertEqual((stats['process_rate_limited'], stats['process_succeeded']), (3, 4))
+
+    def test_retry_after_holds_back_every_caller(self):
+        governor, other_worker = self.make_governor(), self.make_governor()
+        with self.assertRaises(RateLimited):
+            with governor.request(10):
+                raise RateLimited(retry_after='3')
+        self.clock.sleeps.clear()
+        other_worker.acquire(10) # The bucket held plenty of tokens before the 429
+        self.assertAlmostEqual(sum(self.clock.sleeps), 3.1, places=3) # The pause, then its own 10 tokens
+
+    def test_batch_leaves_reserved_slots_to_interactive(self):
+        governor = self.make_governor(max_in_flight=3, batch_reserved_slots=1)
+        governor.acquire(10, priority=BATCH)
+        governor.acquire(10, priority=BATCH)
+        with self.assertRaises(GovernorTimeout):
+            governor.acquire(10, timeout=1, priority=BATCH)
+        governor.acquire(10, timeout=0) # Interactive gets the reserved slot
+        self.assertEqual(governor.stats()['classes']['batch']['timeouts'], 1)
+
+    def test_batch_waits_while_interactive_requests_queue(self):
+        governor, other_worker = self.make_governor(), self.make_governor()
+        waiter_id = other_worker._register_waiter(INTERACTIVE, None)
+        self.assertEqual(governor.stats()['interactive_waiting'], 1)
+        with self.assertRaises(GovernorTimeout):
+            governor.acquire(10, timeout=1, priority=BATCH)
+        other_worker._unregister_waiter(waiter_id)
+        governor.acquire(10, timeout=0, priority=BATCH)
+
+    def test_batch_never_borrows_tokens(self):
+        governor = self.make_governor(tokens_per_minute=600) # 10 tokens per second
+        governor.acquire(550, priority=BATCH)
+        with self.assertRaises(GovernorTimeout):
+            governor.acquire(100, timeout=2, priority=BATCH) # 50 tokens left, 70 by the deadline
+        self.assertEqual(governor.stats()['token_wait_seconds'], 0.0) # Nothing borrowed ahead of interactive callers
+        self.clock.sleeps.clear()
+        governor.acquire(100) # Interactive borrows the missing 30 tokens and waits for them
+        self.assertAlmostEqual(sum(self.clock.sleeps), 3.0, delta=0.1)
+
+    def test_wait_histograms_per_class(self):
+        held = []
+        def sleep(seconds): # The interactive request finishes while batch polls
+            self.clock.sleep(seconds)
+            if held:
+                governor.release(held.pop(), 'succeeded')
+        governor = self.make_governor(max_in_flight=1, batch_reserved_slots=0, sleep=sleep)
+        governor.release(governor.acquire(10), 'succeeded')
+        held.append(governor.acquire(10))
+        governor.acquire(10, priority=BATCH)
+        classes = governor.stats()['classes']
+        self.assertEqual(classes['interactive']['admitted'], 2)
+        self.assertEqual(classes['interactive']['wait_histogram']['0.01'], 2)
+        self.assertEqual(classes['batch']['admitted'], 1)
+        self.assertEqual(classes['batch']['wait_histogram']['0.01'], 0)
+        self.assertEqual(classes['batch']['wait_histogram']['0.1'], 1)
+        self.assertEqual(classes['batch']['wait_histogram']['+Inf'], 1)
+
+    def test_unknown_priority(self):
+        with self.assertRaises(ValueError):
+            self.make_governor().acquire(10, priority='urgent')
+
+
+class TestTokenBucketCredit(unittest.TestCase):
+    def test_credit_returns_tokens(self):
+        clock = FakeClock()
+        bucket = TokenBucketRateLimiter('credit_test', rate=1, capacity=10, state_path=':memory:', clock=clock, sleep=clock.sleep)
+        bucket.reserve(10)
+        bucket.credit(4)
+        self.assertEqual(bucket.stats()['tokens_available'], 4)
+
+
+class TestSharedClient(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        llm_governor.reset()
+
+    def test_client_is_shared_and_rebuilt_for_new_settings(self):
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'key-1', 'OPENAI_BASE_URL': 'http://127.0.0.1:1/v1'}):
+            client = get_client()
+            self.assertIs(get_client(), client)
+            self.assertEqual(client.max_retries, 0)
+            with patch.dict(os.environ, {'OPENAI_API_KEY': 'key-2'}):
+                self.assertIsNot(get_client(), client)
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}):
+            self.assertIsNone(get_client())
+
+    def test_connections_are_reused(self):
+        messages = [{"role": "user", "content": "Title: Reuse"}]
+        with FakeOpenAIServer() as server, patch.dict(os.environ, {'OPENAI_API_KEY': 'k', 'OPENAI_BASE_URL': server.base_url}):
+            for _ in range(3):
+                get_client().chat.completions.create(model='test', messages=messages, max_tokens=5)
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(server.connections, 1)
+
+    def test_estimate_includes_max_tokens(self):
+        self.assertEqual(estimate_tokens([{"role": "user", "content": "x" * 400}], 300), 100 + 4 + 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+from unittest.mock import patch
+
+from app import create_app, cache
+from app import paper_store, local_search
+from app.arxiv_api import search_breaker
+from app.circuit_breaker import OPEN, CLOSED
+from app.exceptions import NetworkException, ValidationException
+from app.models import db
+from tests.search_fixtures import make_paper
+from tests.test_arxiv_api import SAMPLE_XML_VALID_SINGLE_ENTRY
+
+PAPERS = [
+    make_paper(1, title="Attention is all you need", summary="Sequence transduction with transformers.",
+               authors=["Ashish Vaswani"], categories=["cs.CL"]),
+    make_paper(2, title="Graph neural networks", summary="Message passing on graphs with attention.",
+               authors=["Petar Velickovic"], categories=["cs.LG"]),
+    make_paper(3, title="Vision transformers", summary="Images as sequences of patches.",
+               authors=["Alexey Dosovitskiy"], categories=["cs.CV"]),
+]
+
+
+class LocalSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        db.drop_all()
+        db.create_all()
+        db.session.execute(db.text(f"DROP TABLE IF EXISTS {local_search.FTS_TABLE}"))
+        db.session.commit()
+        self.assertTrue(local_search.create_index())
+        paper_store.store_papers(PAPERS)
+
+
+class TestLocalSearch(LocalSearchTestCase):
+    def ids(self, query, **kwargs):
+        return [paper.id_str for paper in local_search.local_search(query, **kwargs)['papers']]
+
+    def test_title_matches_rank_above_abstract_matches(self):
+        self.assertEqual(self.ids("attention"), ["2301.00001v1", "2301.00002v1"])
+
+    def test_stemmed_match(self):
+        self.assertEqual(self.ids("transformer"), ["2301.00003v1", "2301.00001v1"])
+
+    def test_field_prefixes_and_operators(self):
+        self.assertEqual(self.ids("au:vaswani"), ["2301.00001v1"])
+        self.assertEqual(self.ids("cat:cs.LG"), ["2301.00002v1"])
+        self.assertEqual(self.ids("transformers ANDNOT ti:vision"), ["2301.00001v1"])
+        self.assertEqual(self.ids('ti:"graph neural" OR au:dosovitskiy'), ["2301.00002v1", "2301.00003v1"])
+
+    def test_paging_and_total(self):
+        result = local_search.local_search("transformers", start_index=1, count=1)
+        self.assertEqual(result['total_results'], 2)
+        self.assertEqual(len(result['papers']), 1)
+
+    def test_only_newest_version_is_returned(self):
+        paper_store.store_papers([make_paper("2301.00001v2", title="Attention is all you need", summary="Revised.",
+                                             authors=["Ashish Vaswani"], categories=["cs.CL"],
+                                             updated='2023-03-01T00:00:00Z')])
+        self.assertEqual(self.ids("ti:attention"), ["2301.00001v2"])
+        self.assertEqual(self.ids("transduction"), []) # Only in the superseded version
+
+    def test_existing_papers_are_indexed_on_creation(self):
+        db.session.execute(db.text(f"DROP TABLE {local_search.FTS_TABLE}"))
+        db.session.commit()
+        local_search.create_index()
+        self.assertEqual(self.ids("au:vaswani"), ["2301.00001v1"])
+
+    def test_availability_is_checked_once(self):
+        self.assertTrue(local_search.is_available())
+        with patch('app.local_search._index_exists') as mock_exists:
+            self.assertTrue(local_search.is_available())
+        mock_exists.assert_not_called()
+
+    def test_punctuation_is_not_fts_syntax(self):
+        self.assertEqual(local_search.to_fts_query('c++ "neural-net" AND ('), '"c" AND "neural net"')
+        with self.assertRaises(ValidationException):
+            local_search.local_search("()")
+
+
+class TestSearchRouteFallback(LocalSearchTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        search_breaker.reset()
+        self.addCleanup(search_breaker.reset)
+        self.client = self.app.test_client()
+
+    def test_network_error_falls_back_to_local_index(self):
+        with patch('app.routes.search_page', side_effect=NetworkException("arXiv down")):
+            response = self.client.get('/search?query=au:vaswani')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Attention is all you need', response.data)
+        self.assertIn(b'local-results-notice', response.data)
+
+    def open_circuit(self):
+        for _ in range(search_breaker.min_calls):
+            search_breaker.record(0.1, failed=True)
+        self.assertEqual(search_breaker.state, OPEN)
+
+    def test_open_circuit_skips_arxiv(self):
+        self.open_circuit()
+        with patch('app.arxiv_api.make_api_request') as mock_request:
+            response = self.client.get('/search?query=transformers')
+        mock_request.assert_not_called()
+        self.assertIn(b'Alexey Dosovitskiy', response.data) # Titles get the query highlighted
+
+    def test_open_circuit_still_serves_cached_results(self):
+        with patch('app.arxiv_api.make_api_request', return_value=SAMPLE_XML_VALID_SINGLE_ENTRY):
+            self.client.get('/search?query=transformers')
+        self.open_circuit()
+        with patch('app.arxiv_api.make_api_request') as mock_request:
+            response = self.client.get('/search?query=transformers')
+        mock_request.assert_not_called()
+        self.assertIn(b'Test Paper Title', response.data)
+        self.assertNotIn(b'local-results-notice', response.data)
+
+    def test_cached_results_do_not_use_up_the_probe(self):
+        with patch('app.arxiv_api.make_api_request', return_value=SAMPLE_XML_VALID_SINGLE_ENTRY):
+            self.client.get('/search?query=transformers')
+        self.open_circuit()
+        search_breaker.configure(cooldown=0) # Next upstream call is the probe
+        with patch('app.arxiv_api.make_api_request', return_value=SAMPLE_XML_VALID_SINGLE_ENTRY) as mock_request:
+            self.client.get('/search?query=transformers')
+            self.assertEqual(search_breaker.state, OPEN)
+            response = self.client.get('/search?query=graphs')
+        mock_request.assert_called_once()
+        self.assertEqual(search_breaker.state, CLOSED)
+        self.assertNotIn(b'local-results-notice', response.data)
+
+    def test_fallback_can_be_disabled(self):
+        self.app.config['SEARCH_LOCAL_FALLBACK'] = False
+        with patch('app.routes.search_page', side_effect=NetworkException("arXiv down")):
+            response = self.client.get('/search?query=transformers')
+        self.assertNotIn(b'local-results-notice', response.data)
+
+    def test_local_source_can_be_requested(self):
+        with patch('app.routes.search_page') as mock_search_page:
+            response = self.client.get('/search?query=graph&source=local')
+        mock_search_page.assert_not_called()
+        self.assertIn(b'Petar Velickovic', response.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from app import create_app
+from app import paper_index, paper_store
+from app.models import db
+from app.scheduler import select_newsletter_papers, newsletter_index
+from tests.search_fixtures import make_paper
+
+
+PAPERS = [
+    make_paper(1, published='2023-01-01T00:00:00Z', categories=["cs.AI", "cs.LG"]),
+    make_paper(2, published='2023-01-05T00:00:00Z', categories=["cs.CL"]),
+    make_paper(3, published='2023-01-10T00:00:00Z', categories=["cs.LG", "stat.ML"]),
+    make_paper(4, published='2023-01-15T00:00:00Z', categories=["math.OC"]),
+]
+
+
+class PaperIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        db.drop_all()
+        db.create_all()
+        paper_index.reset()
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, 'index')
+        paper_store.store_papers(PAPERS)
+        self.assertEqual(paper_index.build_index(self.path), 4)
+        self.index = paper_index.load_index(self.path)
+
+
+class TestPaperIndex(PaperIndexTestCase):
+    def ids(self, rows):
+        return self.index.ids(rows)
+
+    def test_category_and_date_filters(self):
+        since = datetime(2023, 1, 5, tzinfo=timezone.utc)
+        self.assertEqual(self.ids(self.index.filter(categories={"cs.AI", "cs.LG"})), ["2301.00003v1", "2301.00001v1"])
+        self.assertEqual(self.ids(self.index.filter(categories=["cs.LG"], published_since=since)), ["2301.00003v1"])
+        self.assertEqual(self.ids(self.index.filter(published_since=since, published_until=datetime(2023, 1, 10))),
+                         ["2301.00003v1", "2301.00002v1"])
+        self.assertEqual(self.ids(self.index.filter(categories=["cs.LG"], primary_only=True)), ["2301.00003v1"])
+        self.assertEqual(len(self.index.filter(categories=["hep-th"])), 0)
+        self.assertEqual(len(self.index.filter(published_since=datetime(2024, 1, 1))), 0)
+
+    def test_only_newest_version_is_indexed(self):
+        paper_store.store_papers([make_paper("2301.00002v2", published='2023-01-05T00:00:00Z', categories=["cs.CL", "cs.AI"],
+                                             updated='2023-02-01T00:00:00Z', title="Revised")])
+        paper_index.build_index(self.path)
+        index = paper_index.load_index(self.path)
+        self.assertEqual(len(index), 4)
+        self.assertEqual(index.ids(index.filter(categories=["cs.AI"])), ["2301.00002v2", "2301.00001v1"])
+        self.assertEqual(index.ids(index.filter(updated_since=datetime(2023, 1, 20))), ["2301.00002v2"])
+        self.assertEqual(index.title(index.filter(updated_since=datetime(2023, 1, 20))[0]), "Revised")
+
+    def test_category_counts(self):
+        self.assertEqual(self.index.category_counts(),
+                         {"cs.AI": 1, "cs.LG": 2, "cs.CL": 1, "stat.ML": 1, "math.OC": 1})
+        rows = self.index.filter(published_since=datetime(2023, 1, 5))
+        self.assertEqual(self.index.category_counts(rows), {"cs.LG": 1, "cs.CL": 1, "stat.ML": 1, "math.OC": 1})
+
+    def test_many_categories_span_several_words(self):
+        categories = [f"cat.{n}" for n in range(150)]
+        paper_store.store_papers([make_paper("2302.00001v1", published='2023-02-01T00:00:00Z', categories=categories)])
+        paper_index.build_index(self.path)
+        index = paper_index.load_index(self.path)
+        self.assertEqual(index.category_bits.shape[1], 3)
+        self.assertEqual(index.ids(index.filter(categories=["cat.149"])), ["2302.00001v1"])
+        self.assertEqual(index.category_counts()["cat.140"], 1)
+
+    def test_strings_and_papers(self):
+        row = self.index.filter(categories=["math.OC"])[0]
+        self.assertEqual(self.index.summary(row), "Abstract of 2301.00004v1 – αβ.")
+        self.assertEqual(self.index.papers(self.index.filter(categories=["cs.CL"])), [PAPERS[1]])
+
+    def test_get_index_reloads_after_rebuild(self):
+        self.assertIsNone(paper_index.get_index()) # PAPER_INDEX_PATH is unset in testing
+        first = paper_index.get_index(self.path)
+        self.assertIs(paper_index.get_index(self.path), first)
+        paper_store.store_papers([make_paper("2302.00001v1", published='2023-02-01T00:00:00Z', categories=["cs.AI"])])
+        paper_index.build_index(self.path)
+        self.assertEqual(len(paper_index.get_index(self.path)), 5)
+        self.assertEqual(len(first), 4) # Old mapping stays valid
+        self.assertEqual(first.id(3), "2301.00004v1")
+
+    def test_rebuild_switches_builds_atomically(self):
+        first = paper_index.current_build(self.path)
+        paper_index.build_index(self.path)
+        second = paper_index.current_build(self.path)
+        paper_index.build_index(self.path)
+        third = paper_index.current_build(self.path)
+        self.assertEqual(len({first, second, third}), 3)
+        self.assertEqual(sorted(name for name in os.listdir(self.path) if name.startswith('build-')), sorted([second, third]))
+        self.assertEqual('build-' + paper_index.load_index(self.path).build_id, third) # meta.json belongs to the build CURRENT names
+
+    def test_empty_store(self):
+        db.drop_all()
+        db.create_all()
+        paper_index.build_index(self.path)
+        index = paper_index.load_index(self.path)
+        self.assertEqual(len(index), 0)
+        self.assertEqual(len(index.filter(categories=["cs.AI"])), 0)
+        self.assertEqual(index.category_counts(), {})
+
+
+class TestNewsletterSelection(PaperIndexTestCase):
+    def setUp(self):
+        super().setUp()
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.recent = [
+            make_paper(f"2406.0000{n}v1", published=(now - timedelta(days=days)).isoformat(), categories=categories)
+            for n, (days, categories) in enumerate([(1, ["cs.LG"]), (3, ["cs.CL"]), (6, ["cs.AI", "stat.ML"]),
+                                                    (9, ["cs.LG"]), (2, ["math.OC", "cs.AI"])])
+        ]
+        paper_store.store_papers(self.recent)
+        paper_index.build_index(self.path)
+        self.since = now - timedelta(days=7)
+
+    def arxiv_results(self, query, **kwargs):
+        """What arXiv returns for a category query: the matching papers, newest first."""
+        categories = set(query.replace('cat:', '').split(' OR '))
+        matching = [paper for paper in PAPERS + self.recent if categories & set(paper.categories)]
+        return {'papers': sorted(matching, key=lambda paper: paper.published_date, reverse=True)}
+
+    def test_index_and_arxiv_paths_select_the_same_papers(self):
+        index = paper_index.load_index(self.path)
+        for query in ("cat:cs.AI", "cat:cs.LG OR cat:cs.CL", "cat:hep-th"):
+            with patch('app.scheduler.search_papers', side_effect=self.arxiv_results) as mock_search:
+                from_index = select_newsletter_papers(query, self.since, index=index)
+                mock_search.assert_not_called()
+                from_arxiv = select_newsletter_papers(query, self.since)
+            self.assertEqual(from_index, from_arxiv)
+        self.assertEqual([paper['id'] for paper in from_index], [])
+        self.assertEqual([paper['id'] for paper in select_newsletter_papers("cat:cs.AI", self.since, index=index)],
+                         ["2406.00004v1", "2406.00002v1"])
+
+    def test_keyword_queries_search_arxiv(self):
+        with patch('app.scheduler.search_papers', return_value={'papers': self.recent}) as mock_search:
+            papers = select_newsletter_papers("ti:transformers", self.since, index=paper_index.load_index(self.path))
+        mock_search.assert_called_once()
+        self.assertEqual(len(papers), 4) # The paper from 9 days ago is left out
+
+    def test_stale_index_is_not_used(self):
+        self.app.config['PAPER_INDEX_PATH'] = self.path
+        self.assertIsNotNone(newsletter_index())
+        self.app.config['PAPER_INDEX_MAX_AGE'] = 0
+        self.assertIsNone(newsletter_index())
+
+
+if __name__ == '__main__':
+    unittest.main()
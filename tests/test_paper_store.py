@@ -0,0 +1,74 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from sqlalchemy.exc import OperationalError
+
+from app import create_app
+from app import paper_store
+from app.arxiv_api import parse_arxiv_xml
+from app.models import db, StoredPaper
+from tests.search_fixtures import make_paper
+
+
+class TestPaperStore(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        db.drop_all()
+        db.create_all()
+        paper_store.reset()
+
+    def test_round_trip(self):
+        paper = make_paper("2301.00001v1")
+        paper_store.store_papers([paper])
+        self.assertEqual(paper_store.get_paper("2301.00001v1"), paper)
+
+    def test_same_version_is_stored_once(self):
+        paper_store.store_papers([make_paper("2301.00001v1"), make_paper("2301.00001v1")])
+        paper_store.store_papers([make_paper("2301.00001v1", title="Changed")])
+        self.assertEqual(db.session.query(StoredPaper).count(), 1)
+        self.assertEqual(paper_store.get_paper("2301.00001v1").title, "Paper 2301.00001v1")
+
+    def test_new_version_is_added_and_preferred_for_unversioned_ids(self):
+        paper_store.store_papers([make_paper("2301.00001v1")])
+        paper_store.store_papers([make_paper("2301.00001v2", updated='2023-02-01T00:00:00Z')])
+        self.assertEqual(db.session.query(StoredPaper).count(), 2)
+        self.assertEqual(paper_store.get_paper("2301.00001").id_str, "2301.00001v2")
+        self.assertEqual(paper_store.get_paper("2301.00001v1").id_str, "2301.00001v1")
+        self.assertEqual(paper_store.get_paper("2301.00001v2").updated_date, datetime(2023, 2, 1, tzinfo=timezone.utc))
+
+    def test_batched_lookup(self):
+        paper_store.store_papers([make_paper(f"2301.{n:05d}v1") for n in range(1000)])
+        requested = [f"2301.{n:05d}" for n in range(0, 1200, 2)]
+        with patch.object(paper_store, 'READ_BATCH_SIZE', 250):
+            found = paper_store.get_papers(requested)
+        self.assertEqual(len(found), 500)
+        self.assertEqual(found["2301.00998"].id_str, "2301.00998v1")
+        stats = paper_store.stats()
+        self.assertEqual((stats['lookups'], stats['lookup_hits'], stats['stored_papers']), (600, 500, 1000))
+
+    def test_parsed_papers_are_recorded(self):
+        xml = ('<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+               '<opensearch:totalResults>1</opensearch:totalResults><entry>'
+               '<id>http://arxiv.org/abs/2301.00005v3</id><title>Stored</title><summary>S</summary>'
+               '<published>2023-01-01T00:00:00Z</published><updated>2023-01-05T00:00:00Z</updated>'
+               '</entry></feed>')
+        parse_arxiv_xml(xml)
+        self.assertEqual(paper_store.get_paper("2301.00005").title, "Stored")
+
+    def test_recording_can_be_disabled(self):
+        self.app.config['PAPER_STORE_ENABLED'] = False
+        paper_store.record_papers([make_paper("2301.00001v1")])
+        self.assertIsNone(paper_store.get_paper("2301.00001v1"))
+
+    def test_write_errors_are_logged_not_raised(self):
+        with patch.object(paper_store, 'store_papers', side_effect=OperationalError("INSERT", {}, Exception("locked"))):
+            paper_store.record_papers([make_paper("2301.00001v1")])
+        self.assertEqual(paper_store.stats()['write_errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from app.rate_limiter import TokenBucketRateLimiter
+
+
+class FakeClock:
+    """Manually advanced clock; sleeping advances it too."""
+    def __init__(self, start=1000.0):
+        self.now = start
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucketRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.state_path = os.path.join(self.tmp_dir, 'bucket.sqlite')
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def make_limiter(self, rate=1 / 3.0, capacity=1, name='arxiv_test'):
+        return TokenBucketRateLimiter(name, rate=rate, capacity=capacity, state_path=self.state_path,
+                                      clock=self.clock, sleep=self.clock.sleep)
+
+    def test_first_request_is_not_delayed(self):
+        limiter = self.make_limiter()
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_request_after_idle_period_is_not_delayed(self):
+        limiter = self.make_limiter()
+        limiter.acquire()
+        self.clock.now += 3600
+        self.assertEqual(limiter.acquire(), 0.0)
+
+    def test_back_to_back_requests_wait_for_refill(self):
+        limiter = self.make_limiter()
+        limiter.acquire()
+        self.clock.now += 1.0
+        waited = limiter.acquire()
+        self.assertAlmostEqual(waited, 2.0)
+
+    def test_budget_is_shared_between_limiter_instances(self):
+        # Two instances on the same state file model two worker processes
+        worker_a = self.make_limiter()
+        worker_b = self.make_limiter()
+        self.assertEqual(worker_a.reserve(), 0.0)
+        self.assertAlmostEqual(worker_b.reserve(), 3.0)
+        self.assertAlmostEqual(worker_a.reserve(), 6.0)
+
+    def test_buckets_with_different_names_are_independent(self):
+        arxiv = self.make_limiter(name='arxiv')
+        other = self.make_limiter(name='other')
+        arxiv.reserve()
+        self.assertEqual(other.reserve(), 0.0)
+
+    def test_stats_report_queue_depth_and_wait(self):
+        limiter = self.make_limiter()
+        limiter.reserve()
+        limiter.reserve()
+        limiter.reserve()
+        stats = limiter.stats()
+        self.assertEqual(stats['queue_depth'], 2)
+        self.assertAlmostEqual(stats['estimated_wait_seconds'], 6.0)
+        self.assertEqual(stats['tokens_available'], 0.0)
+
+    def test_stats_track_process_wait_times(self):
+        limiter = self.make_limiter()
+        limiter.acquire()
+        limiter.acquire()
+        stats = limiter.stats()
+        self.assertEqual(stats['process_acquired'], 2)
+        self.assertEqual(stats['process_delayed'], 1)
+        self.assertAlmostEqual(stats['process_max_wait_seconds'], 3.0)
+        self.assertEqual(stats['queue_depth'], 0)
+
+    @patch('app.rate_limiter.asyncio.sleep', new_callable=AsyncMock)
+    def test_async_acquire_shares_budget_with_blocking_callers(self, mock_sleep):
+        limiter = self.make_limiter()
+        limiter.acquire()
+        waited = asyncio.run(limiter.acquire_async())
+        self.assertAlmostEqual(waited, 3.0)
+        mock_sleep.assert_awaited_once()
+        self.assertAlmostEqual(mock_sleep.await_args.args[0], 3.0)
+        self.assertEqual(limiter.stats()['process_delayed'], 1)
+
+    def test_penalize_delays_next_caller(self):
+        limiter = self.make_limiter()
+        limiter.penalize(10.0)
+        self.assertAlmostEqual(limiter.reserve(), 10.0)
+
+    def test_burst_capacity(self):
+        limiter = self.make_limiter(capacity=3)
+        self.assertEqual([limiter.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(limiter.reserve(), 3.0)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            TokenBucketRateLimiter('bad', rate=0)
+        with self.assertRaises(ValueError):
+            TokenBucketRateLimiter('bad', rate=1, capacity=0)
+
+    def test_unwritable_state_path_falls_back_to_process_local_bucket(self):
+        limiter = TokenBucketRateLimiter('fallback', rate=1, state_path=os.path.join(self.tmp_dir, 'missing', 'x.sqlite'),
+                                         clock=self.clock, sleep=self.clock.sleep)
+        self.assertEqual(limiter.acquire(), 0.0)
+        self.assertAlmostEqual(limiter.reserve(), 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from app.exceptions import ArxivAPIException, NetworkException, ValidationException
+from tests.search_fixtures import SearchTestCase, make_paper
+
+
+class TestSearchApi(SearchTestCase):
+    def test_returns_page_as_json(self):
+        response = self.client.get('/api/search?query=transformers&page=2')
+        self.assertEqual(response.status_code, 200)
+        self.search_page.assert_called_once_with(query='transformers', start_index=10, count=10, use_circuit_breaker=False)
+        data = response.get_json()
+        self.assertEqual((data['page'], data['total_results'], data['total_pages']), (2, 25, 3))
+        self.assertEqual((data['stale'], data['local']), (False, False))
+        self.assertEqual(data['papers'][0], make_paper(1).to_dict())
+        self.assertNotIn('<html', data['html'])
+        self.assertIn('Paper 1', data['html'])
+        self.assertIn('page=3', data['html'])
+
+    def test_html_is_the_search_results_block(self):
+        html = self.client.get('/api/search?query=transformers').get_json()['html']
+        self.assertIn(html, self.client.get('/search?query=transformers').get_data(as_text=True))
+
+    def test_highlighted_preview_is_truncated_before_highlighting(self):
+        paper = make_paper(1, summary="x" * 130 + " transformers are everywhere. " * 5)
+        self.search_page.return_value = {'papers': [paper], 'total_results': 1}
+        html = self.client.get('/api/search?query=transformers').get_json()['html']
+        self.assertEqual(html.count('<mark>'), html.count('</mark>'))
+
+    def test_stale_results_are_flagged(self):
+        self.search_page.return_value = {'papers': [make_paper(1)], 'total_results': 1, 'stale': True}
+        self.assertTrue(self.client.get('/api/search?query=x').get_json()['stale'])
+
+    def test_etag_revalidation(self):
+        first = self.client.get('/api/search?query=transformers')
+        self.assertTrue(first.headers.get('ETag'))
+        revalidated = self.client.get('/api/search?query=transformers', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated.data, b'')
+        self.search_page.return_value = {'papers': [make_paper(3)], 'total_results': 1}
+        changed = self.client.get('/api/search?query=transformers', headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(changed.status_code, 200)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/search?query=%20').status_code, 400)
+        for error, status in ((ValidationException("Bad query"), 400), (NetworkException("down"), 503),
+                              (ArxivAPIException("boom"), 502), (RuntimeError("bug"), 500)):
+            self.search_page.side_effect = error
+            response = self.client.get('/api/search?query=x')
+            self.assertEqual(response.status_code, status)
+            data = response.get_json()
+            self.assertIn(data['error'], data['html'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import threading
+import time
+import unittest
+
+from app import create_app, cache
+from app.singleflight import SingleFlight
+
+
+class TestSingleFlightInProcess(unittest.TestCase):
+    def setUp(self):
+        self.flight = SingleFlight('test', shared=False)
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow_call(self, value):
+        self.calls += 1
+        self.release.wait(5)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def run_concurrently(self, key, value, callers=5):
+        results = [None] * callers
+
+        def worker(i):
+            try:
+                results[i] = self.flight.do(key, self.slow_call, value)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(callers)]
+        for thread in threads:
+            thread.start()
+        # Let every follower attach to the leader's call before it completes
+        deadline = time.monotonic() + 5
+        while self.flight.stats()['coalesced_local'] < callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_callers_share_one_call(self):
+        results = self.run_concurrently('key', {'papers': []})
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        stats = self.flight.stats()
+        self.assertEqual(stats['requests'], 5)
+        self.assertEqual(stats['executions'], 1)
+        self.assertEqual(stats['coalesced_local'], 4)
+        self.assertEqual(stats['in_flight'], 0)
+
+    def test_exception_is_shared_with_followers(self):
+        error = ValueError("upstream failed")
+        results = self.run_concurrently('key', error)
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(result is error for result in results))
+
+    def test_different_keys_are_not_coalesced(self):
+        self.release.set()
+        self.assertEqual(self.flight.do('a', self.slow_call, 1), 1)
+        self.assertEqual(self.flight.do('b', self.slow_call, 2), 2)
+        self.assertEqual(self.calls, 2)
+
+    def test_sequential_calls_are_not_coalesced(self):
+        self.release.set()
+        self.flight.do('key', self.slow_call, 1)
+        self.flight.do('key', self.slow_call, 1)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.flight.stats()['coalesced_total'], 0)
+
+    def test_follower_gives_up_after_wait_timeout(self):
+        self.flight.configure(wait_timeout=0.1)
+        leader = threading.Thread(target=self.flight.do, args=('key', self.slow_call, 'leader'))
+        leader.start()
+        deadline = time.monotonic() + 5
+        while self.flight.stats()['in_flight'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.flight.do('key', lambda: 'follower'), 'follower')
+        self.assertEqual(self.flight.stats()['wait_timeouts'], 1)
+        self.release.set()
+        leader.join(5)
+
+
+class TestSingleFlightAcrossWorkers(unittest.TestCase):
+    """Another worker is simulated by holding the shared lock and publishing the result directly."""
+
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        cache.clear()
+        self.flight = SingleFlight('test', wait_timeout=2, poll_interval=0.01)
+        self.lock_key, self.result_key = self.flight._shared_keys('key')
+        self.calls = 0
+
+    def call(self):
+        self.calls += 1
+        return 'own result'
+
+    def later(self, action, delay=0.05):
+        timer = threading.Timer(delay, action)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def test_follower_uses_result_published_by_other_worker(self):
+        cache.add(self.lock_key, 'other-worker', timeout=10)
+        self.later(lambda: cache.set(self.result_key, 'shared result'))
+        self.assertEqual(self.flight.do('key', self.call), 'shared result')
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(self.flight.stats()['coalesced_remote'], 1)
+
+    def test_follower_takes_over_when_other_worker_fails(self):
+        cache.add(self.lock_key, 'other-worker', timeout=10)
+        self.later(lambda: cache.delete(self.lock_key))
+        self.assertEqual(self.flight.do('key', self.call), 'own result')
+        self.assertEqual(self.calls, 1)
+
+    def test_follower_gives_up_after_wait_timeout(self):
+        self.flight.configure(wait_timeout=0.1)
+        cache.add(self.lock_key, 'other-worker', timeout=10)
+        self.assertEqual(self.flight.do('key', self.call), 'own result')
+        self.assertEqual(self.flight.stats()['wait_timeouts'], 1)
+
+    def test_leader_publishes_result_and_releases_lock(self):
+        self.assertEqual(self.flight.do('key', self.call), 'own result')
+        self.assertEqual(cache.get(self.result_key), 'own result')
+        self.assertFalse(cache.has(self.lock_key))
+
+    def test_leader_releases_lock_on_failure(self):
+        def failing_call():
+            raise RuntimeError("boom")
+        with self.assertRaises(RuntimeError):
+            self.flight.do('key', failing_call)
+        self.assertFalse(cache.has(self.lock_key))
+        self.assertIsNone(cache.get(self.result_key))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.state_db import StateDB, open_state_db
+
+SCHEMA = ("CREATE TABLE IF NOT EXISTS items (name TEXT PRIMARY KEY)",)
+
+
+class TestStateDB(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        self.path = os.path.join(self.tmp_dir, 'state.sqlite')
+
+    def test_opens_in_wal_mode_with_schema(self):
+        conn = open_state_db(self.path, SCHEMA, 'test state')
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        conn.execute("INSERT INTO items VALUES ('a')")
+        conn.close()
+
+    def test_unopenable_file_falls_back_to_memory(self):
+        path = os.path.join(self.tmp_dir, 'missing', 'state.sqlite')
+        with self.assertLogs('app.state_db', level='WARNING') as logs:
+            conn = open_state_db(path, SCHEMA, 'test state')
+        self.assertIn("per-process test state", logs.output[0])
+        conn.execute("INSERT INTO items VALUES ('a')")
+        self.assertFalse(os.path.exists(path))
+
+    def test_connection_is_reused_until_fork_or_path_change(self):
+        db = StateDB(SCHEMA, 'test state')
+        self.addCleanup(db.close)
+        conn = db.connection(self.path)
+        self.assertIs(db.connection(self.path), conn)
+        other = db.connection(os.path.join(self.tmp_dir, 'other.sqlite'))
+        self.assertIsNot(other, conn)
+        with patch('app.state_db.os.getpid', return_value=os.getpid() + 1):
+            self.assertIsNot(db.connection(os.path.join(self.tmp_dir, 'other.sqlite')), other)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import json
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from app import create_app, summary_store
+from app.llm_client import llm_governor
+from app.summarizer import TIMED_OUT_TEXT
+from tests.fake_openai import FakeOpenAIServer
+
+
+def papers(count):
+    return [{'id': f"2301.0000{n}", 'title': f"Paper {n}", 'abstract_text': f"Abstract {n}."} for n in range(count)]
+
+
+class SummarizerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        llm_governor.reset()
+        self.client = self.app.test_client()
+
+
+class TestSummarizePapersEndpoint(SummarizerTestCase):
+    def summarize(self, server, input_papers):
+        env = {'OPENAI_API_KEY': 'test-key', 'OPENAI_BASE_URL': server.base_url}
+        with patch.dict(os.environ, env):
+            started = time.monotonic()
+            response = self.client.post('/api/summarize_papers', json={'papers': input_papers})
+            elapsed = time.monotonic() - started
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['papers_with_takeaways'], elapsed
+
+    def test_papers_are_summarized_concurrently_in_input_order(self):
+        with FakeOpenAIServer(latency=0.3) as server:
+            results, elapsed = self.summarize(server, papers(5))
+        self.assertEqual([r['takeaways_text'] for r in results], [f"1. Takeaway for Paper {n}" for n in range(5)])
+        self.assertEqual(server.max_in_flight, 5)
+        self.assertLess(elapsed, 1.0) # Sequential calls would take 1.5s
+
+    def test_concurrency_cap(self):
+        self.app.config['SUMMARY_MAX_CONCURRENCY'] = 2
+        with FakeOpenAIServer(latency=0.1) as server:
+            results, _ = self.summarize(server, papers(5))
+        self.assertEqual(server.max_in_flight, 2)
+        self.assertEqual(len(server.requests), 5)
+
+    def test_invalid_and_empty_entries_keep_their_position(self):
+        input_papers = papers(2)
+        input_papers.insert(1, {'id': 'bad'})
+        input_papers.append({'id': 'empty', 'title': 'Empty', 'abstract_text': ' '})
+        with FakeOpenAIServer() as server:
+            results, _ = self.summarize(server, input_papers)
+        self.assertEqual([r['id'] for r in results], ['2301.00000', 'bad', '2301.00001', 'empty'])
+        self.assertEqual(results[1]['takeaways_text'], "Error: Invalid paper data provided.")
+        self.assertEqual(results[3]['takeaways_text'], "Abstract was empty, no takeaways generated.")
+        self.assertEqual(len(server.requests), 2)
+
+    def test_rate_limited_requests_are_retried(self):
+        with FakeOpenAIServer(rate_limited_requests=2, retry_after=0) as server:
+            results, _ = self.summarize(server, papers(3))
+        self.assertTrue(all(r['takeaways_text'].startswith("1. Takeaway") for r in results))
+        self.assertEqual(len(server.requests), 5)
+
+    def test_persistent_rate_limit_is_reported_per_paper(self):
+        with FakeOpenAIServer(rate_limited_requests=100, retry_after=0) as server:
+            results, _ = self.summarize(server, papers(2))
+        self.assertEqual({r['takeaways_text'] for r in results}, {"Error: OpenAI API rate limit exceeded."})
+
+    def test_deadline_gives_up_on_slow_papers(self):
+        self.app.config['SUMMARY_DEADLINE'] = 0.5
+        with FakeOpenAIServer(latency=0.05, latency_by_title={'Paper 1': 3}) as server:
+            results, elapsed = self.summarize(server, papers(3))
+        self.assertEqual(results[1]['takeaways_text'], TIMED_OUT_TEXT)
+        self.assertEqual(results[2]['takeaways_text'], "1. Takeaway for Paper 2")
+        self.assertLess(elapsed, 1.5)
+
+
+def parse_events(body):
+    """Splits a text/event-stream body into (event, data) pairs."""
+    events = []
+    for chunk in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in chunk.split('\n'))
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class TestSummarizePapersStream(SummarizerTestCase):
+    def stream(self, server, input_papers):
+        env = {'OPENAI_API_KEY': 'test-key', 'OPENAI_BASE_URL': server.base_url}
+        with patch.dict(os.environ, env):
+            response = self.client.post('/api/summarize_papers/stream', json={'papers': input_papers}, buffered=False)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'text/event-stream')
+            started = time.monotonic()
+            arrivals = []
+            for chunk in response.response:
+                arrivals.append((time.monotonic() - started, chunk if isinstance(chunk, str) else chunk.decode()))
+            response.close()
+        return arrivals
+
+    def test_takeaways_arrive_as_each_paper_completes(self):
+        latency = {'Paper 0': 0.8, 'Paper 1': 0.05, 'Paper 2': 0.4}
+        with FakeOpenAIServer(latency_by_title=latency) as server:
+            arrivals = self.stream(server, papers(3))
+        takeaways = [(elapsed, parse_events(chunk)[0][1]) for elapsed, chunk in arrivals if chunk.startswith('event: takeaways')]
+        self.assertEqual([data['index'] for _, data in takeaways], [1, 2, 0])
+        self.assertLess(takeaways[0][0], 0.4) # Not held back by the slowest paper
+        self.assertEqual(takeaways[0][1]['takeaways_text'], "1. Takeaway for Paper 1")
+
+    def test_progress_errors_and_done_events(self):
+        input_papers = papers(1) + [{'id': 'bad'}]
+        with FakeOpenAIServer() as server:
+            events = parse_events(''.join(chunk for _, chunk in self.stream(server, input_papers)))
+        self.assertEqual(events[0], ('progress', {'done': 0, 'total': 2}))
+        self.assertIn(('error', {'index': 1, 'id': 'bad', 'title': 'Unknown Title',
+                                 'takeaways_text': "Error: Invalid paper data provided."}), events)
+        self.assertEqual([data['done'] for name, data in events if name == 'progress'], [0, 1, 2])
+        self.assertEqual(events[-1], ('done', {'total': 2}))
+
+    def test_invalid_request_is_rejected_before_streaming(self):
+        response = self.client.post('/api/summarize_papers/stream', json={'papers': []})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {"error": "No papers provided."})
+
+
+class TestSingleSummaryStream(SummarizerTestCase):
+    payload = {'paper_id': '2301.00001v1', 'title': "Paper 1", 'abstract_text': "Abstract."}
+
+    def open_stream(self, server):
+        with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'OPENAI_BASE_URL': server.base_url}):
+            response = self.client.post('/api/summarize_single_paper/stream', json=self.payload, buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        return response
+
+    def test_tokens_are_forwarded_and_summary_is_stored(self):
+        with FakeOpenAIServer(stream_extra_words=3) as server:
+            events = parse_events(self.open_stream(server).get_data(as_text=True))
+        deltas = [data['text'] for name, data in events if name == 'delta']
+        self.assertEqual(len(deltas), 7)
+        self.assertEqual(events[-1], ('done', {'single_paper_summary': ''.join(deltas).strip(),
+                                               'paper_id': '2301.00001v1', 'title': "Paper 1"}))
+
+        # Repeat requests are answered from the summary store
+        with FakeOpenAIServer() as server:
+            events = parse_events(self.open_stream(server).get_data(as_text=True))
+        self.assertEqual(server.requests, [])
+        self.assertEqual([name for name, _ in events], ['delta', 'done'])
+        self.assertEqual(events[0][1]['text'], ''.join(deltas).strip())
+
+    def test_client_disconnect_stops_the_completion(self):
+        with FakeOpenAIServer(token_delay=0.02, stream_extra_words=200) as server:
+            response = self.open_stream(server)
+            chunks = iter(response.response)
+            for _ in range(3):
+                self.assertTrue(next(chunks).startswith(b'event: delta'))
+            response.close()
+            give_up_at = time.monotonic() + 2
+            while not server.streams_cancelled and time.monotonic() < give_up_at:
+                time.sleep(0.02)
+        self.assertEqual(server.streams_cancelled, 1)
+        self.assertLess(server.chunks_sent, 100)
+        self.assertEqual(summary_store.stats()['stored_summaries'], 0)
+
+    def test_upstream_errors_become_error_events(self):
+        with FakeOpenAIServer(rate_limited_requests=100, retry_after=0) as server:
+            events = parse_events(self.open_stream(server).get_data(as_text=True))
+        self.assertEqual(events, [('error', {'error': "OpenAI API rate limit exceeded. Please try again later.",
+                                             'paper_id': '2301.00001v1'})])
+
+
+if __name__ == '__main__':
+    unittest.main()
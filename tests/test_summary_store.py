@@ -0,0 +1,103 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from app import create_app, summary_store
+from app.llm_client import llm_governor
+from app.scheduler import summarize_abstracts_for_newsletter
+from app.summarizer import PROMPT_ID, MODEL, TEMPERATURE
+from app.summary_store import SummarySpec
+from tests.fake_openai import FakeOpenAIServer
+
+
+def papers(count, abstract="Abstract."):
+    return [{'id': f"2301.0000{n}v1", 'title': f"Paper {n}", 'abstract_text': f"{abstract} {n}"} for n in range(count)]
+
+
+class SummaryStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        llm_governor.reset()
+        summary_store.reset()
+        self.client = self.app.test_client()
+
+    def openai_env(self, server):
+        return patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key', 'OPENAI_BASE_URL': server.base_url})
+
+
+class TestSummaryStore(SummaryStoreTestCase):
+    def test_round_trip(self):
+        spec = SummarySpec('2301.00001v1', "Title", "Abstract.", PROMPT_ID, MODEL, TEMPERATURE)
+        self.assertIsNone(summary_store.get_summary(spec))
+        self.assertEqual(summary_store.store_summaries([(spec, "1. One"), (spec, "1. One")]), 1)
+        summary_store.store_summary(spec, "1. Other") # Existing keys are kept
+        self.assertEqual(summary_store.get_summary(spec), "1. One")
+        self.assertEqual(summary_store.stats()['stored_summaries'], 1)
+
+    def test_key_covers_every_input(self):
+        spec = SummarySpec('2301.00001v1', "Title", "Abstract.", PROMPT_ID, MODEL, TEMPERATURE)
+        variants = [spec._replace(paper_id='2301.00001v2'), spec._replace(abstract="Edited."), spec._replace(title="New"),
+                    spec._replace(prompt_id='takeaways-v2'), spec._replace(model='gpt-4o'), spec._replace(temperature=0.2)]
+        self.assertEqual(len({spec.key} | {variant.key for variant in variants}), 7)
+        self.assertEqual(spec._replace(temperature=0.5).key, spec._replace(temperature='0.5').key)
+
+    def test_disabled_store_is_a_no_op(self):
+        self.app.config['SUMMARY_STORE_ENABLED'] = False
+        spec = SummarySpec('2301.00001v1', "Title", "Abstract.", PROMPT_ID, MODEL, TEMPERATURE)
+        self.assertEqual(summary_store.store_summaries([(spec, "1. One")]), 0)
+        self.assertEqual(summary_store.get_summaries([spec]), {})
+
+
+class TestSummaryCallSites(SummaryStoreTestCase):
+    def summarize(self, server, input_papers):
+        with self.openai_env(server):
+            response = self.client.post('/api/summarize_papers', json={'papers': input_papers})
+        self.assertEqual(response.status_code, 200)
+        return [r['takeaways_text'] for r in response.get_json()['papers_with_takeaways']]
+
+    def test_repeated_papers_skip_the_api(self):
+        with FakeOpenAIServer() as server:
+            first = self.summarize(server, papers(3))
+            second = self.summarize(server, papers(3))
+        self.assertEqual(first, second)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_changed_abstract_or_prompt_is_summarized_again(self):
+        with FakeOpenAIServer() as server:
+            self.summarize(server, papers(2))
+            self.summarize(server, papers(2, abstract="Revised abstract."))
+            with patch('app.summarizer.PROMPT_ID', 'takeaways-v2'):
+                self.summarize(server, papers(2))
+        self.assertEqual(len(server.requests), 6)
+
+    def test_failures_are_not_stored(self):
+        with FakeOpenAIServer(rate_limited_requests=100, retry_after=0) as server:
+            self.summarize(server, papers(1))
+        with FakeOpenAIServer() as server:
+            self.assertEqual(self.summarize(server, papers(1)), ["1. Takeaway for Paper 0"])
+        self.assertEqual(len(server.requests), 1)
+
+    def test_single_paper_summary_is_reused(self):
+        payload = {'paper_id': '2301.00001v1', 'title': "Paper 1", 'abstract_text': "Abstract."}
+        with FakeOpenAIServer() as server, self.openai_env(server):
+            first = self.client.post('/api/summarize_single_paper', json=payload).get_json()
+        with patch.dict(os.environ, {'OPENAI_API_KEY': ''}): # A stored summary needs no API call
+            second = self.client.post('/api/summarize_single_paper', json=payload).get_json()
+        self.assertEqual(second['single_paper_summary'], first['single_paper_summary'])
+        self.assertEqual(len(server.requests), 1)
+
+    def test_newsletter_summaries_are_shared_across_subscribers(self):
+        newsletter_papers = [{'id': p['id'], 'title': p['title'], 'summary': p['abstract_text']} for p in papers(3)]
+        with FakeOpenAIServer() as server, self.openai_env(server):
+            first = summarize_abstracts_for_newsletter(newsletter_papers)
+            second = summarize_abstracts_for_newsletter(newsletter_papers[1:])
+        self.assertEqual([p['ai_summary'] for p in second], [p['ai_summary'] for p in first[1:]])
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(llm_governor.stats()['classes']['batch']['admitted'], 3) # Newsletter work yields to interactive
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from app import create_app, cache
+from app.exceptions import NetworkException, ArxivAPIException
+from app.swr_cache import StaleWhileRevalidateCache, FRESH, REVALIDATING, STALE, MISS
+
+
+class FakeClock:
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class TestStaleWhileRevalidateCache(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(config_name='testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        cache.clear()
+        self.clock = FakeClock()
+        self.swr = StaleWhileRevalidateCache('test', soft_ttl=60, hard_ttl=300, stale_ttl=3600,
+                                             stale_exceptions=(NetworkException,), clock=self.clock)
+        self.fetches = 0
+        self.next_error = None
+
+    def fetch(self, value):
+        self.fetches += 1
+        if self.next_error is not None:
+            raise self.next_error
+        return value
+
+    def test_miss_fetches_and_stores(self):
+        self.assertEqual(self.swr.get_or_fetch('k', self.fetch, 'v1'), ('v1', MISS))
+        self.assertEqual(self.swr.lookup('k').state, FRESH)
+
+    def test_fresh_entry_is_served_without_fetch(self):
+        self.swr.get_or_fetch('k', self.fetch, 'v1')
+        self.clock.now += 59
+        self.assertEqual(self.swr.get_or_fetch('k', self.fetch, 'v2'), ('v1', FRESH))
+        self.assertEqual(self.fetches, 1)
+
+    def test_soft_expired_entry_is_served_while_refreshing(self):
+        self.swr.get_or_fetch('k', self.fetch, 'v1')
+        self.clock.now += 120
+        self.assertEqual(self.swr.get_or_fetch('k', self.fetch, 'v2'), ('v1', REVALIDATING))
+        self.swr.join_refreshes(5)
+        self.assertEqual(self.fetches, 2)
+        self.assertEqual(self.swr.get_or_fetch('k', self.fetch, 'v3'), ('v2', FRESH))
+        self.assertEqual(self.swr.stats()['background_refreshes'], 1)
+
+    def test_failed_background_refresh_keeps_entry(self):
+        self.swr.get_or_fetch('k', self.fetch, 'v1')
+        self.clock.now += 120
+        self.next_error = NetworkException("arXiv down")
+        self.swr.get_or_fetch('k', self.fetch, 'v2')
+        self.swr.join_refreshes(5)
+        self.assertEqual(self.swr.lookup('k').value, 'v1')
+        self.assertEqual(self.swr.stats()['refresh_failures'], 1)
+
+    def test_hard_expired_entry_is_refreshed_synchronously(self):
+        self.swr.get_or_fetch('k', self.fetch, 'v1')
+        self.clock.now += 301
+        self.assertEqual(self.swr.get_or_fetch('k', self.fetch, 'v2'), ('v2', MISS))
+
+    def test_hard_expired_entry_is_served_stale_on_network_error(self):
+        self.swr.get_or_fetch('k', self.fetch, 'v1')
+        self.clock.now += 301
+        self.next_error = NetworkException("Rate limited", status_code=429)
+        self.assertEqual(self.swr.get_or_fetch('k', self.fetch, 'v2'), ('v1', STALE))
+        self.assertEqual(self.swr.stats()['stale_served'], 1)
+
+    def test_other_errors_are_not_masked(self):
+        self.swr.get_or_fetch('k', self.fetch, 'v1')
+        self.clock.now += 301
+        self.next_error = ArxivAPIException("Bad request", status_code=400)
+        with self.assertRaises(ArxivAPIException):
+            self.swr.get_or_fetch('k', self.fetch, 'v2')
+
+    def test_network_error_without_cached_value_is_raised(self):
+        self.next_error = NetworkException("arXiv down")
+        with self.assertRaises(NetworkException):
+            self.swr.get_or_fetch('k', self.fetch, 'v1')
+
+    def test_invalid_ttls(self):
+        with self.assertRaises(ValueError):
+            self.swr.configure(soft_ttl=600, hard_ttl=300)
+
+
+if __name__ == '__main__':
+    unittest.main()